@@ -0,0 +1,7 @@
+try:
+    # PyMySQL (requirements.txt) hace de driver MySQLdb para el backend mysql de Django
+    import pymysql
+
+    pymysql.install_as_MySQLdb()
+except ImportError:
+    pass
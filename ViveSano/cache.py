@@ -0,0 +1,40 @@
+"""Configuración de CACHES a partir de una URL estilo CACHE_URL."""
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def configurar_cache(url, timeout=300, prefijo=''):
+    """
+    Traduce una URL al diccionario de CACHES['default'].
+
+    Formatos: locmem://, file:///ruta/a/carpeta, redis://host:6379/1
+    (también rediss:// con TLS) y dummy:// para desactivar la caché.
+    """
+    partes = urlsplit(url)
+    esquema = partes.scheme.lower()
+    if esquema not in BACKENDS:
+        raise ImproperlyConfigured(f"Backend de caché no soportado en CACHE_URL: '{partes.scheme}'")
+
+    configuracion = {
+        'BACKEND': BACKENDS[esquema],
+        'TIMEOUT': timeout,
+        'KEY_PREFIX': prefijo,
+    }
+    if esquema == 'locmem':
+        configuracion['LOCATION'] = partes.netloc or 'vivesano'
+    elif esquema == 'file':
+        if not partes.path:
+            raise ImproperlyConfigured("CACHE_URL file:// necesita una carpeta, p. ej. file:///var/tmp/vivesano_cache")
+        configuracion['LOCATION'] = partes.path
+    elif esquema in ('redis', 'rediss'):
+        configuracion['LOCATION'] = url
+    return configuracion
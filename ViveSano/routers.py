@@ -0,0 +1,70 @@
+"""
+Enrutamiento de lecturas a la réplica.
+
+El middleware marca como "solo lectura" las peticiones GET a las vistas de
+REPLICA_VISTAS (catálogo, reportes, exportaciones) y el router manda sus
+consultas a BASE_REPLICA. Tras cualquier escritura, la sesión queda fijada a
+la primaria durante REPLICA_FIJAR_PRIMARIA_SEGUNDOS, así el cliente ve sus
+propios pedidos aunque la réplica venga atrasada.
+"""
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARIA = 'default'
+CLAVE_SESION = 'bd_primaria_hasta'
+
+_leer_de_replica = ContextVar('leer_de_replica', default=False)
+_hubo_escritura = ContextVar('hubo_escritura', default=False)
+
+
+def alias_replica():
+    """Alias de la réplica configurada, o None si solo existe la primaria."""
+    return getattr(settings, 'BASE_REPLICA', '') or None
+
+
+class RouterReplica:
+    def db_for_read(self, model, **hints):
+        if _leer_de_replica.get():
+            return alias_replica() or PRIMARIA
+        return PRIMARIA
+
+    def db_for_write(self, model, **hints):
+        # La sesión se guarda en cada petición: no cuenta como escritura del cliente
+        if model._meta.app_label != 'sessions':
+            _hubo_escritura.set(True)
+        return PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplica tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación, no por migrate
+        return db == PRIMARIA
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token_replica = _leer_de_replica.set(False)
+        token_escritura = _hubo_escritura.set(False)
+        try:
+            response = self.get_response(request)
+            if _hubo_escritura.get() or request.method not in ('GET', 'HEAD'):
+                request.session[CLAVE_SESION] = time.time() + settings.REPLICA_FIJAR_PRIMARIA_SEGUNDOS
+            return response
+        finally:
+            _leer_de_replica.reset(token_replica)
+            _hubo_escritura.reset(token_escritura)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in settings.REPLICA_VISTAS
+            and request.session.get(CLAVE_SESION, 0) < time.time()
+        ):
+            _leer_de_replica.set(True)
@@ -1,14 +1,13 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.media import servir_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
     path('gestion/', include('gestion.urls')),
+    # En producción también: con MEDIA_SENDFILE el proxy hace la transferencia
+    re_path(r'^%s(?P<ruta>.*)$' % settings.MEDIA_URL.lstrip('/'), servir_media, name='media'),
 ]
-
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Login: búsqueda normalizada del usuario y límite de intentos fallidos.
+
+La búsqueda compara LOWER(username) (o LOWER(email) si se ingresó un correo),
+que usa los índices funcionales de la migración core.0001. El límite cuenta
+los fallos por IP y por cuenta en la caché (ventana fija); al superarlo, el
+login se rechaza antes de calcular el hash de la contraseña, así una ráfaga de
+credential stuffing no consume CPU. La cuenta se identifica por su pk cuando
+el identificador resuelve a un usuario: 'Juan', 'juan' y su correo suman al
+mismo contador.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+
+def usuario_por_identificador(identificador):
+    """Usuario cuyo nombre (o correo, si contiene '@') coincide sin importar mayúsculas, o None."""
+    identificador = (identificador or '').strip()
+    if not identificador:
+        return None
+    campo = 'email' if '@' in identificador else 'username'
+    coincidencias = list(
+        User.objects.alias(normalizado=Lower(campo)).filter(normalizado=Lower(Value(identificador)))[:2]
+    )
+    # Un correo compartido por dos cuentas no identifica a ninguna
+    return coincidencias[0] if len(coincidencias) == 1 else None
+
+
+def _claves(request, identificador, usuario=None):
+    if usuario is not None:
+        cuenta = usuario.pk
+    else:
+        cuenta = hashlib.md5(' '.join((identificador or '').casefold().split()).encode()).hexdigest()
+    # REMOTE_ADDR es la IP del cliente si el proxy frontal la reescribe (nginx real_ip / ProxyFix)
+    return {
+        f"login:ip:{request.META.get('REMOTE_ADDR', '')}": settings.LOGIN_MAX_INTENTOS_IP,
+        f"login:cuenta:{cuenta}": settings.LOGIN_MAX_INTENTOS_CUENTA,
+    }
+
+
+def segundos_bloqueado(request, identificador, usuario=None):
+    """Segundos que faltan para volver a intentar (0 si puede intentar). Una sola lectura a la caché."""
+    bloqueos = cache.get_many([f"{clave}:bloqueo" for clave in _claves(request, identificador, usuario)])
+    hasta = max(bloqueos.values(), default=0)
+    return max(0, int(hasta - time.time()))
+
+
+def registrar_fallo(request, identificador, usuario=None):
+    ventana = settings.LOGIN_VENTANA_SEGUNDOS
+    for clave, maximo in _claves(request, identificador, usuario).items():
+        cache.add(clave, 0, ventana)
+        try:
+            fallos = cache.incr(clave)
+        except ValueError:
+            # El contador expiró entre el add y el incr
+            cache.set(clave, 1, ventana)
+            fallos = 1
+        if fallos >= maximo:
+            cache.set(f"{clave}:bloqueo", time.time() + ventana, ventana)
+
+
+def limpiar_fallos(request, identificador, usuario=None):
+    """Tras un login correcto se olvidan los fallos de la cuenta (los de la IP siguen contando)."""
+    claves = [clave for clave in _claves(request, identificador, usuario) if clave.startswith('login:cuenta:')]
+    cache.delete_many(claves + [f"{clave}:bloqueo" for clave in claves])
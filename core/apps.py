@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from gestion.models import Notificacion, Pedido, Producto, TarifaEnvio
+
+        from . import checks  # noqa: F401  (registra los checks de despliegue)
+        from .cache import invalidar_catalogo, invalidar_contadores, invalidar_tarifas
+        from .sqlite import configurar_conexion
+
+        connection_created.connect(configurar_conexion, dispatch_uid='core.sqlite.configurar_conexion')
+        post_save.connect(invalidar_catalogo, sender=Producto, dispatch_uid='core.cache.invalidar_catalogo_save')
+        post_delete.connect(invalidar_catalogo, sender=Producto, dispatch_uid='core.cache.invalidar_catalogo_delete')
+        post_save.connect(invalidar_tarifas, sender=TarifaEnvio, dispatch_uid='core.cache.invalidar_tarifas_save')
+        post_delete.connect(invalidar_tarifas, sender=TarifaEnvio, dispatch_uid='core.cache.invalidar_tarifas_delete')
+        for modelo in (Pedido, Notificacion):
+            post_save.connect(invalidar_contadores, sender=modelo, dispatch_uid=f'core.cache.contadores_save_{modelo.__name__}')
+            post_delete.connect(invalidar_contadores, sender=modelo, dispatch_uid=f'core.cache.contadores_delete_{modelo.__name__}')
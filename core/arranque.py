@@ -0,0 +1,83 @@
+"""
+Medición del arranque en frío de un worker.
+
+Corre un intérprete nuevo con `python -X importtime` que hace lo mismo que un
+worker antes de su primera respuesta: django.setup(), cargar la aplicación
+WSGI (middleware) e importar el URLconf (todas las vistas). Devuelve el tiempo
+de cada fase y el costo de importación de cada módulo.
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Paquetes que solo usan unas pocas vistas y deben cargarse recién al usarlos
+MODULOS_DIFERIDOS = ('transbank', 'requests', 'openpyxl')
+
+_SCRIPT = """
+import json, time
+inicio = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+wsgi = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup - inicio) * 1000,
+    'wsgi_ms': (wsgi - setup) * 1000,
+    'urls_ms': (urls - wsgi) * 1000,
+}))
+"""
+
+
+def _leer_importtime(salida):
+    """Filas (modulo, propio_us, acumulado_us) del formato de `-X importtime`."""
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        if not propio.strip().isdigit():
+            continue  # cabecera
+        modulos.append((nombre.strip(), int(propio), int(acumulado)))
+    return modulos
+
+
+def medir_arranque():
+    """
+    Mide el arranque en un proceso aparte (los módulos de este ya están importados).
+
+    Devuelve {'setup_ms', 'wsgi_ms', 'urls_ms', 'total_ms', 'modulos', 'por_paquete'}.
+    """
+    entorno = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'ViveSano.settings'))
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SCRIPT],
+        cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True, check=False,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"El arranque falló:\n{proceso.stderr[-2000:]}")
+
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado['total_ms'] = resultado['setup_ms'] + resultado['wsgi_ms'] + resultado['urls_ms']
+    resultado['modulos'] = _leer_importtime(proceso.stderr)
+
+    por_paquete = defaultdict(int)
+    for nombre, propio, _acumulado in resultado['modulos']:
+        por_paquete[nombre.split('.')[0]] += propio
+    resultado['por_paquete'] = dict(por_paquete)
+    return resultado
+
+
+def diferidos_cargados(resultado):
+    """Módulos de MODULOS_DIFERIDOS que se importaron durante el arranque."""
+    return sorted({
+        nombre for nombre, _propio, _acumulado in resultado['modulos']
+        if nombre.split('.')[0] in MODULOS_DIFERIDOS
+    })
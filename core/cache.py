@@ -0,0 +1,174 @@
+"""
+Caché por rol con espacios de nombres versionados.
+
+Cada espacio de nombres ('catalogo', 'correos', ...) tiene un número de versión
+guardado en la caché; las claves lo incluyen, así que invalidar un espacio
+completo es un solo incremento y las entradas viejas expiran solas. Las
+lecturas se cuentan (aciertos, fallos y latencia) por espacio de nombres en
+cada proceso para poder ajustar los TTL con datos.
+
+Las métricas viven en la memoria del worker: `resumen_metricas` (y la vista
+metricas_cache) muestra solo las del proceso que atiende la petición, así que
+con varios workers hay que consultar varias veces o sumar desde los logs. Con
+CACHE_URL=locmem:// también las versiones son por worker, y una invalidación
+no llega a los demás; `check --deploy` lo advierte (core.W002).
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+
+_metricas = defaultdict(lambda: {'aciertos': 0, 'fallos': 0, 'segundos': 0.0})
+_candado = threading.Lock()
+
+# Se guarda en la caché en lugar del token CSRF real y se reemplaza al servir el fragmento
+MARCADOR_CSRF = '__vivesano_csrf__'
+
+
+def rol_usuario(request):
+    """Rol que define qué ve el usuario: anonimo, cliente, admin o staff con sus grupos."""
+    if not hasattr(request, '_rol_cache'):
+        user = request.user
+        if not user.is_authenticated:
+            rol = 'anonimo'
+        elif user.is_superuser:
+            rol = 'admin'
+        elif user.is_staff:
+            rol = 'staff:' + ','.join(sorted(user.groups.values_list('name', flat=True)))
+        else:
+            rol = 'cliente'
+        request._rol_cache = rol
+    return request._rol_cache
+
+
+def _clave_version(namespace):
+    return f"ns:{namespace}:version"
+
+
+def version(namespace):
+    clave = _clave_version(namespace)
+    actual = cache.get(clave)
+    if actual is None:
+        cache.add(clave, 1, timeout=None)
+        actual = cache.get(clave, 1)
+    return actual
+
+
+def version_vigente(namespace):
+    """
+    Versión guardada, o None si la clave ya no está (caché vaciada o desalojada).
+
+    Para índices en memoria del proceso: al volver a crearse, la versión
+    reinicia en 1 y un índice armado con esa misma versión podría estar viejo.
+    """
+    return cache.get(_clave_version(namespace))
+
+
+def invalidar(namespace):
+    """Invalida todas las claves del espacio de nombres subiendo su versión."""
+    clave = _clave_version(namespace)
+    cache.add(clave, 1, timeout=None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # La versión expiró o fue desalojada entre el add y el incr
+        cache.set(clave, 2, timeout=None)
+
+
+def invalidar_al_confirmar(namespace):
+    """Invalida cuando la transacción en curso se confirma (o de inmediato si no hay una)."""
+    transaction.on_commit(lambda: invalidar(namespace))
+
+
+def clave(namespace, *partes):
+    """Clave versionada; las partes se resumen con un hash para no exceder el largo permitido."""
+    resumen = hashlib.md5(':'.join(str(p) for p in partes).encode()).hexdigest()
+    return f"{namespace}:v{version(namespace)}:{resumen}"
+
+
+def _registrar(namespace, acierto, segundos):
+    with _candado:
+        fila = _metricas[namespace]
+        fila['aciertos' if acierto else 'fallos'] += 1
+        fila['segundos'] += segundos
+
+
+def leer(namespace, clave_cache):
+    """Lee de la caché registrando acierto/fallo y latencia. Devuelve None si no está."""
+    inicio = time.perf_counter()
+    valor = cache.get(clave_cache)
+    _registrar(namespace, valor is not None, time.perf_counter() - inicio)
+    return valor
+
+
+def obtener(namespace, partes, calcular, ttl=None):
+    """Devuelve el valor cacheado para (namespace, partes) o lo calcula y lo guarda."""
+    clave_cache = clave(namespace, *partes)
+    valor = leer(namespace, clave_cache)
+    if valor is None:
+        valor = calcular()
+        cache.set(clave_cache, valor, ttl)
+    return valor
+
+
+def cache_por_rol(namespace, ttl=None):
+    """
+    Cachea la respuesta de una vista GET por rol y URL completa.
+
+    Solo sirve para respuestas que no cambian entre usuarios del mismo rol
+    (JSON, parciales sin navbar): una página con base.html muestra el nombre
+    y el carrito del usuario y debe usar el fragmento {% cache_rol %}.
+    """
+    def decorador(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            clave_cache = clave(namespace, 'vista', rol_usuario(request), request.get_full_path())
+            response = leer(namespace, clave_cache)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming and not response.cookies:
+                    if hasattr(response, 'render') and callable(response.render):
+                        response = response.render()
+                    cache.set(clave_cache, response, ttl)
+            return response
+        return wrapper
+    return decorador
+
+
+def resumen_metricas():
+    """Aciertos, fallos, tasa de aciertos y latencia media (ms) por espacio de nombres, solo de este proceso."""
+    with _candado:
+        filas = {namespace: dict(valores) for namespace, valores in _metricas.items()}
+    resultado = {}
+    for namespace, fila in sorted(filas.items()):
+        lecturas = fila['aciertos'] + fila['fallos']
+        resultado[namespace] = {
+            'aciertos': fila['aciertos'],
+            'fallos': fila['fallos'],
+            'tasa_aciertos': round(fila['aciertos'] / lecturas, 3) if lecturas else None,
+            'latencia_media_ms': round(fila['segundos'] * 1000 / lecturas, 3) if lecturas else None,
+            'version': version(namespace),
+        }
+    return resultado
+
+
+def invalidar_catalogo(sender, **kwargs):
+    """Receptor de post_save/post_delete de Producto: precio, stock o nombre cambiaron."""
+    invalidar_al_confirmar('catalogo')
+
+
+def invalidar_tarifas(sender, **kwargs):
+    """Receptor de post_save/post_delete de TarifaEnvio: cada proceso rearma su índice de tarifas."""
+    invalidar_al_confirmar('tarifas')
+
+
+def invalidar_contadores(sender, **kwargs):
+    """Receptor de post_save/post_delete de Pedido y Notificacion: cambian los contadores del navbar."""
+    invalidar_al_confirmar('contadores')
@@ -17,6 +17,7 @@ class Carrito:
                 'producto_id': producto.id,
                 'nombre': producto.nombre,
                 'precio': str(producto.precio),
+                'peso': producto.peso_gramos,
                 'cantidad': 0,
                 'imagen': ''
             }
@@ -38,6 +39,10 @@ class Carrito:
     
     def obtener_total_precio(self):
         return sum(Decimal(item['precio']) * item['cantidad'] for item in self.carrito.values())
+
+    def obtener_peso_total(self):
+        # Los carritos guardados antes de existir el peso no lo traen
+        return sum(item.get('peso', 0) * item['cantidad'] for item in self.carrito.values())
     
     def __len__(self):
         return sum(item['cantidad'] for item in self.carrito.values())
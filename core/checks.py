@@ -0,0 +1,94 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.checks import Error, Tags, Warning, register
+
+# Tipos que WhiteNoise siempre comprime; imágenes y fuentes ya vienen comprimidas
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.svg', '.html', '.txt', '.json')
+
+
+def _archivos_fuente():
+    rutas = set()
+    for finder in finders.get_finders():
+        for ruta, _storage in finder.list(['CVS', '.*', '*~']):
+            rutas.add(ruta.replace(os.sep, '/'))
+    return rutas
+
+
+def _hay_brotli():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@register(Tags.staticfiles, deploy=True)
+def revisar_collectstatic(app_configs, **kwargs):
+    """Con el storage con manifiesto, verifica que collectstatic se corrió y está al día."""
+    if not isinstance(staticfiles_storage, ManifestFilesMixin):
+        return []
+
+    manifiesto, _hash = staticfiles_storage.load_manifest()
+    if not manifiesto:
+        return [Error(
+            "No existe el manifiesto de archivos estáticos.",
+            hint="Ejecuta `python manage.py collectstatic --noinput` antes de desplegar.",
+            id='core.E001',
+        )]
+
+    faltantes = sorted(_archivos_fuente() - set(manifiesto))
+    if faltantes:
+        return [Error(
+            f"{len(faltantes)} archivo(s) estático(s) no están en el manifiesto: {', '.join(faltantes[:5])}",
+            hint="Vuelve a ejecutar `python manage.py collectstatic --noinput`.",
+            id='core.E002',
+        )]
+
+    sufijos = ['.gz'] + (['.br'] if _hay_brotli() else [])
+    sin_comprimir = sorted(
+        nombre for nombre in manifiesto.values()
+        if nombre.endswith(EXTENSIONES_COMPRIMIBLES)
+        and not all(staticfiles_storage.exists(nombre + sufijo) for sufijo in sufijos)
+    )
+    if sin_comprimir:
+        return [Warning(
+            f"{len(sin_comprimir)} archivo(s) estático(s) sin versión comprimida ({'/'.join(sufijos)}): "
+            f"{', '.join(sin_comprimir[:5])}",
+            hint="El storage CompressedManifestStaticFilesStorage las genera al correr collectstatic.",
+            id='core.W001',
+        )]
+    return []
+
+
+@register(deploy=True)
+def revisar_webpay_falso(app_configs, **kwargs):
+    """La pasarela simulada aprueba cualquier pago: solo para pruebas de carga."""
+    if settings.WEBPAY_FALSO:
+        return [Error(
+            "WEBPAY_FALSO está activo: todos los pagos se aprueban sin pasar por Transbank.",
+            hint="Quita WEBPAY_FALSO=1 del entorno de producción.",
+            id='core.E003',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def revisar_cache_compartida(app_configs, **kwargs):
+    """Con locmem cada worker tiene su propia caché: versiones, límites de login y métricas no se comparten."""
+    if settings.DEBUG:
+        return []
+    locales = sorted(
+        alias for alias, config in settings.CACHES.items()
+        if config.get('BACKEND') == 'django.core.cache.backends.locmem.LocMemCache'
+    )
+    if locales:
+        return [Warning(
+            f"La caché {', '.join(locales)} es locmem: cada worker tiene la suya. Las invalidaciones "
+            "(catálogo, tarifas), el límite de intentos de login y las métricas de caché quedan por proceso.",
+            hint="Usa una caché compartida, p. ej. CACHE_URL=redis://host:6379/1.",
+            id='core.W002',
+        )]
+    return []
@@ -0,0 +1,145 @@
+"""
+Compresión de respuestas (Brotli o gzip según Accept-Encoding) y minificado opcional del HTML.
+
+Los estáticos no pasan por aquí: WhiteNoise los sirve ya comprimidos antes
+de llegar a este middleware.
+
+El HTML va siempre en gzip con bytes aleatorios en la cabecera (mitigación de
+BREACH, como GZipMiddleware de Django): refleja el token CSRF junto a texto que
+controla el usuario, y Brotli no tiene un campo donde meter ese relleno. Brotli
+queda para JSON, CSS, JS y demás tipos comprimibles.
+"""
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TIPOS_COMPRIMIBLES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+# Bloques cuyo espacio en blanco importa; el resto del HTML se puede recortar
+BLOQUES_PROTEGIDOS = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+COMENTARIOS = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+SALTOS_CON_SANGRIA = re.compile(r'[ \t\r\f\v]*\n\s*')
+
+# Bytes aleatorios en el gzip para mitigar BREACH, como GZipMiddleware de Django
+MAX_BYTES_ALEATORIOS = 100
+
+
+def minificar_html(html):
+    """
+    Quita comentarios HTML y la sangría de cada línea, sin tocar pre/textarea/script/style.
+
+    Solo colapsa espacio que contiene un salto de línea, que el navegador ya
+    trata como un único espacio, así el texto visible no cambia.
+    """
+    partes = BLOQUES_PROTEGIDOS.split(html)
+    resultado = []
+    # split con dos grupos devuelve [texto, bloque, etiqueta, texto, bloque, etiqueta, ...]
+    for i in range(0, len(partes), 3):
+        texto = COMENTARIOS.sub('', partes[i])
+        resultado.append(SALTOS_CON_SANGRIA.sub('\n', texto))
+        if i + 1 < len(partes):
+            resultado.append(partes[i + 1])
+    return ''.join(resultado)
+
+
+def codificacion_aceptada(cabecera, permitir_brotli=True):
+    """'br' o 'gzip' según Accept-Encoding (respetando q=0), o None."""
+    aceptadas = {}
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = 1.0
+        if parametros.strip().startswith('q='):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre.strip().lower()] = calidad
+
+    if permitir_brotli and brotli is not None and aceptadas.get('br', 0) > 0:
+        return 'br'
+    if aceptadas.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def comprimir_brotli(contenido, nivel=None):
+    return brotli.compress(contenido, quality=nivel if nivel is not None else settings.COMPRESION_NIVEL_BROTLI)
+
+
+def _secuencia_brotli(secuencia):
+    compresor = brotli.Compressor(quality=settings.COMPRESION_NIVEL_BROTLI)
+    for bloque in secuencia:
+        datos = compresor.process(bloque) + compresor.flush()
+        if datos:
+            yield datos
+    yield compresor.finish()
+
+
+class CompresionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        tipo = response.get('Content-Type', '')
+        if settings.MINIFICAR_HTML and not response.streaming and tipo.startswith('text/html'):
+            charset = response.charset
+            response.content = minificar_html(response.content.decode(charset)).encode(charset)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+
+        if not self._comprimible(response, tipo):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = codificacion_aceptada(
+            request.headers.get('Accept-Encoding', ''), permitir_brotli=not tipo.startswith('text/html'),
+        )
+        if codificacion is None:
+            return response
+
+        if response.streaming:
+            if codificacion == 'br':
+                response.streaming_content = _secuencia_brotli(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=MAX_BYTES_ALEATORIOS,
+                )
+            # El tamaño comprimido se conoce recién al terminar de enviar
+            del response['Content-Length']
+        else:
+            if codificacion == 'br':
+                comprimido = comprimir_brotli(response.content)
+            else:
+                comprimido = compress_string(response.content, max_random_bytes=MAX_BYTES_ALEATORIOS)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codificacion
+        return response
+
+    def _comprimible(self, response, tipo):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return False
+        if response.has_header('X-Accel-Redirect') or response.has_header('X-Sendfile'):
+            return False
+        if not tipo.startswith(TIPOS_COMPRIMIBLES):
+            return False
+        if response.streaming:
+            return not response.is_async
+        return len(response.content) >= settings.COMPRESION_MINIMO
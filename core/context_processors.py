@@ -1,32 +1,36 @@
+from django.conf import settings
 from django.db.models import Q
 from gestion.models import Pedido, Notificacion
-from django.contrib.auth.models import Group
 
-def contadores_globales(request):
+from .cache import obtener, rol_usuario
+
+
+def _contar(rol):
     data = {
         'cant_logistica': 0,
         'cant_atencion': 0
     }
+    grupos = rol.split(':', 1)[1].split(',') if rol.startswith('staff:') else []
 
+    if 'Logistica' in grupos or rol == 'admin':
+        data['cant_logistica'] = Pedido.objects.filter(
+            Q(estado__startswith='Pagado') | 
+            Q(estado__startswith='En Preparacion') |
+            Q(estado='En Espera Faltante')
+        ).count()
 
-    if request.user.is_authenticated and request.user.is_staff:
-        
-        if request.user.groups.filter(name='Logistica').exists() or request.user.is_superuser:
-            
-            data['cant_logistica'] = Pedido.objects.filter(
-                Q(estado__startswith='Pagado') | 
-                Q(estado__startswith='En Preparacion') |
-                Q(estado='En Espera Faltante')
-            ).count()
+    if 'Atencion al cliente' in grupos or rol == 'admin':
+        data['cant_atencion'] = Notificacion.objects.filter(
+            destinatario_grupo__name='Atencion al cliente'
+        ).exclude(estado__in=['LISTO', 'CANCELADO']).count()
 
+    return data
 
-        if request.user.groups.filter(name='Atencion al cliente').exists() or request.user.is_superuser:
-            try:
-                grupo_atencion = Group.objects.get(name='Atencion al cliente')
-                data['cant_atencion'] = Notificacion.objects.filter(
-                    destinatario_grupo=grupo_atencion
-                ).exclude(estado__in=['LISTO', 'CANCELADO']).count()
-            except Group.DoesNotExist:
-                pass
 
-    return data
\ No newline at end of file
+def contadores_globales(request):
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return {'cant_logistica': 0, 'cant_atencion': 0}
+
+    # Los contadores son iguales para todo el staff con el mismo rol: se comparten en la caché
+    rol = rol_usuario(request)
+    return obtener('contadores', (rol,), lambda: _contar(rol), settings.CACHE_TTL_CONTADORES)
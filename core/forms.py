@@ -2,33 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from gestion.models import Cliente
-from itertools import cycle
-
-def validar_rut_chileno(rut):
-    rut_limpio = rut.replace('.', '').replace('-', '').upper()
-    if not rut_limpio or len(rut_limpio) < 8:
-        return False
-        
-    cuerpo = rut_limpio[:-1]
-    dv_ingresado = rut_limpio[-1]
-    
-    if not cuerpo.isdigit():
-        return False
-    try:
-        reverso = map(int, reversed(str(cuerpo)))
-        factors = cycle(range(2, 8))
-        s = sum(d * f for d, f in zip(reverso, factors))
-        res = (-s) % 11
-        if res == 10:
-            dv_esperado = 'K'
-        elif res == 11:
-            dv_esperado = '0'
-        else:
-            dv_esperado = str(res)
-            
-        return dv_ingresado == dv_esperado
-    except ValueError:
-        return False
+from .rut import normalizar_rut
 
 class DatosEnvioForm(forms.ModelForm):
     first_name = forms.CharField(label="Nombre", widget=forms.TextInput(attrs={'class': 'form-control'}))
@@ -115,8 +89,8 @@ class DatosEnvioForm(forms.ModelForm):
 
     # VALIDACIÓN DEL RUT
     def clean_rut(self):
-        rut = self.cleaned_data.get('rut')
-        if not validar_rut_chileno(rut):
+        rut = normalizar_rut(self.cleaned_data.get('rut'))
+        if rut is None:
             raise forms.ValidationError("El RUT ingresado no es válido (Revisa el dígito verificador).")
         return rut
 
@@ -231,11 +205,11 @@ class PerfilUsuarioForm(forms.ModelForm):
         self.fields['codigo_postal'].required = True
 
     def clean_rut(self):
-        rut = self.cleaned_data.get('rut')
-        
-        if not validar_rut_chileno(rut):
+        # Forma canónica: '12.345.678-9' y '123456789' chocan en el índice único
+        rut = normalizar_rut(self.cleaned_data.get('rut'))
+        if rut is None:
             raise forms.ValidationError("RUT inválido.")
-            
+
         existe_otro = Cliente.objects.filter(rut=rut).exclude(user=self.user).exists()
         if existe_otro:
             raise forms.ValidationError("Este RUT ya está registrado en otra cuenta.")
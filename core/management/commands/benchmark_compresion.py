@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+from django.utils.text import compress_string
+
+from core.compresion import brotli, comprimir_brotli, minificar_html
+from gestion.models import Producto
+
+
+class Command(BaseCommand):
+    help = "Mide bytes ahorrados y CPU por respuesta del minificado HTML, gzip y Brotli sobre páginas reales."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50, help="Veces que se mide cada paso por página.")
+
+    def handle(self, *args, **options):
+        paginas = [reverse('core:home'), reverse('core:catalogo')]
+        producto = Producto.objects.order_by('id').first()
+        if producto:
+            paginas.append(reverse('core:detalle', args=[producto.id]))
+
+        cliente = Client(SERVER_NAME='localhost')
+        for url in paginas:
+            response = cliente.get(url)
+            html = response.content.decode(response.charset)
+            original = len(response.content)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{url} ({original} bytes)"))
+
+            minificado, ms = self._medir(lambda: minificar_html(html).encode(), options['repeticiones'])
+            self._fila("minificado", original, len(minificado), ms)
+
+            pasos = [("gzip", compress_string)]
+            if brotli is not None:
+                pasos.append(("brotli", comprimir_brotli))
+            else:
+                self.stdout.write("  brotli: no instalado (pip install Brotli)")
+
+            for nombre, comprimir in pasos:
+                for etiqueta, contenido in ((nombre, response.content), (f"minificado + {nombre}", minificado)):
+                    resultado, ms = self._medir(lambda: comprimir(contenido), options['repeticiones'])
+                    self._fila(etiqueta, original, len(resultado), ms)
+
+    def _medir(self, funcion, repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            resultado = funcion()
+        return resultado, (time.perf_counter() - inicio) * 1000 / repeticiones
+
+    def _fila(self, etiqueta, original, tamano, ms):
+        ahorro = 100 * (original - tamano) / original if original else 0
+        self.stdout.write(f"  {etiqueta:<22} {tamano:>8} bytes  ({ahorro:5.1f}% menos)  {ms:7.3f} ms/respuesta")
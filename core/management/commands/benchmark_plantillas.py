@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from gestion.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de respuesta (dominado por el render) de las páginas principales, "
+        "con la caché vacía y con los fragmentos ya cacheados, para anónimo, cliente y staff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=30, help="Peticiones medidas por página y rol.")
+
+    def handle(self, *args, **options):
+        paginas = [reverse('core:home'), reverse('core:catalogo'), reverse('core:ver_carrito')]
+        producto = Producto.objects.order_by('id').first()
+        if producto:
+            paginas.append(reverse('core:detalle', args=[producto.id]))
+
+        roles = [('anonimo', None)]
+        cliente = User.objects.filter(is_staff=False, is_active=True).first()
+        if cliente:
+            roles.append(('cliente', cliente))
+        staff = User.objects.filter(is_superuser=True, is_active=True).first()
+        if staff:
+            roles.append(('superusuario', staff))
+            paginas.append(reverse('dashboard_logistica'))
+
+        self.stdout.write(f"{'página':<28} {'rol':<13} {'en frío':>9} {'p50':>9} {'p95':>9}")
+        for nombre_rol, usuario in roles:
+            navegador = Client(SERVER_NAME='localhost')
+            if usuario:
+                navegador.force_login(usuario)
+            for url in paginas:
+                if url == reverse('dashboard_logistica') and not (usuario and usuario.is_staff):
+                    continue
+                cache.clear()
+                frio = self._medir(navegador, url)
+                tiempos = sorted(self._medir(navegador, url) for _ in range(options['repeticiones']))
+                p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+                self.stdout.write(
+                    f"{url:<28} {nombre_rol:<13} {frio:>7.2f}ms {statistics.median(tiempos):>7.2f}ms {p95:>7.2f}ms"
+                )
+
+    def _medir(self, navegador, url):
+        inicio = time.perf_counter()
+        response = navegador.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} respondió {response.status_code}")
+        return (time.perf_counter() - inicio) * 1000
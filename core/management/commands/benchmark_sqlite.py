@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.sqlite import pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento de escritura concurrente de SQLite con la configuración por defecto "
+        "y con los PRAGMA/transaction_mode del proyecto, usando bases temporales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help="Escritores concurrentes.")
+        parser.add_argument('--escrituras', type=int, default=200, help="Transacciones por hilo.")
+
+    def handle(self, *args, **options):
+        escenarios = [
+            ("Por defecto (rollback journal, DEFERRED)", [], 'DEFERRED'),
+            ("Ajustado (PRAGMA del proyecto, IMMEDIATE)", pragmas(), 'IMMEDIATE'),
+        ]
+        for nombre, lista_pragmas, modo in escenarios:
+            segundos, confirmadas, bloqueos = self._medir(lista_pragmas, modo, options['hilos'], options['escrituras'])
+            self.stdout.write(
+                f"{nombre}: {confirmadas} transacciones en {segundos:.2f}s "
+                f"({confirmadas / segundos:.0f}/s), 'database is locked': {bloqueos}"
+            )
+
+    def _medir(self, lista_pragmas, modo, hilos, escrituras):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'benchmark.sqlite3')
+            con = sqlite3.connect(ruta)
+            con.executescript(
+                "CREATE TABLE producto (id INTEGER PRIMARY KEY, stock INTEGER);"
+                "CREATE TABLE pedido (id INTEGER PRIMARY KEY, producto_id INTEGER, cantidad INTEGER);"
+                "INSERT INTO producto (id, stock) VALUES (1, 1000000);"
+            )
+            con.close()
+
+            contadores = {'confirmadas': 0, 'bloqueos': 0}
+            candado = threading.Lock()
+
+            def escritor():
+                # Mismo patrón que un checkout: leer el stock y luego escribir
+                conexion = sqlite3.connect(ruta, isolation_level=None)
+                for pragma in lista_pragmas:
+                    conexion.execute(f"PRAGMA {pragma}")
+                confirmadas = bloqueos = 0
+                for _ in range(escrituras):
+                    try:
+                        conexion.execute(f"BEGIN {modo}")
+                        stock = conexion.execute("SELECT stock FROM producto WHERE id = 1").fetchone()[0]
+                        conexion.execute("UPDATE producto SET stock = ? WHERE id = 1", (stock - 1,))
+                        conexion.execute("INSERT INTO pedido (producto_id, cantidad) VALUES (1, 1)")
+                        conexion.execute("COMMIT")
+                        confirmadas += 1
+                    except sqlite3.OperationalError:
+                        if conexion.in_transaction:
+                            conexion.execute("ROLLBACK")
+                        bloqueos += 1
+                conexion.close()
+                with candado:
+                    contadores['confirmadas'] += confirmadas
+                    contadores['bloqueos'] += bloqueos
+
+            trabajadores = [threading.Thread(target=escritor) for _ in range(hilos)]
+            inicio = time.perf_counter()
+            for t in trabajadores:
+                t.start()
+            for t in trabajadores:
+                t.join()
+            return time.perf_counter() - inicio, contadores['confirmadas'], contadores['bloqueos']
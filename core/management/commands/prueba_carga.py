@@ -0,0 +1,227 @@
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import resolve, reverse
+
+from gestion.models import Cliente, Producto
+
+PRODUCTOS_POR_PAGINA = 6
+
+
+class _SinRedirecciones(HTTPRedirectHandler):
+    """Cada salto de una redirección se mide como su propio endpoint."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class FlujoInterrumpido(Exception):
+    pass
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+class Registro:
+    def __init__(self):
+        self.tiempos = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.compras = 0
+        self._candado = threading.Lock()
+
+    def medir(self, endpoint, ms, ok):
+        with self._candado:
+            self.tiempos[endpoint].append(ms)
+            if not ok:
+                self.errores[endpoint] += 1
+
+    def compra(self):
+        with self._candado:
+            self.compras += 1
+
+
+class Navegador:
+    """Un usuario virtual: sus cookies (sesión y CSRF) y sus peticiones medidas."""
+
+    def __init__(self, base, registro, timeout):
+        self.base = base.rstrip('/')
+        self.registro = registro
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _SinRedirecciones)
+
+    def _csrf(self):
+        return next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+
+    def pedir(self, endpoint, ruta, datos=None, esperado=200):
+        """GET (o POST con `datos`); devuelve (estado, location). Lanza FlujoInterrumpido si el estado no es el esperado."""
+        url = urljoin(self.base + '/', ruta)
+        cuerpo, cabeceras = None, {'User-Agent': 'vivesano-prueba-carga'}
+        if datos is not None:
+            token = self._csrf()
+            cuerpo = urlencode(dict(datos, csrfmiddlewaretoken=token)).encode()
+            cabeceras.update({'X-CSRFToken': token, 'Referer': url})
+
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(Request(url, data=cuerpo, headers=cabeceras), timeout=self.timeout) as respuesta:
+                respuesta.read()
+                estado, location = respuesta.status, respuesta.headers.get('Location')
+        except HTTPError as e:
+            e.read()
+            estado, location = e.code, e.headers.get('Location')
+        except (URLError, TimeoutError, ConnectionError) as e:
+            self.registro.medir(endpoint, (time.perf_counter() - inicio) * 1000, False)
+            raise FlujoInterrumpido(f"{endpoint}: {e}")
+        ok = estado == esperado
+        self.registro.medir(endpoint, (time.perf_counter() - inicio) * 1000, ok)
+        if not ok:
+            raise FlujoInterrumpido(f"{endpoint}: respondió {estado} (se esperaba {esperado}) en {ruta}")
+        return estado, location and urljoin(url, location)
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de punta a punta contra un servidor corriendo: login, catálogo, carrito, "
+        "checkout y pago con el Webpay falso (el servidor debe tener WEBPAY_FALSO=1). Usa las "
+        "cuentas de `seed_load` y reporta throughput y p50/p95/p99 por endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Servidor a probar.")
+        parser.add_argument('--usuarios', type=int, default=10, help="Usuarios virtuales concurrentes.")
+        parser.add_argument('--iteraciones', type=int, default=5, help="Compras completas por usuario.")
+        parser.add_argument('--productos-por-compra', type=int, default=3)
+        parser.add_argument('--clave', default='carga1234', help="Contraseña de las cuentas generadas por seed_load.")
+        parser.add_argument('--pausa-ms', type=int, default=0, help="Tiempo de lectura entre páginas.")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Segundos máximos por petición.")
+        parser.add_argument('--semilla', type=int, default=None)
+
+    def handle(self, *args, **options):
+        clientes = list(
+            Cliente.objects.filter(user__username__startswith='carga', user__is_active=True, rut__isnull=False)
+            .select_related('user').order_by('id')[:options['usuarios']]
+        )
+        if len(clientes) < options['usuarios']:
+            raise CommandError(
+                f"Hay {len(clientes)} cuentas de carga y se pidieron {options['usuarios']} usuarios: "
+                "corre `manage.py seed_load` con más --clientes."
+            )
+        productos = list(Producto.objects.filter(stock__gte=100).values_list('id', flat=True))
+        if len(productos) < options['productos_por_compra']:
+            raise CommandError("No hay suficientes productos con stock: corre `manage.py seed_load`.")
+        self.paginas = max(1, math.ceil(Producto.objects.count() / PRODUCTOS_POR_PAGINA))
+        self.productos = productos
+        self.opciones = options
+        self.azar = random.Random(options['semilla'])
+        self.retorno = reverse('core:webpay_retorno')
+
+        registro = Registro()
+        self.stdout.write(
+            f"{options['usuarios']} usuarios x {options['iteraciones']} compras contra {options['url']}..."
+        )
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['usuarios']) as ejecutor:
+            fallas = [
+                f for f in ejecutor.map(
+                    lambda c: self._usuario(c, registro, random.Random(self.azar.random())), clientes,
+                ) if f
+            ]
+        duracion = time.perf_counter() - inicio
+
+        self._reporte(registro, duracion)
+        for falla in fallas[:10]:
+            self.stderr.write(falla)
+        if len(fallas) > 10:
+            self.stderr.write(f"... y {len(fallas) - 10} fallas más.")
+
+    def _pausa(self):
+        if self.opciones['pausa_ms']:
+            time.sleep(self.opciones['pausa_ms'] / 1000)
+
+    def _usuario(self, cliente, registro, azar):
+        """Recorre el flujo de compra; devuelve el texto de la última falla o None."""
+        nav = Navegador(self.opciones['url'], registro, self.opciones['timeout'])
+        try:
+            nav.pedir('login (form)', reverse('core:login'))
+            nav.pedir('login', reverse('core:login'), {
+                'username': cliente.user.username, 'password': self.opciones['clave'],
+            }, esperado=302)
+        except FlujoInterrumpido as e:
+            return f"{cliente.user.username}: {e}"
+
+        falla = None
+        for _ in range(self.opciones['iteraciones']):
+            try:
+                self._compra(nav, cliente, azar)
+                registro.compra()
+            except FlujoInterrumpido as e:
+                falla = f"{cliente.user.username}: {e}"
+                if 'WEBPAY_FALSO' in str(e):
+                    break
+        return falla
+
+    def _compra(self, nav, cliente, azar):
+        nav.pedir('home', reverse('core:home'))
+        self._pausa()
+        nav.pedir('catalogo', f"{reverse('core:catalogo')}?page={azar.randint(1, self.paginas)}")
+        self._pausa()
+        for producto_id in azar.sample(self.productos, self.opciones['productos_por_compra']):
+            nav.pedir('detalle', reverse('core:detalle', args=[producto_id]))
+            nav.pedir('agregar', reverse('core:agregar', args=[producto_id]), {'cantidad': 1}, esperado=302)
+            self._pausa()
+        nav.pedir('carrito', reverse('core:ver_carrito'))
+
+        nav.pedir('checkout (form)', reverse('core:checkout'))
+        telefono = cliente.telefono[4:] if cliente.telefono.startswith('+569') else '12345678'
+        _, envio = nav.pedir('checkout', reverse('core:checkout'), {
+            'first_name': cliente.nombre or 'Carga', 'last_name': cliente.apellido or 'Sintética',
+            'rut': cliente.rut, 'codigo_pais': '+569', 'telefono': telefono,
+            'direccion': cliente.direccion or 'Calle 1', 'comuna': cliente.comuna or 'Concepción',
+            'codigo_postal': cliente.codigo_postal or '4030000',
+        }, esperado=302)
+        coincidencia = resolve(urlsplit(envio).path)
+        if coincidencia.view_name != 'core:seleccion_envio':
+            raise FlujoInterrumpido(f"checkout: redirigió a {envio} (¿sin stock o datos inválidos?)")
+        pedido_id = coincidencia.kwargs['pedido_id']
+
+        nav.pedir('envio (form)', envio)
+        _, pago = nav.pedir('envio', envio, {'opcion_envio': 'despacho'}, esperado=302)
+        nav.pedir('pago (form)', pago)
+        self._pausa()
+
+        _, webpay = nav.pedir('webpay iniciar', reverse('core:iniciar_webpay', args=[pedido_id]), esperado=302)
+        if urlsplit(webpay).path != self.retorno:
+            raise FlujoInterrumpido(
+                f"webpay iniciar: redirigió a {webpay}; el servidor debe correr con WEBPAY_FALSO=1"
+            )
+        nav.pedir('webpay retorno', webpay)
+
+    def _reporte(self, registro, duracion):
+        total = sum(len(t) for t in registro.tiempos.values())
+        self.stdout.write(
+            f"\n{'endpoint':<17} {'n':>7} {'errores':>8} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}"
+        )
+        for endpoint, tiempos in registro.tiempos.items():
+            ordenados = sorted(tiempos)
+            self.stdout.write(
+                f"{endpoint:<17} {len(ordenados):>7} {registro.errores[endpoint]:>8} "
+                f"{len(ordenados) / duracion:>8.1f} {percentil(ordenados, 50):>7.1f}ms "
+                f"{percentil(ordenados, 95):>7.1f}ms {percentil(ordenados, 99):>7.1f}ms {ordenados[-1]:>7.1f}ms"
+            )
+        errores = sum(registro.errores.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{total} peticiones en {duracion:.1f}s ({total / duracion:.1f} req/s), {errores} errores; "
+            f"{registro.compras} compras completas ({registro.compras / duracion:.2f} compras/s)."
+        ))
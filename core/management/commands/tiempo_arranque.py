@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.arranque import diferidos_cargados, medir_arranque
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque en frío de un worker (django.setup, WSGI y URLconf) con `python -X importtime` "
+        "y muestra los paquetes y módulos que más tardan en importarse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help="Módulos más lentos a listar.")
+        parser.add_argument('--repeticiones', type=int, default=3, help="Se informa la mediana de N arranques.")
+        parser.add_argument(
+            '--presupuesto-ms', type=float, default=settings.ARRANQUE_PRESUPUESTO_MS,
+            help="Falla si el arranque supera este tiempo.",
+        )
+
+    def handle(self, *args, **options):
+        mediciones = sorted((medir_arranque() for _ in range(max(1, options['repeticiones']))), key=lambda r: r['total_ms'])
+        resultado = mediciones[len(mediciones) // 2]
+
+        self.stdout.write(
+            f"django.setup(): {resultado['setup_ms']:.0f}ms | WSGI y middleware: {resultado['wsgi_ms']:.0f}ms | "
+            f"URLconf y vistas: {resultado['urls_ms']:.0f}ms | total: {resultado['total_ms']:.0f}ms"
+        )
+
+        self.stdout.write(f"\n{'paquete':<32} {'import propio':>14}")
+        paquetes = sorted(resultado['por_paquete'].items(), key=lambda p: p[1], reverse=True)
+        for nombre, propio in paquetes[:options['top']]:
+            self.stdout.write(f"{nombre:<32} {propio / 1000:>12.1f}ms")
+
+        self.stdout.write(f"\n{'módulo':<48} {'propio':>9} {'acumulado':>10}")
+        modulos = sorted(resultado['modulos'], key=lambda m: m[1], reverse=True)
+        for nombre, propio, acumulado in modulos[:options['top']]:
+            self.stdout.write(f"{nombre:<48} {propio / 1000:>7.1f}ms {acumulado / 1000:>8.1f}ms")
+
+        problemas = []
+        diferidos = diferidos_cargados(resultado)
+        if diferidos:
+            problemas.append(f"se importaron al arrancar módulos que deben cargarse al usarse: {', '.join(diferidos[:5])}")
+        if resultado['total_ms'] > options['presupuesto_ms']:
+            problemas.append(f"el arranque tomó {resultado['total_ms']:.0f}ms (presupuesto {options['presupuesto_ms']:.0f}ms)")
+        if problemas:
+            raise CommandError('; '.join(problemas))
+        self.stdout.write(self.style.SUCCESS(f"\nDentro del presupuesto de {options['presupuesto_ms']:.0f}ms."))
@@ -0,0 +1,125 @@
+"""
+Servicio de archivos de MEDIA_ROOT (imágenes de productos).
+
+Responde con Cache-Control, ETag y Last-Modified (304 si el navegador ya
+tiene la versión vigente) y con rangos de bytes (206). Con MEDIA_SENDFILE
+la transferencia la hace el proxy frontal: nginx (X-Accel-Redirect) o
+Apache/lighttpd (X-Sendfile), y el worker solo responde las cabeceras.
+Sin proxy, FileResponse usa wsgi.file_wrapper (sendfile) si el servidor lo ofrece.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+TAMANO_BLOQUE = 64 * 1024
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def etag_archivo(estado):
+    return f'"{int(estado.st_mtime):x}-{estado.st_size:x}"'
+
+
+def rango_solicitado(cabecera, tamano):
+    """
+    (inicio, fin) inclusivos de un Range 'bytes=a-b', 'bytes=a-' o 'bytes=-n'.
+
+    Devuelve None si no hay rango (o es múltiple, que se responde completo)
+    y lanza ValueError si no se puede satisfacer.
+    """
+    coincidencia = RANGO.match(cabecera.strip()) if cabecera else None
+    if coincidencia is None:
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        sufijo = int(fin)
+        if sufijo == 0:
+            raise ValueError("Rango vacío")
+        return max(tamano - sufijo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        raise ValueError("Rango fuera del archivo")
+    return inicio, fin
+
+
+def _leer_tramo(ruta, inicio, largo):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def _respuesta_proxy(ruta, ruta_relativa, tipo):
+    response = HttpResponse(content_type=tipo)
+    if settings.MEDIA_SENDFILE == 'nginx':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIJO + quote(ruta_relativa)
+    else:
+        response['X-Sendfile'] = ruta
+    return response
+
+
+@require_safe
+def servir_media(request, ruta):
+    try:
+        completa = safe_join(settings.MEDIA_ROOT, ruta)
+    except SuspiciousFileOperation:
+        raise Http404("Archivo no encontrado.")
+    if not os.path.isfile(completa):
+        raise Http404("Archivo no encontrado.")
+
+    estado = os.stat(completa)
+    etag = etag_archivo(estado)
+    cabeceras = {
+        'ETag': etag,
+        'Last-Modified': http_date(estado.st_mtime),
+        'Cache-Control': f"public, max-age={settings.MEDIA_MAX_AGE}",
+        'Accept-Ranges': 'bytes',
+    }
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=int(estado.st_mtime))
+    if condicional is not None:
+        response = condicional
+    else:
+        tipo = mimetypes.guess_type(completa)[0] or 'application/octet-stream'
+        if settings.MEDIA_SENDFILE:
+            # El proxy sirve el archivo (y resuelve los rangos) desde su propia ubicación interna
+            response = _respuesta_proxy(completa, ruta, tipo)
+        else:
+            rango = None
+            if_range = request.headers.get('If-Range')
+            if if_range is None or if_range == etag:
+                try:
+                    rango = rango_solicitado(request.headers.get('Range'), estado.st_size)
+                except ValueError:
+                    response = HttpResponse(status=416)
+                    response['Content-Range'] = f"bytes */{estado.st_size}"
+                    return response
+
+            if rango is None:
+                response = FileResponse(open(completa, 'rb'), content_type=tipo)
+            else:
+                inicio, fin = rango
+                response = StreamingHttpResponse(
+                    _leer_tramo(completa, inicio, fin - inicio + 1), status=206, content_type=tipo,
+                )
+                response['Content-Range'] = f"bytes {inicio}-{fin}/{estado.st_size}"
+                response['Content-Length'] = str(fin - inicio + 1)
+
+    for nombre, valor in cabeceras.items():
+        response[nombre] = valor
+    return response
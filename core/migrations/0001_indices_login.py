@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import Index
+from django.db.models.functions import Lower
+
+# auth_user es de Django: los índices se crean a mano, sin pasar por el estado del modelo
+INDICES = [
+    Index(Lower('username'), name='auth_user_username_lower_idx'),
+    Index(Lower('email'), name='auth_user_email_lower_idx'),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if not schema_editor.connection.features.supports_expression_indexes:
+        return
+    User = apps.get_model('auth', 'User')
+    for indice in INDICES:
+        schema_editor.add_index(User, indice)
+
+
+def borrar_indices(apps, schema_editor):
+    if not schema_editor.connection.features.supports_expression_indexes:
+        return
+    User = apps.get_model('auth', 'User')
+    for indice in INDICES:
+        schema_editor.remove_index(User, indice)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
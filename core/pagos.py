@@ -0,0 +1,38 @@
+"""
+Registro de pasarelas de pago con carga diferida.
+
+PASARELAS_PAGO asocia un nombre ('webpay') con la ruta de una fábrica que
+devuelve un objeto con `create` y `commit`. La ruta se resuelve con
+import_string la primera vez que se usa: el SDK de Transbank (y requests, que
+arrastra) no se importa al arrancar cada worker ni en los comandos de cron.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+@lru_cache(maxsize=None)
+def _fabrica(ruta):
+    return import_string(ruta)
+
+
+def pasarela(nombre):
+    """Una transacción nueva de la pasarela `nombre` según PASARELAS_PAGO."""
+    try:
+        ruta = settings.PASARELAS_PAGO[nombre]
+    except KeyError:
+        raise ImproperlyConfigured(f"No hay una pasarela de pago '{nombre}' en PASARELAS_PAGO.")
+    return _fabrica(ruta)()
+
+
+def webpay_transbank():
+    """Webpay Plus en el ambiente de integración de Transbank."""
+    from transbank.common.integration_api_keys import IntegrationApiKeys
+    from transbank.common.integration_commerce_codes import IntegrationCommerceCodes
+    from transbank.common.integration_type import IntegrationType
+    from transbank.common.options import WebpayOptions
+    from transbank.webpay.webpay_plus.transaction import Transaction
+
+    return Transaction(WebpayOptions(IntegrationCommerceCodes.WEBPAY_PLUS, IntegrationApiKeys.WEBPAY, IntegrationType.TEST))
@@ -0,0 +1,165 @@
+"""
+Perfilado por petición (opt-in con PERFILADO_ACTIVO, muestreado con PERFILADO_MUESTREO).
+
+Mide consultas SQL (cantidad y tiempo, en todas las bases), render de
+plantillas (descontando el SQL que se ejecuta dentro del render) y llamadas
+externas marcadas con `medir_externo` (Transbank, SMTP). El resultado sale
+como cabecera Server-Timing y como una línea JSON en el logger
+'vivesano.perfilado'; las consultas repetidas (firma de N+1) se listan y, si
+la petición supera PERFILADO_LENTO_MS, se vuelca la lista completa de SQL.
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('vivesano.perfilado')
+
+_perfil = ContextVar('perfil', default=None)
+
+
+class Perfil:
+    def __init__(self):
+        self.consultas = []
+        self.sql = 0.0
+        self.plantillas = 0.0
+        self.sql_en_plantillas = 0.0
+        self.externo = defaultdict(float)
+        self._renders_abiertos = 0
+
+    def registrar_consulta(self, alias, sql, segundos):
+        self.consultas.append((alias, sql, segundos))
+        self.sql += segundos
+        if self._renders_abiertos:
+            self.sql_en_plantillas += segundos
+
+    def duplicadas(self):
+        """SQL idénticas (mismo texto, distintos parámetros) ejecutadas PERFILADO_UMBRAL_DUPLICADAS veces o más."""
+        conteo = Counter(sql for _alias, sql, _s in self.consultas)
+        return [
+            {'sql': sql, 'veces': veces}
+            for sql, veces in conteo.most_common()
+            if veces >= settings.PERFILADO_UMBRAL_DUPLICADAS
+        ]
+
+
+def _medir_consulta(alias):
+    def envoltura(execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            perfil = _perfil.get()
+            if perfil is not None:
+                perfil.registrar_consulta(alias, sql, time.perf_counter() - inicio)
+    return envoltura
+
+
+@contextmanager
+def medir_externo(servicio):
+    """Suma al perfil en curso el tiempo de una llamada a un servicio externo (no hace nada fuera de una petición perfilada)."""
+    perfil = _perfil.get()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if perfil is not None:
+            perfil.externo[servicio] += time.perf_counter() - inicio
+
+
+class _PlantillaMedida:
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        perfil = _perfil.get()
+        if perfil is None:
+            return self.plantilla.render(context, request)
+        perfil._renders_abiertos += 1
+        inicio = time.perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            perfil._renders_abiertos -= 1
+            # Un render_to_string dentro de otro render no se cuenta dos veces
+            if not perfil._renders_abiertos:
+                perfil.plantillas += time.perf_counter() - inicio
+
+
+class PlantillasDjango(DjangoTemplates):
+    """Backend DjangoTemplates que mide el render cuando la petición se está perfilando."""
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name))
+
+
+def _server_timing(perfil, total):
+    partes = [
+        f'sql;dur={perfil.sql * 1000:.1f};desc="{len(perfil.consultas)} consultas"',
+        f'tpl;dur={(perfil.plantillas - perfil.sql_en_plantillas) * 1000:.1f}',
+    ]
+    partes += [f'ext-{servicio};dur={segundos * 1000:.1f}' for servicio, segundos in perfil.externo.items()]
+    partes.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(partes)
+
+
+class PerfiladoMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERFILADO_ACTIVO:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PERFILADO_MUESTREO:
+            return self.get_response(request)
+
+        perfil = Perfil()
+        token = _perfil.set(perfil)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(_medir_consulta(conexion.alias)))
+                response = self.get_response(request)
+        finally:
+            _perfil.reset(token)
+        total = time.perf_counter() - inicio
+
+        response['Server-Timing'] = _server_timing(perfil, total)
+        self._registrar(request, response, perfil, total)
+        return response
+
+    def _registrar(self, request, response, perfil, total):
+        lento = total * 1000 >= settings.PERFILADO_LENTO_MS
+        duplicadas = perfil.duplicadas()
+        linea = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'sql_consultas': len(perfil.consultas),
+            'sql_ms': round(perfil.sql * 1000, 1),
+            'plantillas_ms': round((perfil.plantillas - perfil.sql_en_plantillas) * 1000, 1),
+            'externo_ms': {servicio: round(s * 1000, 1) for servicio, s in perfil.externo.items()},
+            'duplicadas': duplicadas,
+        }
+        if lento:
+            linea['consultas'] = [
+                {'bd': alias, 'sql': sql, 'ms': round(s * 1000, 2)} for alias, sql, s in perfil.consultas
+            ]
+        nivel = logging.WARNING if lento or duplicadas else logging.INFO
+        logger.log(nivel, json.dumps(linea, ensure_ascii=False))
@@ -0,0 +1,66 @@
+"""
+RUT chileno: dígito verificador, validación y forma canónica.
+
+La forma canónica es la única que se guarda en Cliente.rut: el cuerpo sin puntos
+ni ceros a la izquierda, un guion y el dígito verificador en mayúscula
+('12345678-9', '7654321-K'). Así '12.345.678-9', '12345678-9' y '123456789' son
+el mismo valor para el índice único y se buscan con una igualdad exacta.
+
+`validar_ruts` valida una lista de RUT sin pasar por formularios; la validación
+de un RUT suelto usa el mismo código.
+"""
+
+# Los pesos del módulo 11 se repiten 2..7 desde la derecha: cada grupo de tres
+# dígitos pesa (2, 3, 4) o (5, 6, 7), así que la suma sale de tablas de 1000 entradas.
+_PESOS_234 = tuple(2 * (x % 10) + 3 * (x // 10 % 10) + 4 * (x // 100) for x in range(1000))
+_PESOS_567 = tuple(5 * (x % 10) + 6 * (x // 10 % 10) + 7 * (x // 100) for x in range(1000))
+_DIGITOS = '0123456789K'
+
+# Cuerpos de 7 u 8 dígitos, como los que emite el Registro Civil
+CUERPO_MINIMO = 1_000_000
+CUERPO_MAXIMO = 99_999_999
+
+
+def calcular_dv(cuerpo):
+    """Dígito verificador (módulo 11) del cuerpo numérico de un RUT."""
+    n, suma, tablas = int(cuerpo), 0, (_PESOS_234, _PESOS_567)
+    grupo = 0
+    while n:
+        suma += tablas[grupo % 2][n % 1000]
+        n //= 1000
+        grupo += 1
+    return _DIGITOS[-suma % 11]
+
+
+def validar_ruts(ruts):
+    """
+    Forma canónica de cada RUT de `ruts`, o None si es inválido, en el mismo orden.
+
+    Acepta cualquier escritura (con o sin puntos y guion, 'k' minúscula).
+    """
+    a, b, digitos = _PESOS_234, _PESOS_567, _DIGITOS
+    resultado = []
+    agregar = resultado.append
+    for rut in ruts:
+        limpio = rut.replace('.', '').replace('-', '').strip().upper() if rut else ''
+        cuerpo = limpio[:-1]
+        if not (cuerpo.isascii() and cuerpo.isdigit()):
+            agregar(None)
+            continue
+        n = int(cuerpo)
+        dv = limpio[-1]
+        # Cuerpos de hasta 8 dígitos: tres grupos bastan
+        if CUERPO_MINIMO <= n <= CUERPO_MAXIMO and digitos[-(a[n % 1000] + b[n // 1000 % 1000] + a[n // 1000000]) % 11] == dv:
+            agregar(f"{n}-{dv}")
+        else:
+            agregar(None)
+    return resultado
+
+
+def normalizar_rut(rut):
+    """Forma canónica de `rut`, o None si no es un RUT válido."""
+    return validar_ruts((rut,))[0]
+
+
+def validar_rut_chileno(rut):
+    return normalizar_rut(rut) is not None
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+VALORES_PERMITIDOS = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'},
+}
+
+
+def _opcion(nombre, valor):
+    valor = str(valor).upper()
+    if valor not in VALORES_PERMITIDOS[nombre]:
+        raise ImproperlyConfigured(f"Valor inválido para PRAGMA {nombre}: {valor}")
+    return valor
+
+
+def _entero(nombre, valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ImproperlyConfigured(f"Valor inválido para PRAGMA {nombre}: {valor!r}") from None
+
+
+def pragmas():
+    """PRAGMA de rendimiento para SQLite según la configuración (variables de entorno SQLITE_*)."""
+    return [
+        f"journal_mode={_opcion('journal_mode', settings.SQLITE_JOURNAL_MODE)}",
+        f"synchronous={_opcion('synchronous', settings.SQLITE_SYNCHRONOUS)}",
+        f"busy_timeout={_entero('busy_timeout', settings.SQLITE_BUSY_TIMEOUT)}",
+        f"mmap_size={_entero('mmap_size', settings.SQLITE_MMAP_SIZE)}",
+        f"cache_size={_entero('cache_size', settings.SQLITE_CACHE_SIZE)}",
+        f"temp_store={_opcion('temp_store', settings.SQLITE_TEMP_STORE)}",
+    ]
+
+
+def configurar_conexion(sender, connection, **kwargs):
+    """Receptor de `connection_created`: aplica los PRAGMA a cada conexión SQLite nueva."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma in pragmas():
+            cursor.execute(f"PRAGMA {pragma}")
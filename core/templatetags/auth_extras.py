@@ -1,13 +1,10 @@
 from django import template
-from django.contrib.auth.models import Group
 
 register = template.Library()
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    try:
-        group = Group.objects.get(name=group_name)
-    except Group.DoesNotExist:
-        return False
-        
-    return group in user.groups.all()
\ No newline at end of file
+    # Los nombres se leen una vez por petición aunque el navbar pregunte por varios grupos
+    if not hasattr(user, '_nombres_grupos'):
+        user._nombres_grupos = set(user.groups.values_list('name', flat=True)) if user.is_authenticated else set()
+    return group_name in user._nombres_grupos
\ No newline at end of file
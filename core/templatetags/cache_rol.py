@@ -0,0 +1,47 @@
+from django import template
+
+from core.cache import MARCADOR_CSRF, cache, clave, leer, rol_usuario
+
+register = template.Library()
+
+
+class CacheRolNode(template.Node):
+    def __init__(self, nodelist, namespace, ttl, variaciones):
+        self.nodelist = nodelist
+        self.namespace = namespace
+        self.ttl = ttl
+        self.variaciones = variaciones
+
+    def render(self, context):
+        namespace = self.namespace.resolve(context)
+        request = context.get('request')
+        rol = rol_usuario(request) if request is not None else 'anonimo'
+        clave_cache = clave(namespace, 'fragmento', rol, *(v.resolve(context) for v in self.variaciones))
+
+        html = leer(namespace, clave_cache)
+        if html is None:
+            # El token CSRF es propio de cada visitante: se guarda un marcador en su lugar
+            with context.push(csrf_token=MARCADOR_CSRF):
+                html = self.nodelist.render(context)
+            cache.set(clave_cache, html, self.ttl.resolve(context))
+        return html.replace(MARCADOR_CSRF, str(context.get('csrf_token', '')))
+
+
+@register.tag
+def cache_rol(parser, token):
+    """
+    Cachea un fragmento por rol de usuario dentro de un espacio de nombres versionado.
+
+    Uso: {% cache_rol 'catalogo' 300 page_obj.number request.GET.categoria %} ... {% endcache_rol %}
+    """
+    partes = token.split_contents()
+    if len(partes) < 3:
+        raise template.TemplateSyntaxError(f"'{partes[0]}' necesita un espacio de nombres y un TTL.")
+    nodelist = parser.parse(('endcache_rol',))
+    parser.delete_first_token()
+    return CacheRolNode(
+        nodelist,
+        parser.compile_filter(partes[1]),
+        parser.compile_filter(partes[2]),
+        [parser.compile_filter(p) for p in partes[3:]],
+    )
@@ -5,6 +5,7 @@ app_name = 'core'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('salud/', views.salud, name='salud'),
     path('catalogo/', views.catalogo, name='catalogo'),
     path('producto/<int:producto_id>/', views.detalle_producto, name='detalle'),
     
@@ -1,23 +1,31 @@
+import logging
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
-from django.contrib.auth.models import User, Group
+from django.contrib.auth.models import Group
 from django.contrib import messages
 from django.core.paginator import Paginator
+from django.db import DatabaseError, connection, transaction
+from django.http import JsonResponse
 from django.utils import timezone
 import time
-# Transbank
-from transbank.webpay.webpay_plus.transaction import Transaction
-from transbank.common.options import WebpayOptions
-from transbank.common.integration_commerce_codes import IntegrationCommerceCodes
-from transbank.common.integration_api_keys import IntegrationApiKeys
-from transbank.common.integration_type import IntegrationType
-
-from gestion.models import Producto, Cliente, Pedido, DetallePedido, Notificacion
+
+from gestion.models import Producto, Cliente, Pedido, PedidoArchivado, DetallePedido, Notificacion
+from gestion.alertas import abrir_alerta
+from gestion.inventario import mover_stock
+from gestion.tarifas import cotizar
+from gestion.totales import fijar_envio, fijar_lineas
+from gestion.ventas import registrar_venta
+from .acceso import limpiar_fallos, registrar_fallo, segundos_bloqueado, usuario_por_identificador
 from .carrito import Carrito
+from .perfilado import medir_externo
+from .pagos import pasarela
 from .forms import DatosEnvioForm, RegistroClienteForm, PerfilUsuarioForm
 
+logger = logging.getLogger('vivesano.salud')
+
 # ---------------------------------------------------------
 # VISTAS GENERALES
 # ---------------------------------------------------------
@@ -26,6 +34,18 @@ def home(request):
     productos_destacados = Producto.objects.filter(stock__gt=0).order_by('-id')[:4]
     return render(request, 'core/home.html', {'productos': productos_destacados})
 
+def salud(request):
+    """Readiness check para el balanceador: responde 503 si la base de datos no contesta."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except DatabaseError:
+        # El detalle (host, usuario, motivo) va al log, no a una URL pública
+        logger.exception("La base de datos no responde al readiness check")
+        return JsonResponse({'estado': 'error'}, status=503)
+    return JsonResponse({'estado': 'ok', 'base_datos': connection.vendor})
+
 def catalogo(request):
     productos_list = Producto.objects.all().order_by('id')
     
@@ -97,9 +117,18 @@ def limpiar_carrito(request):
 
 def ver_carrito(request):
     carrito = Carrito(request)
+    total = carrito.obtener_total_precio()
+    envio = None
+    if len(carrito):
+        # Despacho estimado a la dirección del cliente; sin ella, la tarifa general
+        destino = ('', '')
+        if request.user.is_authenticated:
+            destino = Cliente.objects.filter(user=request.user).values_list('comuna', 'codigo_postal').first() or destino
+        envio = cotizar(*destino, carrito.obtener_peso_total(), total)
     return render(request, 'core/carrito.html', {
         'carrito': carrito,
-        'total': carrito.obtener_total_precio()
+        'total': total,
+        'envio': envio,
     })
 
 # ---------------------------------------------------------
@@ -120,14 +149,25 @@ def registro(request):
 def login_usuario(request):
     if request.user.is_authenticated: return redirect('core:home')
     if request.method == 'POST':
+        identificador = request.POST.get('username', '')
+        usuario = usuario_por_identificador(identificador)
+        espera = segundos_bloqueado(request, identificador, usuario)
+        if espera:
+            # Se corta antes de calcular el hash de la contraseña
+            messages.error(request, f"Demasiados intentos fallidos. Intenta de nuevo en {(espera + 59) // 60} minuto(s).")
+            form = AuthenticationForm(initial={'username': identificador})
+            return render(request, 'core/login.html', {'form': form}, status=429)
+
         data = request.POST.copy()
-        try: data['username'] = User.objects.get(username__iexact=data.get('username')).username
-        except User.DoesNotExist: pass 
+        if usuario: data['username'] = usuario.username
         form = AuthenticationForm(request, data=data)
         if form.is_valid():
+            limpiar_fallos(request, identificador, usuario)
             login(request, form.get_user())
             return redirect('core:home')
-        else: messages.error(request, "Usuario o contraseña incorrectos.")
+        else:
+            registrar_fallo(request, identificador, usuario)
+            messages.error(request, "Usuario o contraseña incorrectos.")
     else: form = AuthenticationForm()
     return render(request, 'core/login.html', {'form': form})
 
@@ -164,15 +204,20 @@ def mis_pedidos(request):
     try:
         cliente = Cliente.objects.get(user=request.user)
         pedidos = Pedido.objects.filter(cliente=cliente).order_by('-fecha')
-    except Cliente.DoesNotExist: pedidos = []
-    return render(request, 'core/mis_pedidos.html', {'pedidos': pedidos})
+        # Los entregados de hace más de un año y los carritos abandonados están en el archivo (gestion.retencion)
+        archivados = PedidoArchivado.objects.filter(cliente=cliente).order_by('-fecha')
+    except Cliente.DoesNotExist: cliente, pedidos, archivados = None, [], []
+    return render(request, 'core/mis_pedidos.html', {'pedidos': pedidos, 'archivados': archivados, 'cliente': cliente})
 
 @login_required
 def detalle_pedido_cliente(request, pedido_id):
     try:
         cliente = Cliente.objects.get(user=request.user)
-        pedido = get_object_or_404(Pedido, id=pedido_id, cliente=cliente)
+        pedido = Pedido.objects.prefetch_related('detalles__producto').filter(id=pedido_id, cliente=cliente).first()
     except Cliente.DoesNotExist: return redirect('core:home')
+    if pedido is None:
+        archivado = get_object_or_404(PedidoArchivado, id_original=pedido_id, cliente=cliente)
+        return render(request, 'core/detalle_pedido_archivado.html', {'pedido': archivado})
 
     estado = pedido.estado
     progreso = {
@@ -196,13 +241,13 @@ def reservar_producto(request, producto_id):
         return redirect('core:perfil')
 
     # Marcamos es_reserva=True para la memoria del pedido
-    pedido = Pedido.objects.create(
+    pedido = fijar_lineas(Pedido(
         cliente=cliente, 
-        total=producto.precio, 
         estado='Reserva Pendiente', 
         tipo_entrega='Despacho',
         es_reserva=True 
-    )
+    ), [(producto.precio, 1, producto.peso_gramos)])
+    pedido.save()
     DetallePedido.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unitario=producto.precio)
 
     try:
@@ -211,6 +256,7 @@ def reservar_producto(request, producto_id):
             destinatario_grupo=grupo, 
             pedido=pedido, 
             mensaje=f"SOLICITUD RESERVA: {cliente.nombre} solicita {producto.nombre}.", 
+            tipo='RESERVA',
             estado='PENDIENTE'
         )
     except Group.DoesNotExist: pass
@@ -250,24 +296,34 @@ def checkout(request):
             
             cliente.save()
 
-            for item in carrito.obtener_items():
-                p = Producto.objects.get(id=item['producto_id'])
+            items = carrito.obtener_items()
+            productos = Producto.objects.in_bulk([item['producto_id'] for item in items])
+            for item in items:
+                p = productos.get(item['producto_id'])
+                if p is None:
+                    messages.error(request, f"{item['nombre']} ya no está disponible.")
+                    return redirect('core:ver_carrito')
                 if p.stock < item['cantidad']:
                     messages.error(request, f"Sin stock de {p.nombre}.")
                     return redirect('core:ver_carrito')
 
+            # El envío se elige en el paso siguiente: por ahora el total es solo el de los productos
             pedido = Pedido.objects.filter(cliente=cliente, estado='Pendiente').first()
             if pedido:
                 pedido.fecha = timezone.now()
-                pedido.total = carrito.obtener_total_precio()
-                pedido.save()
                 pedido.detalles.all().delete()
             else:
-                pedido = Pedido.objects.create(cliente=cliente, total=carrito.obtener_total_precio(), estado='Pendiente')
+                pedido = Pedido(cliente=cliente, estado='Pendiente')
+            fijar_envio(pedido, 0)
+            fijar_lineas(pedido, (
+                (item['precio'], item['cantidad'], productos[item['producto_id']].peso_gramos) for item in items
+            ))
+            pedido.save()
 
-            for item in carrito.obtener_items():
-                p = get_object_or_404(Producto, id=item['producto_id'])
-                DetallePedido.objects.create(pedido=pedido, producto=p, cantidad=item['cantidad'], precio_unitario=item['precio'])
+            DetallePedido.objects.bulk_create([
+                DetallePedido(pedido=pedido, producto=productos[item['producto_id']], cantidad=item['cantidad'], precio_unitario=item['precio'])
+                for item in items
+            ])
             
             return redirect('core:seleccion_envio', pedido_id=pedido.id)
     else:
@@ -304,27 +360,22 @@ def checkout_reserva(request, pedido_id):
 
 @login_required
 def seleccion_envio(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id, cliente__user=request.user)
+    pedido = get_object_or_404(Pedido.objects.select_related('cliente'), id=pedido_id, cliente__user=request.user)
     
-    # 1. Calculamos subtotal real sumando los items
-    subtotal_productos = sum(d.precio_unitario * d.cantidad for d in pedido.detalles.all())
-    COSTO_ENVIO_FIJO = 5990 
-    UMBRAL_GRATIS = 25000
-    aplica_gratis = subtotal_productos > UMBRAL_GRATIS
+    # Subtotal y peso se guardaron al escribir las líneas: no hace falta recorrerlas
+    cliente = pedido.cliente
+    envio = cotizar(cliente.comuna, cliente.codigo_postal, pedido.peso_gramos, pedido.subtotal)
 
     if request.method == 'POST':
         tipo = request.POST.get('opcion_envio') 
 
         if tipo == 'despacho':
             pedido.tipo_entrega = 'Despacho'
-            if not aplica_gratis:
-                pedido.total = subtotal_productos + COSTO_ENVIO_FIJO
-            else:
-                pedido.total = subtotal_productos
+            fijar_envio(pedido, envio['total'])
         
         elif tipo == 'retiro':
             pedido.tipo_entrega = 'Retiro'
-            pedido.total = subtotal_productos
+            fijar_envio(pedido, 0)
 
         pedido.save()
         return redirect('core:seleccion_pago', pedido_id=pedido.id)
@@ -332,14 +383,15 @@ def seleccion_envio(request, pedido_id):
     # Pasamos las variables con el nombre correcto al template
     context = {
         'pedido': pedido,
-        'subtotal': subtotal_productos,
-        'costo_envio': COSTO_ENVIO_FIJO,
-        'aplica_gratis': aplica_gratis
+        'subtotal': pedido.subtotal,
+        'costo_envio': envio['costo'],
+        'aplica_gratis': envio['aplica_gratis'],
+        'envio': envio,
     }
     return render(request, 'core/seleccion_envio.html', context)
 
 def seleccion_pago(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id)
+    pedido = get_object_or_404(Pedido.objects.select_related('cliente'), id=pedido_id)
     return render(request, 'core/seleccion_pago.html', {'pedido': pedido})
 
 def iniciar_pago_transferencia(request, pedido_id):
@@ -348,8 +400,7 @@ def iniciar_pago_transferencia(request, pedido_id):
     pedido.save()
     try:
         grupo = Group.objects.get(name='Atencion al cliente')
-        if not Notificacion.objects.filter(pedido=pedido, mensaje__contains="TRANSFERENCIA").exists():
-            Notificacion.objects.create(destinatario_grupo=grupo, pedido=pedido, mensaje=f"TRANSFERENCIA: {pedido.cliente.nombre} seleccionó transf.", estado='PENDIENTE')
+        abrir_alerta(pedido, 'TRANSFERENCIA', grupo, f"TRANSFERENCIA: {pedido.cliente.nombre} seleccionó transf.")
     except: pass
     
     Carrito(request).limpiar()
@@ -357,30 +408,32 @@ def iniciar_pago_transferencia(request, pedido_id):
 
 def iniciar_pago_webpay(request, pedido_id):
     pedido = get_object_or_404(Pedido, id=pedido_id)
-    tx = Transaction(WebpayOptions(IntegrationCommerceCodes.WEBPAY_PLUS, IntegrationApiKeys.WEBPAY, IntegrationType.TEST))
+    tx = pasarela('webpay')
     buy_order = f"P-{pedido.id}-{int(time.time())}"
     session_id = f"S-{request.user.id}-{int(time.time())}"
     return_url = request.build_absolute_uri('/webpay/retorno/') 
-    response = tx.create(buy_order, session_id, int(pedido.total), return_url)
+    with medir_externo('transbank'):
+        response = tx.create(buy_order, session_id, int(pedido.total), return_url)
     return redirect(response['url'] + '?token_ws=' + response['token'])
 
 def confirmar_pago_webpay(request):
     token = request.GET.get('token_ws') or request.POST.get('token_ws')
     if not token: return redirect('core:home')
     try:
-        tx = Transaction(WebpayOptions(IntegrationCommerceCodes.WEBPAY_PLUS, IntegrationApiKeys.WEBPAY, IntegrationType.TEST))
-        response = tx.commit(token)
+        tx = pasarela('webpay')
+        with medir_externo('transbank'):
+            response = tx.commit(token)
         if response['response_code'] == 0:
             pedido_id = response['buy_order'].split('-')[1]
             pedido = Pedido.objects.get(id=pedido_id)
-            pedido.estado = 'Pagado (WebPay)'
-            pedido.save()
-            
-            # Si NO es reserva, descontamos stock. Si ES reserva, no hacemos nada (stock 0)
-            if not pedido.es_reserva:
-                for d in pedido.detalles.all():
-                    d.producto.stock -= d.cantidad
-                    d.producto.save()
+            with transaction.atomic():
+                pedido.estado = 'Pagado (WebPay)'
+                pedido.save()
+                
+                # Si NO es reserva, descontamos stock. Si ES reserva, no hacemos nada (stock 0)
+                if not pedido.es_reserva:
+                    mover_stock(pedido, -1)
+                registrar_venta(pedido)
             
             Carrito(request).limpiar()
             return render(request, 'core/exito.html', {'pedido_id': pedido.id})
@@ -0,0 +1,33 @@
+"""
+Webpay falso para pruebas de carga y desarrollo sin red (WEBPAY_FALSO=1 lo registra en PASARELAS_PAGO).
+
+Tiene la misma interfaz que Transaction de Transbank: `create` entrega como
+URL de pago el propio retorno de la tienda, así el navegador vuelve de
+inmediato, y `commit` aprueba cualquier token que haya emitido.
+WEBPAY_FALSO_LATENCIA_MS simula la demora de ida y vuelta a Transbank.
+"""
+import time
+
+from django.conf import settings
+
+PREFIJO_TOKEN = 'FALSO-'
+
+
+def _esperar():
+    if settings.WEBPAY_FALSO_LATENCIA_MS:
+        time.sleep(settings.WEBPAY_FALSO_LATENCIA_MS / 1000)
+
+
+class TransaccionFalsa:
+    def __init__(self, options=None):
+        self.options = options
+
+    def create(self, buy_order, session_id, amount, return_url):
+        _esperar()
+        return {'url': return_url, 'token': f"{PREFIJO_TOKEN}{buy_order}"}
+
+    def commit(self, token):
+        _esperar()
+        if not token.startswith(PREFIJO_TOKEN):
+            return {'response_code': -1, 'status': 'FAILED', 'buy_order': ''}
+        return {'response_code': 0, 'status': 'AUTHORIZED', 'buy_order': token[len(PREFIJO_TOKEN):]}
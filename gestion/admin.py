@@ -1,24 +1,144 @@
-from django.contrib import admin
-from .models import Producto, Cliente, Pedido, DetallePedido, Notificacion
+from django import forms
+from django.contrib import admin, messages
+
+from core.rut import normalizar_rut
+from .models import (
+    ESTADOS_VENDIDOS, Producto, Cliente, Pedido, DetallePedido, Notificacion, CorreoSaliente,
+    PedidoArchivado, NotificacionArchivada, TarifaEnvio,
+)
+from .reservas import liberar_reservas
+from .totales import recalcular_totales
+from .ventas import registrar_venta, revertir_venta
 
 class DetallePedidoInline(admin.TabularInline):
     model = DetallePedido
     extra = 1 
 
+    # Las líneas de un pedido contabilizado ya están en los resúmenes de ventas: no se editan
+    def has_add_permission(self, request, obj=None):
+        return super().has_add_permission(request, obj) and not (obj and obj.contabilizado)
+
+    def has_change_permission(self, request, obj=None):
+        return super().has_change_permission(request, obj) and not (obj and obj.contabilizado)
+
+    def has_delete_permission(self, request, obj=None):
+        return super().has_delete_permission(request, obj) and not (obj and obj.contabilizado)
+
 @admin.register(Pedido)
 class PedidoAdmin(admin.ModelAdmin):
-    list_display = ('id', 'cliente', 'fecha', 'estado', 'total')
+    list_display = ('id', 'cliente', 'fecha', 'estado', 'cantidad_items', 'total')
     list_filter = ('estado', 'fecha')
+    # El total sale de las líneas y del envío (gestion.totales); no se corrige a mano
+    readonly_fields = ('subtotal', 'cantidad_items', 'costo_envio', 'descuento', 'total')
     inlines = [DetallePedidoInline] 
 
+    def get_readonly_fields(self, request, obj=None):
+        # Cambiar el cliente de una venta contabilizada movería sus agregados sin pasar por gestion.clientes
+        if obj and obj.contabilizado:
+            return self.readonly_fields + ('cliente',)
+        return self.readonly_fields
+
+    def _vendido(self, pedido):
+        return Pedido.objects.filter(ESTADOS_VENDIDOS, pk=pedido.pk).exists()
+
+    def save_model(self, request, obj, form, change):
+        anterior = Pedido.objects.get(pk=obj.pk) if change else None
+        super().save_model(request, obj, form, change)
+        # Deja de ser venta (anulado, cancelado...): se revierte con el estado anterior,
+        # que es el que dice el medio de pago
+        if anterior is not None and anterior.contabilizado and not self._vendido(obj):
+            revertir_venta(anterior)
+            obj.contabilizado = False
+            self.message_user(request, f"Pedido #{obj.pk} descontado de las ventas.", messages.INFO)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        pedido = form.instance
+        # Las líneas pudieron cambiar en el inline (solo se puede si no está contabilizado)
+        if not pedido.contabilizado:
+            recalcular_totales(pedido)
+            # Pasó a un estado vendido: se suma con sus líneas y total ya recalculados
+            if self._vendido(pedido) and registrar_venta(pedido):
+                self.message_user(request, f"Pedido #{pedido.pk} sumado a las ventas.", messages.INFO)
+
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'precio', 'stock', 'categoria')
+    list_display = ('nombre', 'precio', 'stock', 'categoria', 'peso_gramos')
     search_fields = ('nombre', 'categoria')
 
+    def save_model(self, request, obj, form, change):
+        stock_anterior = form.initial.get('stock', 0) if change else 0
+        super().save_model(request, obj, form, change)
+
+        # Reposición: el producto estaba agotado y vuelve a tener stock
+        if stock_anterior <= 0 and obj.stock > 0:
+            liberadas = liberar_reservas(obj)
+            if liberadas:
+                self.message_user(request, f"{liberadas} reserva(s) de {obj.nombre} pasaron a 'Disponible para Pago'.", messages.SUCCESS)
+
+class ClienteAdminForm(forms.ModelForm):
+    class Meta:
+        model = Cliente
+        fields = '__all__'
+
+    def clean_rut(self):
+        rut = self.cleaned_data.get('rut')
+        if not rut:
+            return None
+        canonico = normalizar_rut(rut)
+        if canonico is None:
+            raise forms.ValidationError("RUT inválido.")
+        return canonico
+
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'apellido', 'email', 'telefono')
+    form = ClienteAdminForm
+    list_display = ('nombre', 'apellido', 'rut', 'email', 'telefono', 'cantidad_pedidos', 'total_gastado', 'ultimo_pedido')
     search_fields = ('nombre', 'apellido', 'email')
+    readonly_fields = ('cantidad_pedidos', 'total_gastado', 'ultimo_pedido')
+
+    def get_search_results(self, request, queryset, search_term):
+        resultados, duplicados = super().get_search_results(request, queryset, search_term)
+        # Un RUT, escrito como sea, se busca además exacto en su forma canónica (índice único);
+        # un término que solo parece RUT (un teléfono, parte de un correo) sigue encontrando lo de siempre
+        rut = normalizar_rut(search_term)
+        if rut:
+            resultados |= queryset.filter(rut=rut)
+        return resultados, duplicados
+
+admin.site.register(Notificacion)
+
+@admin.register(TarifaEnvio)
+class TarifaEnvioAdmin(admin.ModelAdmin):
+    list_display = ('zona', 'comuna', 'prefijo_postal', 'peso_hasta_gramos', 'costo', 'gratis_desde', 'activa')
+    list_filter = ('activa', 'zona')
+    list_editable = ('costo', 'gratis_desde', 'activa')
+    search_fields = ('zona', 'comuna', '=prefijo_postal')
+
+@admin.register(CorreoSaliente)
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'destinatario', 'asunto', 'estado', 'intentos', 'proximo_intento', 'creado')
+    list_filter = ('estado',)
+    search_fields = ('destinatario', 'asunto')
+
+class HistoricoAdmin(admin.ModelAdmin):
+    """El histórico archivado es de solo lectura."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(PedidoArchivado)
+class PedidoArchivadoAdmin(HistoricoAdmin):
+    list_display = ('id_original', 'cliente', 'fecha', 'estado', 'total', 'archivado')
+    list_filter = ('estado', 'fecha')
+    search_fields = ('=id_original', 'cliente__nombre', 'cliente__apellido', 'cliente__email')
+    list_select_related = ('cliente',)
 
-admin.site.register(Notificacion)
\ No newline at end of file
+@admin.register(NotificacionArchivada)
+class NotificacionArchivadaAdmin(HistoricoAdmin):
+    list_display = ('id_original', 'tipo', 'estado', 'pedido_id_original', 'fecha', 'archivado')
+    list_filter = ('tipo', 'estado')
+    search_fields = ('=id_original', '=pedido_id_original', 'mensaje')
@@ -0,0 +1,31 @@
+"""
+Alertas para Atención al Cliente: una sola abierta por pedido y tipo.
+
+La restricción parcial `notificacion_abierta_unica` lo garantiza en SQLite y
+PostgreSQL, y get_or_create recupera la alerta existente si dos peticiones
+chocan en el INSERT. MySQL no tiene índices parciales: Django omite esa
+restricción allí (solo avisa con models.W036), así que en esas bases se
+bloquea la fila del pedido y las peticiones del mismo pedido se ordenan.
+"""
+from django.db import connections, router, transaction
+
+from .models import Notificacion, Pedido
+
+
+def abrir_alerta(pedido, tipo, grupo, mensaje):
+    """La alerta abierta de `tipo` del pedido o una nueva: devuelve (notificacion, creada)."""
+    base = router.db_for_write(Notificacion)
+
+    def obtener_o_crear():
+        return Notificacion.objects.using(base).get_or_create(
+            pedido=pedido,
+            tipo=tipo,
+            estado__in=Notificacion.ESTADOS_ABIERTOS,
+            defaults={'destinatario_grupo': grupo, 'mensaje': mensaje},
+        )
+
+    if connections[base].features.supports_partial_indexes:
+        return obtener_o_crear()
+    with transaction.atomic(using=base):
+        list(Pedido.objects.using(base).select_for_update().filter(pk=pedido.pk).values_list('pk'))
+        return obtener_o_crear()
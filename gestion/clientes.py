@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
+
+from .models import ESTADOS_VENDIDOS, Cliente, Pedido, PedidoArchivado
+
+TAMANO_LOTE = 1000
+
+# Un pedido cuenta para su cliente si cuenta como venta: los activos con el flag
+# `contabilizado` (gestion.ventas lo marca al pagar y lo quita al anular) y los
+# archivados en un estado vendido, que ya no llevan el flag. La suma, la resta y
+# el recálculo usan esta misma regla.
+CUENTA_ACTIVO = Q(contabilizado=True)
+CUENTA_ARCHIVADO = ESTADOS_VENDIDOS
+
+
+def sumar_pedido(pedido):
+    """Suma un pedido pagado a los agregados de su cliente (un solo UPDATE)."""
+    if not pedido.cliente_id:
+        return
+    Cliente.objects.filter(pk=pedido.cliente_id).update(
+        cantidad_pedidos=F('cantidad_pedidos') + 1,
+        total_gastado=F('total_gastado') + pedido.total,
+        ultimo_pedido=Case(
+            When(Q(ultimo_pedido__isnull=True) | Q(ultimo_pedido__lt=pedido.fecha), then=Value(pedido.fecha)),
+            default=F('ultimo_pedido'),
+        ),
+    )
+
+
+def restar_pedido(pedido):
+    """Descuenta un pedido anulado; la fecha del último pedido se recalcula con los que siguen vigentes."""
+    if not pedido.cliente_id:
+        return
+    ultimo = max(
+        filter(None, [
+            Pedido.objects.filter(CUENTA_ACTIVO, cliente_id=pedido.cliente_id).aggregate(m=Max('fecha'))['m'],
+            PedidoArchivado.objects.filter(CUENTA_ARCHIVADO, cliente_id=pedido.cliente_id).aggregate(m=Max('fecha'))['m'],
+        ]),
+        default=None,
+    )
+    Cliente.objects.filter(pk=pedido.cliente_id).update(
+        cantidad_pedidos=Case(When(cantidad_pedidos__gt=0, then=F('cantidad_pedidos') - 1), default=Value(0)),
+        total_gastado=F('total_gastado') - pedido.total,
+        ultimo_pedido=ultimo,
+    )
+
+
+def _agregados(queryset, ids):
+    return {
+        fila['cliente_id']: fila
+        for fila in queryset.filter(cliente_id__in=ids)
+        .values('cliente_id')
+        .annotate(n=Count('id'), total=Sum('total'), ultimo=Max('fecha'))
+        .order_by()
+    }
+
+
+def recalcular_agregados(lote=TAMANO_LOTE):
+    """
+    Recalcula los agregados de todos los clientes desde los pedidos activos y archivados.
+
+    Si se reconstruyeron las ventas (`recalcular_ventas`), correr después de eso:
+    es lo que deja el flag `contabilizado` de los pedidos activos al día.
+
+    Trabaja por lotes de clientes (dos consultas agrupadas y un bulk_update por
+    lote). Genera (clientes_del_lote, clientes_corregidos) por lote.
+    """
+    ultimo_id = 0
+    while True:
+        clientes = list(
+            Cliente.objects.filter(id__gt=ultimo_id).order_by('id')
+            .only('id', 'cantidad_pedidos', 'total_gastado', 'ultimo_pedido')[:lote]
+        )
+        if not clientes:
+            return
+        ultimo_id = clientes[-1].id
+        ids = [c.id for c in clientes]
+        activos = _agregados(Pedido.objects.filter(CUENTA_ACTIVO), ids)
+        archivados = _agregados(PedidoArchivado.objects.filter(CUENTA_ARCHIVADO), ids)
+
+        corregidos = []
+        for cliente in clientes:
+            filas = [f for f in (activos.get(cliente.id), archivados.get(cliente.id)) if f]
+            esperado = (
+                sum(f['n'] for f in filas),
+                sum((f['total'] for f in filas), Decimal('0')),
+                max((f['ultimo'] for f in filas), default=None),
+            )
+            if (cliente.cantidad_pedidos, cliente.total_gastado, cliente.ultimo_pedido) != esperado:
+                cliente.cantidad_pedidos, cliente.total_gastado, cliente.ultimo_pedido = esperado
+                corregidos.append(cliente)
+
+        with transaction.atomic():
+            Cliente.objects.bulk_update(corregidos, ['cantidad_pedidos', 'total_gastado', 'ultimo_pedido'])
+        yield len(clientes), len(corregidos)
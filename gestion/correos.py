@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from core.perfilado import medir_externo
+
+from .models import CorreoSaliente
+
+TAMANO_LOTE = getattr(settings, 'CORREOS_LOTE', 50)
+MAX_INTENTOS = getattr(settings, 'CORREOS_MAX_INTENTOS', 5)
+REINTENTO_BASE = getattr(settings, 'CORREOS_REINTENTO_BASE', 60)  # segundos
+REINTENTO_MAXIMO = getattr(settings, 'CORREOS_REINTENTO_MAXIMO', 3600)
+# Tiempo que un worker "reserva" un lote para que otro no lo envíe en paralelo
+RESERVA_LOTE = getattr(settings, 'CORREOS_RESERVA_LOTE', 300)
+
+
+def encolar_correo(destinatario, asunto, mensaje, pedido=None):
+    """Deja un correo en la cola. Llamar dentro de la misma transacción que el cambio de estado."""
+    return CorreoSaliente.objects.create(destinatario=destinatario, asunto=asunto, mensaje=mensaje, pedido=pedido)
+
+
+def encolar_correos(correos):
+    """Encola varios CorreoSaliente (sin guardar) con un solo INSERT."""
+    return CorreoSaliente.objects.bulk_create(correos)
+
+
+def espera_reintento(intentos):
+    """Backoff exponencial: 1 min, 2 min, 4 min... hasta REINTENTO_MAXIMO."""
+    return timedelta(seconds=min(REINTENTO_BASE * 2 ** (intentos - 1), REINTENTO_MAXIMO))
+
+
+def _reservar_lote(tamano):
+    ahora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            CorreoSaliente.objects
+            .select_for_update(skip_locked=True)
+            .filter(estado='PENDIENTE', proximo_intento__lte=ahora)
+            .order_by('proximo_intento', 'id')
+            .values_list('id', flat=True)[:tamano]
+        )
+        CorreoSaliente.objects.filter(id__in=ids).update(proximo_intento=ahora + timedelta(seconds=RESERVA_LOTE))
+    return list(CorreoSaliente.objects.filter(id__in=ids).order_by('id'))
+
+
+def _registrar_fallo(correo, error):
+    correo.intentos += 1
+    correo.ultimo_error = f"{type(error).__name__}: {error}"
+    if correo.intentos >= MAX_INTENTOS:
+        correo.estado = 'FALLIDO'
+    else:
+        correo.proximo_intento = timezone.now() + espera_reintento(correo.intentos)
+
+
+def procesar_lote(tamano=TAMANO_LOTE, connection=None):
+    """
+    Envía un lote de correos vencidos sobre una sola conexión SMTP.
+
+    Cada correo se marca por separado: los que fallan se reprograman con
+    backoff y pasan a FALLIDO al agotar MAX_INTENTOS. Devuelve (enviados, fallidos).
+    """
+    correos = _reservar_lote(tamano)
+    if not correos:
+        return 0, 0
+
+    connection = connection or get_connection(fail_silently=False)
+    enviados = fallidos = 0
+    try:
+        with medir_externo('smtp'):
+            connection.open()
+    except Exception as e:
+        # Sin conexión no se envía nada: todo el lote se reintenta más tarde
+        for correo in correos:
+            _registrar_fallo(correo, e)
+        fallidos = len(correos)
+    else:
+        for correo in correos:
+            try:
+                with medir_externo('smtp'):
+                    connection.send_messages([
+                        EmailMessage(correo.asunto, correo.mensaje, settings.EMAIL_HOST_USER, [correo.destinatario])
+                    ])
+            except Exception as e:
+                _registrar_fallo(correo, e)
+                fallidos += 1
+            else:
+                correo.intentos += 1
+                correo.estado = 'ENVIADO'
+                correo.enviado = timezone.now()
+                correo.ultimo_error = ''
+                enviados += 1
+        connection.close()
+
+    CorreoSaliente.objects.bulk_update(
+        correos, ['estado', 'intentos', 'proximo_intento', 'ultimo_error', 'enviado']
+    )
+    return enviados, fallidos
+
+
+def metricas_cola():
+    """Profundidad de la cola por estado, vencidos y antigüedad del pendiente más viejo (segundos)."""
+    ahora = timezone.now()
+    por_estado = dict(
+        CorreoSaliente.objects.values_list('estado').annotate(n=Count('id')).order_by()
+    )
+    pendientes = CorreoSaliente.objects.filter(estado='PENDIENTE')
+    mas_antiguo = pendientes.aggregate(m=Min('creado'))['m']
+    return {
+        'pendientes': por_estado.get('PENDIENTE', 0),
+        'enviados': por_estado.get('ENVIADO', 0),
+        'fallidos': por_estado.get('FALLIDO', 0),
+        'vencidos': pendientes.filter(proximo_intento__lte=ahora).count(),
+        'antiguedad_maxima': int((ahora - mas_antiguo).total_seconds()) if mas_antiguo else 0,
+    }
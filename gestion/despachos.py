@@ -0,0 +1,113 @@
+import csv
+
+from django.db import transaction
+
+from .correos import encolar_correos
+from .models import CorreoSaliente, Pedido
+
+LARGO_MAXIMO_CODIGO = 12
+# Más dígitos que esto no cabe en un BigAutoField (y SQLite lanza OverflowError)
+LARGO_MAXIMO_ID = 18
+
+
+def estado_despachado(pedido):
+    """Estado final de un pedido despachado según su medio de pago."""
+    if 'Transferencia' in pedido.estado:
+        return 'Despachado (Transferencia)'
+    return 'Despachado (WebPay)'
+
+
+def correo_despacho(pedido):
+    """Asunto y cuerpo del correo que avisa al cliente que su pedido va en camino."""
+    asunto = f"¡Tu Pedido #{pedido.id} ha sido despachado! 🚚"
+    mensaje = (
+        f"Hola {pedido.cliente.nombre},\n\nTu pedido ya va en camino.\n\n"
+        f"Código de Seguimiento: {pedido.codigo_seguimiento}\n\n"
+        "Puedes revisar el estado en la sección 'Mis Pedidos' de nuestra web.\n\n¡Gracias por preferirnos!"
+    )
+    return asunto, mensaje
+
+
+def leer_filas(lineas):
+    """Convierte líneas CSV `pedido_id,codigo_seguimiento` en filas numeradas (la cabecera es opcional)."""
+    filas = []
+    for numero, columnas in enumerate(csv.reader(lineas), start=1):
+        if not any(c.strip() for c in columnas):
+            continue
+        if numero == 1 and columnas[0].strip().lower() == 'pedido_id':
+            continue
+        filas.append({
+            'linea': numero,
+            'pedido_id': columnas[0].strip(),
+            'codigo': columnas[1].strip() if len(columnas) > 1 else '',
+        })
+    return filas
+
+
+def _id_pedido(texto):
+    """El id como entero, o None si no son solo dígitos ASCII ('²'.isdigit() es True y int('²') falla)."""
+    if texto.isascii() and texto.isdigit() and len(texto) <= LARGO_MAXIMO_ID:
+        return int(texto)
+    return None
+
+
+def despachar_pedidos(filas):
+    """
+    Marca como despachados todos los pedidos válidos del lote.
+
+    Los pedidos se validan con una sola consulta y los cambios de estado se
+    aplican con un único bulk_update; los avisos a los clientes quedan en la
+    cola de correos dentro de la misma transacción. Devuelve
+    (resultados, correos_encolados), con un resultado por fila:
+    {'linea', 'pedido_id', 'codigo', 'ok', 'mensaje'}.
+    """
+    ids = {_id_pedido(f['pedido_id']) for f in filas} - {None}
+    resultados = []
+    despachados = []
+
+    with transaction.atomic():
+        pedidos = Pedido.objects.select_for_update(of=('self',)).select_related('cliente').in_bulk(ids)
+        vistos = set()
+
+        for fila in filas:
+            resultado = dict(fila, ok=False, mensaje='')
+            resultados.append(resultado)
+            pedido_id = _id_pedido(fila['pedido_id'])
+            pedido = pedidos.get(pedido_id)
+
+            if pedido_id is None:
+                resultado['mensaje'] = "ID de pedido inválido."
+            elif pedido is None:
+                resultado['mensaje'] = "El pedido no existe."
+            elif pedido.id in vistos:
+                resultado['mensaje'] = "Pedido repetido en el archivo."
+            elif not fila['codigo']:
+                resultado['mensaje'] = "Falta el código de seguimiento."
+            elif len(fila['codigo']) > LARGO_MAXIMO_CODIGO:
+                resultado['mensaje'] = f"El código supera los {LARGO_MAXIMO_CODIGO} caracteres."
+            elif pedido.tipo_entrega == 'Retiro':
+                resultado['mensaje'] = "Es un retiro en tienda, no lleva courier."
+            elif not (pedido.estado.startswith('Pagado') or pedido.estado.startswith('En Preparacion')):
+                resultado['mensaje'] = f"No se puede despachar en estado '{pedido.estado}'."
+            else:
+                pedido.codigo_seguimiento = fila['codigo']
+                pedido.estado = estado_despachado(pedido)
+                despachados.append(pedido)
+                vistos.add(pedido.id)
+                resultado['ok'] = True
+                resultado['mensaje'] = pedido.estado
+
+        Pedido.objects.bulk_update(despachados, ['estado', 'codigo_seguimiento'])
+        correos = encolar_correos(correos_despacho(despachados))
+
+    return resultados, len(correos)
+
+
+def correos_despacho(pedidos):
+    """Arma (sin guardar) los avisos de despacho para los pedidos con correo de cliente."""
+    correos = []
+    for pedido in pedidos:
+        if pedido.cliente and pedido.cliente.email:
+            asunto, mensaje = correo_despacho(pedido)
+            correos.append(CorreoSaliente(destinatario=pedido.cliente.email, asunto=asunto, mensaje=mensaje, pedido=pedido))
+    return correos
@@ -0,0 +1,154 @@
+"""
+Fábricas de datos para tests y cargas de prueba.
+
+Cada función crea un objeto válido con valores únicos por defecto; los
+argumentos con nombre reemplazan cualquier campo.
+"""
+from decimal import Decimal
+from itertools import count
+
+from django.contrib.auth.models import Group, User
+
+from .models import Cliente, DetallePedido, Notificacion, Pedido, Producto
+from .totales import fijar_lineas
+
+GRUPO_LOGISTICA = 'Logistica'
+GRUPO_ATENCION = 'Atencion al cliente'
+
+_secuencia = count(1)
+
+
+def _siguiente():
+    return next(_secuencia)
+
+
+def grupos():
+    """Los dos grupos de staff que usan las vistas y el navbar."""
+    logistica, _ = Group.objects.get_or_create(name=GRUPO_LOGISTICA)
+    atencion, _ = Group.objects.get_or_create(name=GRUPO_ATENCION)
+    return logistica, atencion
+
+
+def crear_producto(**campos):
+    n = _siguiente()
+    datos = {
+        'nombre': f"Producto {n}",
+        'descripcion': f"Descripción del producto {n}",
+        'precio': Decimal('3990'),
+        'stock': 50,
+        'categoria': ('Despensa', 'Bebidas', 'Snacks')[n % 3],
+    }
+    datos.update(campos)
+    return Producto.objects.create(**datos)
+
+
+def crear_usuario(password='clave-segura-123', **campos):
+    n = _siguiente()
+    datos = {'username': f"usuario{n}", 'email': f"usuario{n}@correo.cl", 'first_name': f"Nombre{n}"}
+    datos.update(campos)
+    return User.objects.create_user(password=password, **datos)
+
+
+def crear_staff(*nombres_grupos, **campos):
+    usuario = crear_usuario(is_staff=True, **campos)
+    if nombres_grupos:
+        usuario.groups.set(Group.objects.filter(name__in=nombres_grupos))
+    return usuario
+
+
+def crear_cliente(usuario=None, **campos):
+    n = _siguiente()
+    datos = {
+        'nombre': f"Nombre{n}",
+        'apellido': f"Apellido{n}",
+        'email': usuario.email if usuario else f"cliente{n}@correo.cl",
+        'telefono': '+56912345678',
+        'direccion': f"Calle {n} #123",
+        'comuna': 'Concepción',
+        'codigo_postal': '4030000',
+    }
+    datos.update(campos)
+    return Cliente.objects.create(user=usuario, **datos)
+
+
+def crear_pedido(cliente=None, productos=(), estado='Pagado (WebPay)', **campos):
+    """Pedido con una línea por producto (cantidad 1 salvo que se pase (producto, cantidad))."""
+    lineas = [p if isinstance(p, tuple) else (p, 1) for p in productos]
+    pedido = fijar_lineas(Pedido(cliente=cliente, estado=estado, **campos), [(p.precio, c, p.peso_gramos) for p, c in lineas])
+    pedido.save()
+    DetallePedido.objects.bulk_create([
+        DetallePedido(pedido=pedido, producto=p, cantidad=cantidad, precio_unitario=p.precio)
+        for p, cantidad in lineas
+    ])
+    return pedido
+
+
+def crear_notificacion(pedido, tipo='OTRO', estado='PENDIENTE', **campos):
+    _logistica, atencion = grupos()
+    datos = {'destinatario_grupo': atencion, 'mensaje': f"Alerta del pedido #{pedido.id}"}
+    datos.update(campos)
+    return Notificacion.objects.create(pedido=pedido, tipo=tipo, estado=estado, **datos)
+
+
+ESTADOS_SEMBRADOS = (
+    'Pagado (WebPay)', 'Pagado (Transferencia)', 'En Preparacion (WebPay)',
+    'Despachado (WebPay)', 'Pendiente', 'Reserva Pendiente',
+)
+
+
+def sembrar(n, lineas_por_pedido=3):
+    """
+    Completa la base hasta tener al menos n productos, n clientes y n pedidos.
+
+    Los pedidos rotan entre los estados de ESTADOS_SEMBRADOS; las transferencias
+    y las reservas llevan su notificación abierta y los pagados quedan
+    registrados en los resúmenes de ventas, como en la operación real.
+    """
+    from .ventas import registrar_venta
+
+    grupos()
+    for _ in range(n - Producto.objects.count()):
+        crear_producto()
+    for _ in range(n - Cliente.objects.count()):
+        crear_cliente(crear_usuario(password=None))
+
+    productos = list(Producto.objects.order_by('id')[:lineas_por_pedido])
+    clientes = list(Cliente.objects.order_by('id'))
+    for i in range(Pedido.objects.count(), n):
+        estado = ESTADOS_SEMBRADOS[i % len(ESTADOS_SEMBRADOS)]
+        pedido = crear_pedido(clientes[i % len(clientes)], productos, estado=estado, es_reserva='Reserva' in estado)
+        if 'Transferencia' in estado:
+            crear_notificacion(pedido, tipo='TRANSFERENCIA')
+        elif 'Reserva' in estado:
+            crear_notificacion(pedido, tipo='RESERVA')
+        if estado.startswith(('Pagado', 'En Preparacion', 'Despachado')):
+            registrar_venta(pedido)
+
+
+class ConsultasConstantesMixin:
+    """
+    Para TestCase: verifica que una petición hace las mismas consultas con pocos y con muchos datos.
+
+    En cada tamaño se siembra la base con `sembrar(n)` y `self.tamano` queda en n,
+    para que `preparar` arme carritos y pedidos de ese largo.
+    """
+
+    TAMANOS = (3, 15)
+
+    def productos(self, n=None):
+        return list(Producto.objects.order_by('id')[:n or self.tamano])
+
+    def assertConsultasConstantes(self, esperado, peticion, preparar=None):
+        from django.core.cache import cache
+
+        for n in self.TAMANOS:
+            with self.subTest(datos=n):
+                self.tamano = n
+                sembrar(n)
+                cache.clear()
+                argumentos = preparar() if preparar else ()
+                with self.assertNumQueries(esperado):
+                    response = peticion(*argumentos)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
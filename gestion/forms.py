@@ -15,4 +15,33 @@ class CodigoSeguimientoForm(forms.ModelForm):
 
     class Meta:
         model = Pedido
-        fields = ['codigo_seguimiento']
\ No newline at end of file
+        fields = ['codigo_seguimiento']
+
+class DespachoMasivoForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo CSV del Courier",
+        required=False,
+        help_text="Una fila por pedido: pedido_id,codigo_seguimiento (la cabecera es opcional)."
+    )
+    contenido = forms.CharField(
+        label="O pega las filas aquí",
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 8, 'placeholder': '125,123456789012\n126,123456789013'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        archivo = cleaned_data.get('archivo')
+        contenido = cleaned_data.get('contenido')
+
+        if archivo:
+            try:
+                contenido = archivo.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise forms.ValidationError("El archivo debe estar codificado en UTF-8.")
+
+        if not contenido or not contenido.strip():
+            raise forms.ValidationError("Sube un archivo o pega al menos una fila.")
+
+        cleaned_data['lineas'] = contenido.splitlines()
+        return cleaned_data
@@ -0,0 +1,33 @@
+from django.db.models import Case, F, Sum, When
+
+from core.cache import invalidar_al_confirmar
+
+from .models import Producto
+
+
+def mover_stock(pedido, signo):
+    """
+    Descuenta (signo=-1) o devuelve (signo=1) el stock de todas las líneas del pedido.
+
+    Se resuelve con una consulta agrupada y un único UPDATE con CASE, sin
+    importar cuántas líneas tenga el pedido. Devuelve los productos que
+    estaban agotados y quedaron con stock (para liberar sus reservas).
+    """
+    cantidades = dict(
+        pedido.detalles.values('producto_id').annotate(total=Sum('cantidad')).values_list('producto_id', 'total').order_by()
+    )
+    if not cantidades:
+        return []
+
+    productos = Producto.objects.filter(id__in=cantidades)
+    agotados = list(productos.filter(stock__lte=0).values_list('id', flat=True)) if signo > 0 else []
+    productos.update(stock=Case(
+        *[When(id=producto_id, then=F('stock') + signo * cantidad) for producto_id, cantidad in cantidades.items()],
+        default=F('stock'),
+    ))
+    # update() no emite post_save: el catálogo cacheado se invalida a mano
+    invalidar_al_confirmar('catalogo')
+
+    if not agotados:
+        return []
+    return list(Producto.objects.filter(id__in=agotados, stock__gt=0))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion import retencion
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a las tablas de archivo las notificaciones cerradas, los pedidos despachados antiguos "
+        "y los pedidos 'Pendiente' abandonados. Trabaja por lotes y se puede relanzar si se interrumpe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias-notificaciones', type=int, default=retencion.DIAS_NOTIFICACIONES)
+        parser.add_argument('--dias-pedidos', type=int, default=retencion.DIAS_PEDIDOS)
+        parser.add_argument('--dias-pendientes', type=int, default=retencion.DIAS_PENDIENTES)
+        parser.add_argument('--lote', type=int, default=retencion.TAMANO_LOTE, help="Filas por transacción.")
+        parser.add_argument('--max-lotes', type=int, default=None, help="Detenerse tras N lotes por tabla.")
+        parser.add_argument('--pausa', type=float, default=0, help="Segundos de espera entre lotes.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo cuenta lo que se archivaría.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            notificaciones = retencion.notificaciones_archivables(options['dias_notificaciones']).count()
+            pedidos = retencion.pedidos_archivables(options['dias_pedidos'], options['dias_pendientes']).count()
+            self.stdout.write(f"Notificaciones archivables: {notificaciones}")
+            self.stdout.write(f"Pedidos archivables: {pedidos}")
+            return
+
+        lotes = {'lote': options['lote'], 'max_lotes': options['max_lotes'], 'pausa': options['pausa']}
+        self._procesar("Notificaciones", retencion.archivar_notificaciones(options['dias_notificaciones'], **lotes))
+        self._procesar("Pedidos", retencion.archivar_pedidos(options['dias_pedidos'], options['dias_pendientes'], **lotes))
+
+    def _procesar(self, nombre, lotes):
+        total = 0
+        inicio = time.monotonic()
+        for numero, (filas, segundos) in enumerate(lotes, start=1):
+            total += filas
+            self.stdout.write(f"{nombre} - lote {numero}: {filas} filas en {segundos:.2f}s ({filas / max(segundos, 1e-6):.0f} filas/s)")
+
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre}: {total} archivadas en {duracion:.2f}s ({total / max(duracion, 1e-6):.0f} filas/s)"
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.despachos import leer_filas, despachar_pedidos
+
+
+class Command(BaseCommand):
+    help = "Marca como despachados los pedidos de un CSV 'pedido_id,codigo_seguimiento' y notifica a los clientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del CSV entregado por el courier.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as f:
+                filas = leer_filas(f)
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+
+        resultados, correos_encolados = despachar_pedidos(filas)
+
+        for r in resultados:
+            linea = f"Línea {r['linea']}: Pedido #{r['pedido_id']} -> {r['mensaje']}"
+            self.stdout.write(self.style.SUCCESS(linea) if r['ok'] else self.style.ERROR(linea))
+
+        despachados = sum(1 for r in resultados if r['ok'])
+        self.stdout.write(
+            f"Despachados: {despachados} | Con errores: {len(resultados) - despachados} | Correos en cola: {correos_encolados}"
+        )
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion.correos import TAMANO_LOTE, metricas_cola, procesar_lote
+
+
+class Command(BaseCommand):
+    help = "Envía los correos en cola por lotes, reutilizando una conexión SMTP por lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Correos por lote.")
+        parser.add_argument('--continuo', action='store_true', help="Sigue revisando la cola en vez de terminar cuando se vacía.")
+        parser.add_argument('--intervalo', type=float, default=5, help="Segundos de espera con la cola vacía (modo continuo).")
+        parser.add_argument('--metricas', action='store_true', help="Solo muestra el estado de la cola.")
+
+    def handle(self, *args, **options):
+        if options['metricas']:
+            for clave, valor in metricas_cola().items():
+                self.stdout.write(f"{clave}: {valor}")
+            return
+
+        total_enviados = total_fallidos = 0
+        while True:
+            enviados, fallidos = procesar_lote(options['lote'])
+            total_enviados += enviados
+            total_fallidos += fallidos
+
+            if enviados or fallidos:
+                self.stdout.write(f"Lote: {enviados} enviados, {fallidos} con error.")
+                continue
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo. Enviados: {total_enviados} | Con error: {total_fallidos} | Pendientes: {metricas_cola()['pendientes']}"
+        ))
@@ -0,0 +1,42 @@
+import csv
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion.exportacion import COLUMNAS, escribir_xlsx, filas_pedidos
+
+
+class Command(BaseCommand):
+    help = "Exporta pedidos con sus líneas y datos del cliente a CSV o XLSX para contabilidad."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Fecha inicial AAAA-MM-DD (por defecto, el primer día del mes).")
+        parser.add_argument('--hasta', help="Fecha final AAAA-MM-DD (por defecto, hoy).")
+        parser.add_argument('--formato', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--salida', help="Archivo de destino (CSV: por defecto la salida estándar).")
+
+    def handle(self, *args, **options):
+        try:
+            hasta = date.fromisoformat(options['hasta']) if options['hasta'] else timezone.localdate()
+            desde = date.fromisoformat(options['desde']) if options['desde'] else hasta.replace(day=1)
+        except ValueError:
+            raise CommandError("Las fechas deben tener formato AAAA-MM-DD.")
+
+        filas = filas_pedidos(desde, hasta)
+
+        if options['formato'] == 'xlsx':
+            if not options['salida']:
+                raise CommandError("Para XLSX indica el archivo con --salida.")
+            escribir_xlsx(filas, options['salida'])
+            return
+
+        destino = open(options['salida'], 'w', encoding='utf-8-sig', newline='') if options['salida'] else sys.stdout
+        try:
+            writer = csv.writer(destino)
+            writer.writerow(COLUMNAS)
+            writer.writerows(filas)
+        finally:
+            if destino is not sys.stdout:
+                destino.close()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from gestion.clientes import TAMANO_LOTE, recalcular_agregados
+
+
+class Command(BaseCommand):
+    help = "Recalcula pedidos, total gastado y último pedido de cada cliente y corrige los desvíos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Clientes por lote.")
+
+    def handle(self, *args, **options):
+        revisados = corregidos = 0
+        for clientes, cambios in recalcular_agregados(options['lote']):
+            revisados += clientes
+            corregidos += cambios
+        self.stdout.write(self.style.SUCCESS(f"Clientes revisados: {revisados} | Corregidos: {corregidos}"))
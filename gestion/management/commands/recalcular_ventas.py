@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.ventas import recalcular_ventas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los resúmenes diarios de ventas (backfill) a partir de los pedidos activos y archivados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Fecha inicial AAAA-MM-DD (por defecto, el primer pedido).")
+        parser.add_argument('--hasta', help="Fecha final AAAA-MM-DD (por defecto, hoy).")
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options['desde']) if options['desde'] else None
+            hasta = date.fromisoformat(options['hasta']) if options['hasta'] else None
+        except ValueError:
+            raise CommandError("Las fechas deben tener formato AAAA-MM-DD.")
+
+        total = 0
+        for inicio, fin, filas in recalcular_ventas(desde, hasta):
+            total += filas
+            self.stdout.write(f"{inicio} a {fin}: {filas} filas de resumen")
+        self.stdout.write(self.style.SUCCESS(f"Listo. {total} filas de resumen generadas."))
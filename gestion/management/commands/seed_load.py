@@ -0,0 +1,193 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Max
+
+from core.rut import calcular_dv
+from gestion.models import Cliente, DetallePedido, Notificacion, Pedido, Producto
+from gestion.totales import fijar_lineas
+
+CATEGORIAS = ('Despensa', 'Bebidas', 'Snacks', 'Lácteos', 'Congelados', 'Suplementos', 'Frutos Secos', 'Cuidado Personal')
+BASES = ('Avena', 'Quinoa', 'Almendras', 'Té Verde', 'Kombucha', 'Granola', 'Yogur', 'Proteína', 'Miel', 'Chía')
+VARIANTES = ('Orgánica', 'Sin Gluten', 'Integral', 'Light', 'Premium', 'Natural', 'Vegana', 'Artesanal')
+NOMBRES = ('Ana', 'Benjamín', 'Camila', 'Diego', 'Fernanda', 'Ignacio', 'Josefa', 'Matías', 'Sofía', 'Tomás')
+APELLIDOS = ('González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda')
+COMUNAS = ('Concepción', 'Talcahuano', 'San Pedro de la Paz', 'Chiguayante', 'Hualpén', 'Santiago', 'Providencia', 'Ñuñoa')
+
+# (estado, peso): la mayoría de los pedidos de una tienda con historia ya se despacharon
+ESTADOS = (
+    ('Despachado (WebPay)', 40), ('Despachado (Transferencia)', 12), ('Despachado (Retiro/WebPay)', 6),
+    ('Pagado (WebPay)', 6), ('Pagado (Transferencia)', 2), ('En Preparacion (WebPay)', 3),
+    ('Pendiente', 14), ('Pendiente Pago (Transferencia)', 3), ('En Espera Faltante', 1),
+    ('Reserva Pendiente', 2), ('Anulado / Reembolsado', 2),
+)
+ALERTAS = {
+    'Pendiente Pago (Transferencia)': 'TRANSFERENCIA',
+    'En Espera Faltante': 'FALTANTE',
+    'Reserva Pendiente': 'RESERVA',
+}
+
+# Cuerpos de RUT lejos de los reales para no chocar con clientes existentes
+RUT_BASE = 50_000_000
+
+
+def _insertar(modelo, objetos):
+    """bulk_create que deja los pk asignados también en motores sin RETURNING (MySQL)."""
+    creados = modelo.objects.bulk_create(objetos)
+    if creados and creados[0].pk is None:
+        # La carga es el único escritor: son las últimas filas insertadas, en orden
+        ids = list(modelo.objects.order_by('-pk').values_list('pk', flat=True)[:len(creados)])
+        for objeto, pk in zip(creados, reversed(ids)):
+            objeto.pk = pk
+    return creados
+
+
+def _lotes(total, tamano):
+    for inicio in range(0, total, tamano):
+        yield inicio, min(tamano, total - inicio)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos a escala (productos, clientes con RUT válido, pedidos con sus "
+        "líneas y alertas) con bulk_create por lotes, para pruebas de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=1000)
+        parser.add_argument('--clientes', type=int, default=1000)
+        parser.add_argument('--pedidos', type=int, default=10000)
+        parser.add_argument('--lineas', type=int, default=5, help="Máximo de líneas por pedido.")
+        parser.add_argument('--dias', type=int, default=365, help="Los pedidos se reparten en los últimos N días.")
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por bulk_create.")
+        parser.add_argument('--clave', default='carga1234', help="Contraseña común de los usuarios generados.")
+        parser.add_argument('--semilla', type=int, default=None, help="Semilla para repetir exactamente la misma carga.")
+        parser.add_argument(
+            '--sin-resumenes', action='store_true',
+            help="No reconstruir los resúmenes de ventas ni los agregados de clientes al terminar.",
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['lineas'] < 1:
+            raise CommandError("--lote y --lineas deben ser mayores que 0.")
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+
+        inicio = time.perf_counter()
+        self._productos(options['productos'])
+        self._clientes(options['clientes'], options['clave'])
+        self._pedidos(options['pedidos'], options['lineas'], options['dias'])
+
+        if not options['sin_resumenes']:
+            self.stdout.write("Reconstruyendo resúmenes de ventas y agregados de clientes...")
+            call_command('recalcular_ventas')
+            call_command('recalcular_clientes')
+
+        self.stdout.write(self.style.SUCCESS(f"Carga lista en {time.perf_counter() - inicio:.1f}s."))
+
+    def _avance(self, nombre, hechos, total, inicio):
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(f"  {nombre}: {hechos}/{total} ({hechos / segundos if segundos else 0:.0f} filas/s)")
+
+    def _productos(self, total):
+        inicio = time.perf_counter()
+        desde = (Producto.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+        for offset, cantidad in _lotes(total, self.lote):
+            productos = []
+            for n in range(desde + offset, desde + offset + cantidad):
+                base, variante = self.azar.choice(BASES), self.azar.choice(VARIANTES)
+                productos.append(Producto(
+                    nombre=f"{base} {variante} {n}",
+                    descripcion=f"{base} {variante.lower()} en formato familiar.",
+                    precio=Decimal(self.azar.randrange(990, 29990, 10)),
+                    # ~5% agotado, para que existan reservas
+                    stock=0 if self.azar.random() < 0.05 else self.azar.randint(1, 300),
+                    categoria=self.azar.choice(CATEGORIAS),
+                    peso_gramos=self.azar.randrange(100, 5000, 50),
+                ))
+            Producto.objects.bulk_create(productos)
+            self._avance('productos', offset + cantidad, total, inicio)
+
+    def _clientes(self, total, clave):
+        inicio = time.perf_counter()
+        # Un solo hash para todos: con el hasher por defecto, hashear uno por usuario tomaría horas
+        password = make_password(clave)
+        desde = (User.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+        for offset, cantidad in _lotes(total, self.lote):
+            numeros = range(desde + offset, desde + offset + cantidad)
+            with transaction.atomic():
+                usuarios = _insertar(User, [
+                    User(
+                        username=f"carga{n}", email=f"carga{n}@carga.vivesano.cl", password=password,
+                        first_name=self.azar.choice(NOMBRES), last_name=self.azar.choice(APELLIDOS),
+                    )
+                    for n in numeros
+                ])
+                Cliente.objects.bulk_create([
+                    Cliente(
+                        user=usuario,
+                        rut=f"{RUT_BASE + n}-{calcular_dv(RUT_BASE + n)}",
+                        nombre=usuario.first_name,
+                        apellido=usuario.last_name,
+                        email=usuario.email,
+                        telefono=f"+569{self.azar.randint(10_000_000, 99_999_999)}",
+                        direccion=f"Calle {self.azar.randint(1, 999)} #{self.azar.randint(1, 9999)}",
+                        comuna=self.azar.choice(COMUNAS),
+                        codigo_postal=str(self.azar.randint(4_000_000, 4_200_000)),
+                    )
+                    for n, usuario in zip(numeros, usuarios)
+                ])
+            self._avance('clientes', offset + cantidad, total, inicio)
+
+    def _pedidos(self, total, max_lineas, dias):
+        if not total:
+            return
+        productos = list(Producto.objects.values_list('id', 'precio', 'peso_gramos'))
+        clientes = list(Cliente.objects.values_list('id', flat=True))
+        if not productos or not clientes:
+            raise CommandError("Se necesitan productos y clientes para generar pedidos.")
+        atencion, _ = Group.objects.get_or_create(name='Atencion al cliente')
+        estados, pesos = zip(*ESTADOS)
+        lotes = max(1, -(-total // self.lote))
+
+        inicio = time.perf_counter()
+        for numero_lote, (offset, cantidad) in enumerate(_lotes(total, self.lote)):
+            pedidos, lineas = [], []
+            for estado in self.azar.choices(estados, weights=pesos, k=cantidad):
+                elegidos = self.azar.sample(productos, min(len(productos), self.azar.randint(1, max_lineas)))
+                detalle = [(producto_id, precio, peso, self.azar.randint(1, 4)) for producto_id, precio, peso in elegidos]
+                pedidos.append(fijar_lineas(Pedido(
+                    cliente_id=self.azar.choice(clientes),
+                    estado=estado,
+                    tipo_entrega='Retiro' if 'Retiro' in estado else self.azar.choice(('Despacho', 'Despacho', 'Retiro')),
+                    codigo_seguimiento=f"{self.azar.randint(10**11, 10**12 - 1)}" if estado.startswith('Despachado') else None,
+                    es_reserva=estado.startswith('Reserva'),
+                ), [(precio, c, peso) for _id, precio, peso, c in detalle]))
+                lineas.append(detalle)
+
+            with transaction.atomic():
+                pedidos = _insertar(Pedido, pedidos)
+                DetallePedido.objects.bulk_create([
+                    DetallePedido(pedido=pedido, producto_id=producto_id, cantidad=c, precio_unitario=precio)
+                    for pedido, detalle in zip(pedidos, lineas)
+                    for producto_id, precio, _peso, c in detalle
+                ], batch_size=self.lote)
+                Notificacion.objects.bulk_create([
+                    Notificacion(
+                        destinatario_grupo=atencion, pedido=pedido, tipo=ALERTAS[pedido.estado],
+                        mensaje=f"{ALERTAS[pedido.estado]}: pedido #{pedido.pk} (carga sintética)",
+                    )
+                    for pedido in pedidos if pedido.estado in ALERTAS
+                ])
+                # `fecha` es auto_now_add: los lotes más antiguos se corren hacia atrás con un UPDATE
+                atraso = timedelta(days=dias * (lotes - 1 - numero_lote) / lotes)
+                if atraso:
+                    Pedido.objects.filter(pk__gte=pedidos[0].pk, pk__lte=pedidos[-1].pk).update(fecha=F('fecha') - atraso)
+            self._avance('pedidos', offset + cantidad, total, inicio)
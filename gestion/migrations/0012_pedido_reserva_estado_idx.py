@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0011_correosaliente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['es_reserva', 'estado'], name='pedido_reserva_estado_idx'),
+        ),
+    ]
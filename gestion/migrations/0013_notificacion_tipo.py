@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('gestion', '0012_pedido_reserva_estado_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='tipo',
+            field=models.CharField(choices=[('RESERVA', 'Solicitud de Reserva'), ('TRANSFERENCIA', 'Pago por Transferencia'), ('FALTANTE', 'Faltante de Stock'), ('OTRO', 'Otro')], default='OTRO', max_length=20),
+        ),
+    ]
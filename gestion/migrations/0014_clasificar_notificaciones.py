@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def clasificar(apps, schema_editor):
+    Notificacion = apps.get_model('gestion', 'Notificacion')
+
+    # Mismos textos con los que las vistas crean cada alerta
+    Notificacion.objects.filter(mensaje__startswith='SOLICITUD RESERVA').update(tipo='RESERVA')
+    Notificacion.objects.filter(mensaje__contains='TRANSFERENCIA').update(tipo='TRANSFERENCIA')
+    Notificacion.objects.filter(mensaje__contains='Faltante de stock').update(tipo='FALTANTE')
+
+    # Antes de la restricción única: si hay alertas abiertas repetidas, queda abierta la más reciente
+    abiertas = Notificacion.objects.filter(estado__in=['PENDIENTE', 'ESPERA'], pedido__isnull=False)
+    repetidas = (
+        abiertas.values('pedido', 'tipo')
+        .annotate(n=Count('id'), ultima=Max('id'))
+        .filter(n__gt=1)
+    )
+    for grupo in repetidas:
+        abiertas.filter(pedido=grupo['pedido'], tipo=grupo['tipo']).exclude(id=grupo['ultima']).update(estado='LISTO')
+
+
+def desclasificar(apps, schema_editor):
+    Notificacion = apps.get_model('gestion', 'Notificacion')
+    Notificacion.objects.update(tipo='OTRO')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0013_notificacion_tipo'),
+    ]
+
+    operations = [
+        migrations.RunPython(clasificar, desclasificar),
+    ]
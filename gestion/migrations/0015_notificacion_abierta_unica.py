@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0014_clasificar_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['pedido', 'tipo'], name='notificacion_pedido_tipo_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ['PENDIENTE', 'ESPERA'])), fields=('pedido', 'tipo'), name='notificacion_abierta_unica'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('gestion', '0015_notificacion_abierta_unica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_original', models.BigIntegerField(unique=True, verbose_name='ID Notificación')),
+                ('mensaje', models.TextField()),
+                ('fecha', models.DateTimeField(db_index=True)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente de Contacto'), ('ESPERA', 'Esperando Respuesta del Cliente'), ('LISTO', 'Gestionado / Resuelto'), ('CANCELADO', 'Pedido Anulado')], max_length=20)),
+                ('tipo', models.CharField(choices=[('RESERVA', 'Solicitud de Reserva'), ('TRANSFERENCIA', 'Pago por Transferencia'), ('FALTANTE', 'Faltante de Stock'), ('OTRO', 'Otro')], default='OTRO', max_length=20)),
+                ('pedido_id_original', models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name='ID Pedido')),
+                ('archivado', models.DateTimeField(auto_now_add=True)),
+                ('destinatario_grupo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='auth.group')),
+            ],
+            options={
+                'verbose_name_plural': 'Notificaciones archivadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='PedidoArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_original', models.BigIntegerField(unique=True, verbose_name='ID Pedido')),
+                ('fecha', models.DateTimeField(db_index=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('estado', models.CharField(max_length=50)),
+                ('codigo_seguimiento', models.CharField(blank=True, max_length=50, null=True)),
+                ('tipo_entrega', models.CharField(choices=[('Despacho', 'Despacho a Domicilio'), ('Retiro', 'Retiro en Tienda')], default='Despacho', max_length=20)),
+                ('es_reserva', models.BooleanField(default=False)),
+                ('detalles', models.JSONField(default=list)),
+                ('archivado', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='gestion.cliente')),
+            ],
+            options={
+                'verbose_name_plural': 'Pedidos archivados',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0016_historico_archivado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='contabilizado',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('dimension', models.CharField(choices=[('TOTAL', 'Total del Día'), ('PRODUCTO', 'Por Producto'), ('PAGO', 'Por Medio de Pago'), ('ENTREGA', 'Por Tipo de Entrega')], max_length=10)),
+                ('clave', models.CharField(blank=True, max_length=50)),
+                ('etiqueta', models.CharField(blank=True, max_length=100)),
+                ('pedidos', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas diarias',
+                'indexes': [models.Index(fields=['dimension', 'fecha'], name='venta_dimension_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'dimension', 'clave'), name='venta_diaria_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0017_ventas_diarias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='cantidad_pedidos',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Pedidos'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='total_gastado',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Total Gastado'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='ultimo_pedido',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Último Pedido'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+def rut_canonico(rut):
+    """
+    Forma canónica de un RUT ('12345678-9') o None si es inválido.
+
+    Copia congelada de core.rut al escribir esta migración: si la validación de la
+    app cambia después, esta migración debe seguir dando el mismo resultado.
+    """
+    limpio = rut.replace('.', '').replace('-', '').strip().upper() if rut else ''
+    cuerpo, dv = limpio[:-1], limpio[-1:]
+    if not (cuerpo.isascii() and cuerpo.isdigit()) or not 1_000_000 <= int(cuerpo) <= 99_999_999:
+        return None
+    suma = sum(int(d) * (2 + i % 6) for i, d in enumerate(reversed(str(int(cuerpo)))))
+    return f"{int(cuerpo)}-{dv}" if '0123456789K'[-suma % 11] == dv else None
+
+
+def canonizar(apps, schema_editor):
+    Cliente = apps.get_model('gestion', 'Cliente')
+
+    clientes = list(
+        Cliente.objects.exclude(rut__isnull=True)
+        .order_by('-cantidad_pedidos', 'id')
+        .values_list('id', 'rut')
+    )
+    canonicos = [rut_canonico(rut) for _id, rut in clientes]
+
+    # Escrituras distintas del mismo RUT (p. ej. '12.345.678-9' y '123456789'): lo conserva
+    # el cliente con más pedidos y los demás quedan sin RUT, que se les pide en el próximo checkout.
+    # Los RUT inválidos se dejan como están: no hay forma canónica a la que llevarlos.
+    duenos, cambios, sin_rut = set(), {}, []
+    for (id_, rut), canonico in zip(clientes, canonicos):
+        if not rut.strip():
+            sin_rut.append(id_)
+        elif canonico is None:
+            continue
+        elif canonico in duenos:
+            sin_rut.append(id_)
+        else:
+            duenos.add(canonico)
+            if canonico != rut:
+                cambios[id_] = canonico
+
+    # Primero se liberan los repetidos para no chocar con el índice único al renombrar
+    Cliente.objects.filter(id__in=sin_rut).update(rut=None)
+    Cliente.objects.bulk_update(
+        [Cliente(id=id_, rut=canonico) for id_, canonico in cambios.items()], ['rut'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0018_cliente_agregados'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonizar, migrations.RunPython.noop),
+    ]
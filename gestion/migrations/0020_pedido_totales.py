@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:47
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def rellenar(apps, schema_editor):
+    Pedido = apps.get_model('gestion', 'Pedido')
+    DetallePedido = apps.get_model('gestion', 'DetallePedido')
+
+    def por_pedido(expresion, campo):
+        lineas = DetallePedido.objects.filter(pedido=OuterRef('pk')).values('pedido').annotate(v=expresion).values('v')
+        return Coalesce(Subquery(lineas[:1], output_field=campo), Value(0), output_field=campo)
+
+    dinero = models.DecimalField(max_digits=10, decimal_places=2)
+    Pedido.objects.update(
+        subtotal=por_pedido(Sum(F('precio_unitario') * F('cantidad')), dinero),
+        cantidad_items=por_pedido(Sum('cantidad'), models.PositiveIntegerField()),
+    )
+    # El total cobrado no se toca: lo que exceda al subtotal fue el envío
+    Pedido.objects.update(costo_envio=Case(
+        When(total__gt=F('subtotal'), then=F('total') - F('subtotal')), default=Value(0), output_field=dinero,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0019_rut_canonico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='cantidad_items',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Productos'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='costo_envio',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Costo de Envío'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(rellenar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:51
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def tarifa_general(apps, schema_editor):
+    # La misma tarifa que estaba fija en seleccion_envio, ahora editable en el admin
+    TarifaEnvio = apps.get_model('gestion', 'TarifaEnvio')
+    TarifaEnvio.objects.create(zona='Nacional', costo=5990, gratis_desde=25000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0020_pedido_totales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarifaEnvio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zona', models.CharField(max_length=60)),
+                ('comuna', models.CharField(blank=True, max_length=100)),
+                ('prefijo_postal', models.CharField(blank=True, max_length=7, validators=[django.core.validators.RegexValidator('^\\d*$', 'Solo dígitos.')], verbose_name='Prefijo Código Postal')),
+                ('peso_hasta_gramos', models.PositiveIntegerField(blank=True, help_text='Vacío: sin límite de peso.', null=True, verbose_name='Hasta (g)')),
+                ('costo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('gratis_desde', models.DecimalField(blank=True, decimal_places=2, help_text='Envío gratis para compras sobre este monto. Vacío: nunca gratis.', max_digits=10, null=True)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Tarifa de envío',
+                'verbose_name_plural': 'Tarifas de envío',
+                'ordering': ['zona', 'peso_hasta_gramos'],
+            },
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='peso_gramos',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Peso (g)'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='peso_gramos',
+            field=models.PositiveIntegerField(default=0, verbose_name='Peso (g)'),
+        ),
+        migrations.RunPython(tarifa_general, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:58
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def rellenar(apps, schema_editor):
+    # 0020 dejó costo_envio=0 en los pedidos cobrados por menos que sus líneas: la
+    # diferencia es un descuento y así vuelve a cumplirse total = subtotal + envío - descuento
+    Pedido = apps.get_model('gestion', 'Pedido')
+    Pedido.objects.filter(total__lt=F('subtotal') + F('costo_envio')).update(
+        descuento=F('subtotal') + F('costo_envio') - F('total'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0021_tarifas_envio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='descuento',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(rellenar, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
+from decimal import Decimal
+
+from django.core.validators import RegexValidator
 from django.db import models
 from django.contrib.auth.models import User, Group
+from django.utils import timezone
 import os
 
 class Producto(models.Model):
@@ -9,6 +13,8 @@ class Producto(models.Model):
     stock = models.IntegerField(default=0)
     categoria = models.CharField(max_length=50, blank=True)
     imagen = models.ImageField(upload_to='productos/', null=True, blank=True)
+    # Para el tramo de peso de la tarifa de envío (gestion.tarifas); 0 si no se ha pesado
+    peso_gramos = models.PositiveIntegerField(default=0, verbose_name="Peso (g)")
 
     def __str__(self):
         return self.nombre
@@ -27,6 +33,11 @@ class Cliente(models.Model):
     comuna = models.CharField(max_length=100, blank=True)
     codigo_postal = models.CharField(max_length=10, blank=True)
 
+    # Agregados mantenidos al pagar/anular (gestion.clientes); `recalcular_clientes` corrige desvíos
+    cantidad_pedidos = models.PositiveIntegerField(default=0, editable=False, db_index=True, verbose_name="Pedidos")
+    total_gastado = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, db_index=True, verbose_name="Total Gastado")
+    ultimo_pedido = models.DateTimeField(null=True, blank=True, editable=False, db_index=True, verbose_name="Último Pedido")
+
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
 
@@ -51,6 +62,13 @@ class Pedido(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True)
     fecha = models.DateTimeField(auto_now_add=True)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    # Guardados al escribir las líneas y al elegir el envío (gestion.totales):
+    # total = subtotal + costo_envio - descuento
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    cantidad_items = models.PositiveIntegerField(default=0, editable=False, verbose_name="Productos")
+    costo_envio = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False, verbose_name="Costo de Envío")
+    peso_gramos = models.PositiveIntegerField(default=0, editable=False, verbose_name="Peso (g)")
+    descuento = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     estado = models.CharField(max_length=50, choices=ESTADO_CHOICES, default='Pendiente')
     codigo_seguimiento = models.CharField(max_length=50, blank=True, null=True)
     tipo_entrega = models.CharField(max_length=20, choices=TIPO_ENTREGA_CHOICES, default='Despacho')
@@ -58,9 +76,24 @@ class Pedido(models.Model):
     # ETIQUETA PERMANENTE DE RESERVA ---
     es_reserva = models.BooleanField(default=False, verbose_name="Es Reserva")
 
+    # Ya sumado a los resúmenes de ventas (gestion.ventas); evita contarlo dos veces
+    contabilizado = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # Búsqueda de reservas abiertas al reponer stock (gestion.reservas)
+            models.Index(fields=['es_reserva', 'estado'], name='pedido_reserva_estado_idx'),
+        ]
+
     def __str__(self):
         return f"Pedido #{self.id} - {self.cliente.nombre if self.cliente else 'Invitado'}"
 
+# Pedidos que ya cuentan como venta (pagados y todo lo que viene después)
+ESTADOS_VENDIDOS = (
+    models.Q(estado__startswith='Pagado') | models.Q(estado__startswith='En Preparacion')
+    | models.Q(estado='En Espera Faltante') | models.Q(estado__startswith='Despachado') | models.Q(estado='Entregado')
+)
+
 class DetallePedido(models.Model):
     pedido = models.ForeignKey(Pedido, related_name='detalles', on_delete=models.CASCADE)
     producto = models.ForeignKey(Producto, on_delete=models.PROTECT) # Evita borrar producto si está en un pedido
@@ -77,6 +110,14 @@ class Notificacion(models.Model):
         ('LISTO', 'Gestionado / Resuelto'),
         ('CANCELADO', 'Pedido Anulado')
     ]
+    ESTADOS_ABIERTOS = ['PENDIENTE', 'ESPERA']
+
+    TIPOS = [
+        ('RESERVA', 'Solicitud de Reserva'),
+        ('TRANSFERENCIA', 'Pago por Transferencia'),
+        ('FALTANTE', 'Faltante de Stock'),
+        ('OTRO', 'Otro'),
+    ]
 
     destinatario_grupo = models.ForeignKey(Group, on_delete=models.CASCADE)
     mensaje = models.TextField()
@@ -84,8 +125,169 @@ class Notificacion(models.Model):
     
     # Reemplazamos el booleano 'leido' por este campo de estado
     estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE')
+    tipo = models.CharField(max_length=20, choices=TIPOS, default='OTRO')
     
     pedido = models.ForeignKey(Pedido, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['pedido', 'tipo'], name='notificacion_pedido_tipo_idx'),
+        ]
+        constraints = [
+            # Una sola alerta abierta de cada tipo por pedido (protege contra doble clic).
+            # MySQL no tiene índices parciales y no la crea: ahí gestion.alertas bloquea el pedido
+            models.UniqueConstraint(
+                fields=['pedido', 'tipo'],
+                condition=models.Q(estado__in=['PENDIENTE', 'ESPERA']),
+                name='notificacion_abierta_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.estado} - {self.mensaje[:30]}"
+
+class CorreoSaliente(models.Model):
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente de Envío'),
+        ('ENVIADO', 'Enviado'),
+        ('FALLIDO', 'Fallido (sin más reintentos)'),
+    ]
+
+    destinatario = models.EmailField()
+    asunto = models.CharField(max_length=255)
+    mensaje = models.TextField()
+    pedido = models.ForeignKey(Pedido, on_delete=models.SET_NULL, null=True, blank=True)
+
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE')
+    intentos = models.PositiveIntegerField(default=0)
+    # El worker solo toma correos cuyo próximo intento ya venció (reintentos con backoff)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento'], name='correo_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.estado} - {self.destinatario}: {self.asunto[:30]}"
+
+
+class TarifaEnvio(models.Model):
+    """
+    Una fila por zona y tramo de peso (ver gestion.tarifas).
+
+    La zona de un destino es la del prefijo de código postal más largo que
+    coincida; si ninguno coincide, la de su comuna, y si tampoco, la de las
+    filas sin comuna ni prefijo (tarifa general).
+    """
+    zona = models.CharField(max_length=60)
+    comuna = models.CharField(max_length=100, blank=True)
+    prefijo_postal = models.CharField(
+        max_length=7, blank=True, validators=[RegexValidator(r'^\d*$', "Solo dígitos.")],
+        verbose_name="Prefijo Código Postal",
+    )
+    peso_hasta_gramos = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="Hasta (g)", help_text="Vacío: sin límite de peso.",
+    )
+    costo = models.DecimalField(max_digits=10, decimal_places=2)
+    gratis_desde = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True,
+        help_text="Envío gratis para compras sobre este monto. Vacío: nunca gratis.",
+    )
+    activa = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Tarifa de envío"
+        verbose_name_plural = "Tarifas de envío"
+        ordering = ['zona', 'peso_hasta_gramos']
+
+    def __str__(self):
+        destino = self.prefijo_postal or self.comuna or 'general'
+        tramo = f"hasta {self.peso_hasta_gramos} g" if self.peso_hasta_gramos is not None else 'sin límite'
+        return f"{self.zona} ({destino}, {tramo}): {self.costo}"
+
+
+# --- RESÚMENES DE VENTAS (ver gestion.ventas) ---
+
+class VentaDiaria(models.Model):
+    DIMENSIONES = [
+        ('TOTAL', 'Total del Día'),
+        ('PRODUCTO', 'Por Producto'),
+        ('PAGO', 'Por Medio de Pago'),
+        ('ENTREGA', 'Por Tipo de Entrega'),
+    ]
+
+    fecha = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSIONES)
+    # '' para TOTAL, id del producto, 'WebPay'/'Transferencia' o 'Despacho'/'Retiro'
+    clave = models.CharField(max_length=50, blank=True)
+    etiqueta = models.CharField(max_length=100, blank=True)
+
+    pedidos = models.IntegerField(default=0)
+    unidades = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Ventas diarias"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'dimension', 'clave'], name='venta_diaria_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'fecha'], name='venta_dimension_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.dimension} {self.etiqueta or self.clave}: {self.ingresos}"
+
+
+# --- HISTÓRICO ARCHIVADO (ver gestion.retencion) ---
+
+class PedidoArchivado(models.Model):
+    id_original = models.BigIntegerField(unique=True, verbose_name="ID Pedido")
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(db_index=True)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    estado = models.CharField(max_length=50)
+    codigo_seguimiento = models.CharField(max_length=50, blank=True, null=True)
+    tipo_entrega = models.CharField(max_length=20, choices=Pedido.TIPO_ENTREGA_CHOICES, default='Despacho')
+    es_reserva = models.BooleanField(default=False)
+    # Copia de las líneas: [{'producto_id', 'producto', 'cantidad', 'precio_unitario'}, ...]
+    detalles = models.JSONField(default=list)
+    archivado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Pedidos archivados"
+
+    def __str__(self):
+        return f"Pedido archivado #{self.id_original} - {self.estado}"
+
+    def lineas(self):
+        """Las líneas copiadas, con precio y subtotal como Decimal para las plantillas."""
+        return [
+            dict(d, precio_unitario=Decimal(d['precio_unitario']), subtotal=Decimal(d['precio_unitario']) * d['cantidad'])
+            for d in self.detalles
+        ]
+
+    @property
+    def cantidad_items(self):
+        return sum(d['cantidad'] for d in self.detalles)
+
+class NotificacionArchivada(models.Model):
+    id_original = models.BigIntegerField(unique=True, verbose_name="ID Notificación")
+    destinatario_grupo = models.ForeignKey(Group, on_delete=models.SET_NULL, null=True, blank=True)
+    mensaje = models.TextField()
+    fecha = models.DateTimeField(db_index=True)
+    estado = models.CharField(max_length=20, choices=Notificacion.ESTADOS)
+    tipo = models.CharField(max_length=20, choices=Notificacion.TIPOS, default='OTRO')
+    # El pedido puede haberse archivado también, por eso se guarda solo su id
+    pedido_id_original = models.BigIntegerField(null=True, blank=True, db_index=True, verbose_name="ID Pedido")
+    archivado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Notificaciones archivadas"
+
     def __str__(self):
-        return f"{self.estado} - {self.mensaje[:30]}"
\ No newline at end of file
+        return f"{self.estado} - {self.mensaje[:30]}"
@@ -0,0 +1,51 @@
+from django.db.models import Count, Q, Sum
+
+from .models import DetallePedido
+
+# Orden de recorrido de bodega. Producto no tiene ubicación física, así que
+# la categoría hace de pasillo.
+ORDENES_PICKING = {
+    'categoria': ('producto__categoria', 'producto__nombre'),
+    'nombre': ('producto__nombre',),
+    'cantidad': ('-cantidad_total', 'producto__nombre'),
+}
+
+
+def filtro_cola_preparacion(prefijo=''):
+    """Pedidos que Logística tiene por preparar (mismo criterio que el dashboard)."""
+    return Q(**{f'{prefijo}estado__startswith': 'Pagado'}) | Q(**{f'{prefijo}estado__startswith': 'En Preparacion'})
+
+
+def lista_picking(orden='categoria'):
+    """
+    Agrupa por producto todas las líneas de los pedidos en cola de preparación.
+
+    Un GROUP BY sobre DetallePedido da la cantidad total y el número de pedidos
+    por producto; los ids de esos pedidos salen de una segunda consulta de pares
+    (producto, pedido). GROUP_CONCAT en la misma consulta los cortaría en MySQL
+    (group_concat_max_len, 1024 bytes por defecto) sin avisar.
+    """
+    lineas = DetallePedido.objects.filter(filtro_cola_preparacion('pedido__'))
+    filas = (
+        lineas
+        .values('producto_id', 'producto__nombre', 'producto__categoria', 'producto__stock')
+        .annotate(cantidad_total=Sum('cantidad'), num_pedidos=Count('pedido_id', distinct=True))
+        .order_by(*ORDENES_PICKING.get(orden, ORDENES_PICKING['categoria']))
+    )
+
+    pedidos_por_producto = {}
+    for producto_id, pedido_id in lineas.values_list('producto_id', 'pedido_id').distinct().order_by('pedido_id'):
+        pedidos_por_producto.setdefault(producto_id, []).append(pedido_id)
+
+    resultado = []
+    for fila in filas:
+        resultado.append({
+            'producto_id': fila['producto_id'],
+            'nombre': fila['producto__nombre'],
+            'categoria': fila['producto__categoria'],
+            'stock': fila['producto__stock'],
+            'cantidad_total': fila['cantidad_total'],
+            'num_pedidos': fila['num_pedidos'],
+            'pedidos': pedidos_por_producto.get(fila['producto_id'], []),
+        })
+    return resultado
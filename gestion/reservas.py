@@ -0,0 +1,49 @@
+from django.db import transaction
+
+from .correos import encolar_correos
+from .models import CorreoSaliente, Notificacion, Pedido
+
+ESTADOS_RESERVA_ABIERTA = ['Reserva Pendiente', 'Reserva En Camino']
+
+
+def correo_reserva_disponible(pedido):
+    """Asunto y cuerpo del aviso de que el producto reservado ya llegó."""
+    asunto = f"¡Llegó tu producto! Completa tu compra #{pedido.id}"
+    mensaje = (
+        f"Hola {pedido.cliente.nombre},\n\nTu producto reservado ya está en nuestra bodega.\n"
+        "Por favor ingresa a tu cuenta en 'Mis Pedidos' y realiza el pago para que podamos despacharlo.\n\n¡Gracias!"
+    )
+    return asunto, mensaje
+
+
+def liberar_reservas(*productos):
+    """
+    Pasa a 'Reserva Disponible' todas las reservas abiertas de los productos.
+
+    Se usa cuando el stock de un producto vuelve a ser mayor que 0: una consulta
+    encuentra las reservas, un bulk_update las libera, sus notificaciones se
+    cierran y los avisos a los clientes quedan en la cola de correos.
+    Devuelve la cantidad de reservas liberadas.
+    """
+    with transaction.atomic():
+        pedidos = list(
+            Pedido.objects
+            .select_related('cliente')
+            .filter(es_reserva=True, estado__in=ESTADOS_RESERVA_ABIERTA, detalles__producto__in=productos)
+            .distinct()
+        )
+        if not pedidos:
+            return 0
+
+        correos = []
+        for pedido in pedidos:
+            pedido.estado = 'Reserva Disponible'
+            if pedido.cliente and pedido.cliente.email:
+                asunto, mensaje = correo_reserva_disponible(pedido)
+                correos.append(CorreoSaliente(destinatario=pedido.cliente.email, asunto=asunto, mensaje=mensaje, pedido=pedido))
+
+        Pedido.objects.bulk_update(pedidos, ['estado'])
+        Notificacion.objects.filter(pedido__in=pedidos).exclude(estado__in=['LISTO', 'CANCELADO']).update(estado='LISTO')
+        encolar_correos(correos)
+
+    return len(pedidos)
@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notificacion, NotificacionArchivada, Pedido, PedidoArchivado
+
+TAMANO_LOTE = getattr(settings, 'RETENCION_LOTE', 500)
+DIAS_NOTIFICACIONES = getattr(settings, 'RETENCION_NOTIFICACIONES_DIAS', 90)
+DIAS_PEDIDOS = getattr(settings, 'RETENCION_PEDIDOS_DIAS', 365)
+DIAS_PENDIENTES = getattr(settings, 'RETENCION_PENDIENTES_DIAS', 30)
+
+
+def notificaciones_archivables(dias=DIAS_NOTIFICACIONES):
+    limite = timezone.now() - timedelta(days=dias)
+    return Notificacion.objects.filter(estado__in=['LISTO', 'CANCELADO'], fecha__lt=limite)
+
+
+def pedidos_archivables(dias_entregados=DIAS_PEDIDOS, dias_pendientes=DIAS_PENDIENTES):
+    """Pedidos entregados/despachados antiguos y carritos abandonados en 'Pendiente'."""
+    ahora = timezone.now()
+    entregados = (Q(estado__startswith='Despachado') | Q(estado='Entregado')) & Q(fecha__lt=ahora - timedelta(days=dias_entregados))
+    abandonados = Q(estado='Pendiente', fecha__lt=ahora - timedelta(days=dias_pendientes))
+    # Los que aún tienen una alerta abierta quedan en las tablas activas hasta que Atención la cierre
+    return Pedido.objects.filter(entregados | abandonados).exclude(notificacion__estado__in=Notificacion.ESTADOS_ABIERTOS)
+
+
+def _archivar_notificaciones(ids):
+    notificaciones = Notificacion.objects.filter(id__in=ids)
+    NotificacionArchivada.objects.bulk_create([
+        NotificacionArchivada(
+            id_original=n.id,
+            destinatario_grupo_id=n.destinatario_grupo_id,
+            mensaje=n.mensaje,
+            fecha=n.fecha,
+            estado=n.estado,
+            tipo=n.tipo,
+            pedido_id_original=n.pedido_id,
+        )
+        for n in notificaciones
+    ], ignore_conflicts=True)
+    Notificacion.objects.filter(id__in=ids).delete()
+
+
+def _archivar_pedidos(ids):
+    pedidos = Pedido.objects.filter(id__in=ids).prefetch_related('detalles__producto')
+    PedidoArchivado.objects.bulk_create([
+        PedidoArchivado(
+            id_original=p.id,
+            cliente_id=p.cliente_id,
+            fecha=p.fecha,
+            total=p.total,
+            estado=p.estado,
+            codigo_seguimiento=p.codigo_seguimiento,
+            tipo_entrega=p.tipo_entrega,
+            es_reserva=p.es_reserva,
+            detalles=[
+                {
+                    'producto_id': d.producto_id,
+                    'producto': d.producto.nombre,
+                    'cantidad': d.cantidad,
+                    'precio_unitario': str(d.precio_unitario),
+                }
+                for d in p.detalles.all()
+            ],
+        )
+        for p in pedidos
+    ], ignore_conflicts=True)
+    # Borra también sus DetallePedido (CASCADE) y desvincula notificaciones/correos (SET_NULL)
+    Pedido.objects.filter(id__in=ids).delete()
+
+
+def archivar_por_lotes(queryset, archivar, lote=TAMANO_LOTE, max_lotes=None, pausa=0):
+    """
+    Archiva las filas del queryset en lotes de tamaño acotado, cada uno en su propia transacción corta.
+
+    Como cada lote archiva y borra sus filas de forma atómica, el proceso se
+    puede interrumpir y relanzar: continúa con lo que quede. Genera
+    (filas_del_lote, segundos) por cada lote procesado.
+    """
+    lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        inicio = time.monotonic()
+        with transaction.atomic():
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:lote])
+            if not ids:
+                return
+            archivar(ids)
+        lotes += 1
+        yield len(ids), time.monotonic() - inicio
+        if pausa:
+            time.sleep(pausa)
+
+
+def archivar_notificaciones(dias=DIAS_NOTIFICACIONES, **kwargs):
+    return archivar_por_lotes(notificaciones_archivables(dias), _archivar_notificaciones, **kwargs)
+
+
+def archivar_pedidos(dias_entregados=DIAS_PEDIDOS, dias_pendientes=DIAS_PENDIENTES, **kwargs):
+    return archivar_por_lotes(pedidos_archivables(dias_entregados, dias_pendientes), _archivar_pedidos, **kwargs)
@@ -0,0 +1,150 @@
+"""
+Tarifas de envío por zona, peso y monto.
+
+Las filas activas de TarifaEnvio se guardan en la caché compartida y cada
+proceso arma con ellas un índice en memoria: un trie de prefijos de código
+postal, un diccionario de comunas y la tarifa general, cada zona con sus
+tramos de peso ordenados. Cotizar recorre a lo más los dígitos del código
+postal y no consulta la base. El índice se rearma cuando cambia la versión del
+espacio 'tarifas' (core.cache), que se sube al guardar o borrar una tarifa, y
+en todo caso cada CACHE_TTL_TARIFAS segundos: con una caché por proceso
+(locmem) la nueva versión solo la ve el worker que guardó, y los demás tardan
+a lo más dos TTL (índice y filas cacheadas) en cobrar la tarifa nueva.
+"""
+import sys
+import time
+import unicodedata
+from bisect import bisect_left
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count
+
+from core.cache import obtener, version, version_vigente
+
+from .models import Cliente, TarifaEnvio
+
+NAMESPACE = 'tarifas'
+
+# Si ninguna tarifa aplica (tabla vacía o sin tarifa general) se cobra lo de siempre
+ZONA_POR_DEFECTO = 'General'
+COSTO_POR_DEFECTO = Decimal('5990')
+GRATIS_DESDE_POR_DEFECTO = Decimal('25000')
+
+_SIN_LIMITE = sys.maxsize
+
+_indice = {'version': None, 'vence': 0}
+
+
+def normalizar_comuna(comuna):
+    """Misma clave para 'Ñuñoa', ' ñuñoa ' y 'Nunoa'."""
+    sin_tildes = unicodedata.normalize('NFKD', comuna or '').encode('ascii', 'ignore').decode()
+    return ' '.join(sin_tildes.casefold().split())
+
+
+def _leer_filas():
+    return list(
+        TarifaEnvio.objects.filter(activa=True)
+        .values_list('zona', 'comuna', 'prefijo_postal', 'peso_hasta_gramos', 'costo', 'gratis_desde')
+    )
+
+
+def construir_indice(filas):
+    """Índice de filas (zona, comuna, prefijo_postal, peso_hasta_gramos, costo, gratis_desde)."""
+    por_destino = {}
+    for zona, comuna, prefijo, hasta, costo, gratis_desde in filas:
+        tramo = (_SIN_LIMITE if hasta is None else hasta, zona, costo, gratis_desde)
+        if prefijo:
+            por_destino.setdefault(('prefijo', prefijo), []).append(tramo)
+        if comuna:
+            por_destino.setdefault(('comuna', normalizar_comuna(comuna)), []).append(tramo)
+        if not prefijo and not comuna:
+            por_destino.setdefault(('general', ''), []).append(tramo)
+
+    indice = {'trie': {}, 'comunas': {}, 'general': None}
+    for (tipo, clave), tramos in por_destino.items():
+        tramos.sort(key=lambda t: t[0])
+        destino = ([t[0] for t in tramos], tramos)
+        if tipo == 'prefijo':
+            nodo = indice['trie']
+            for digito in clave:
+                nodo = nodo.setdefault(digito, {})
+            # La clave None de un nodo guarda la zona del prefijo que termina ahí
+            nodo[None] = destino
+        elif tipo == 'comuna':
+            indice['comunas'][clave] = destino
+        else:
+            indice['general'] = destino
+    return indice
+
+
+def _indice_vigente():
+    global _indice
+    actual = version_vigente(NAMESPACE)
+    if actual is None or actual != _indice['version'] or time.monotonic() >= _indice['vence']:
+        # La versión se lee antes que las filas: si cambia entremedio, la próxima llamada rearma
+        vigente = version(NAMESPACE)
+        ttl = settings.CACHE_TTL_TARIFAS
+        filas = obtener(NAMESPACE, ('filas',), _leer_filas, ttl=ttl)
+        _indice = dict(construir_indice(filas), version=vigente, vence=time.monotonic() + ttl)
+    return _indice
+
+
+def _destino(indice, comuna, codigo_postal):
+    encontrado, nodo = None, indice['trie']
+    for caracter in codigo_postal or '':
+        if not caracter.isdigit():
+            continue
+        nodo = nodo.get(caracter)
+        if nodo is None:
+            break
+        encontrado = nodo.get(None, encontrado)
+    return encontrado or indice['comunas'].get(normalizar_comuna(comuna)) or indice['general']
+
+
+def _cotizar(indice, comuna, codigo_postal, peso_gramos, monto):
+    destino = _destino(indice, comuna, codigo_postal)
+    if destino is None:
+        zona, costo, gratis_desde = ZONA_POR_DEFECTO, COSTO_POR_DEFECTO, GRATIS_DESDE_POR_DEFECTO
+    else:
+        topes, tramos = destino
+        # El tramo más liviano que admite el peso; sobre el último tope se cobra el último
+        _tope, zona, costo, gratis_desde = tramos[min(bisect_left(topes, peso_gramos or 0), len(tramos) - 1)]
+    aplica_gratis = gratis_desde is not None and monto > gratis_desde
+    return {
+        'zona': zona,
+        'costo': costo,
+        'gratis_desde': gratis_desde,
+        'aplica_gratis': aplica_gratis,
+        'total': Decimal('0') if aplica_gratis else costo,
+    }
+
+
+def cotizar(comuna, codigo_postal, peso_gramos=0, monto=0):
+    """
+    Costo de despacho a un destino.
+
+    Devuelve {'zona', 'costo', 'gratis_desde', 'aplica_gratis', 'total'}; `total`
+    es lo que se cobra (0 si el monto supera `gratis_desde`).
+    """
+    return _cotizar(_indice_vigente(), comuna, codigo_postal, peso_gramos, monto)
+
+
+def cotizar_lote(destinos):
+    """Cotiza (comuna, codigo_postal, peso_gramos, monto) en lote, revisando la versión una sola vez."""
+    indice = _indice_vigente()
+    return [_cotizar(indice, *destino) for destino in destinos]
+
+
+def clientes_por_zona():
+    """Clientes en cada zona de envío con su tarifa base: un GROUP BY por destino y una cotización en lote."""
+    destinos = list(
+        Cliente.objects.values_list('comuna', 'codigo_postal').annotate(n=Count('id')).order_by()
+    )
+    zonas = {}
+    for (_comuna, _codigo, n), envio in zip(destinos, cotizar_lote((c, cp, 0, 0) for c, cp, _n in destinos)):
+        fila = zonas.setdefault(envio['zona'], {
+            'zona': envio['zona'], 'clientes': 0, 'costo': envio['costo'], 'gratis_desde': envio['gratis_desde'],
+        })
+        fila['clientes'] += n
+    return sorted(zonas.values(), key=lambda f: f['clientes'], reverse=True)
@@ -1,3 +1,843 @@
-from django.test import TestCase
+import importlib
+import smtplib
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from unittest import mock
+
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth.models import Group
+from django.contrib.messages import get_messages
+
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.rut import calcular_dv, normalizar_rut
+
+from .alertas import abrir_alerta
+from .clientes import recalcular_agregados
+from .despachos import LARGO_MAXIMO_CODIGO, despachar_pedidos, leer_filas
+from .correos import MAX_INTENTOS, RESERVA_LOTE, _reservar_lote, encolar_correo, espera_reintento, procesar_lote
+from .fabricas import (
+    GRUPO_ATENCION, GRUPO_LOGISTICA, ConsultasConstantesMixin, crear_cliente, crear_notificacion, crear_pedido,
+    crear_producto, crear_staff, crear_usuario, grupos,
+)
+from .models import Cliente, CorreoSaliente, Notificacion, Pedido, TarifaEnvio, VentaDiaria
+from .preparacion import lista_picking
+from .tarifas import cotizar, cotizar_lote
+from .totales import PedidoContabilizado, fijar_envio, fijar_lineas, recalcular_totales
+from .retencion import _archivar_pedidos
+from .ventas import recalcular_ventas, registrar_venta, revertir_venta
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConsultasGestionTests(ConsultasConstantesMixin, TestCase):
+    """Cantidad exacta de consultas de cada URL de logística y atención; no debe crecer con la cantidad de datos."""
+
+    def setUp(self):
+        grupos()
+        self.staff = crear_staff(GRUPO_LOGISTICA, GRUPO_ATENCION)
+        self.client.force_login(self.staff)
+
+    def _pedido(self, estado='Pagado (WebPay)', **campos):
+        """Pedido de un cliente nuevo con self.tamano líneas."""
+        return crear_pedido(crear_cliente(), self.productos(), estado=estado, **campos)
+
+    def _alerta(self, estado_pedido, tipo, **campos):
+        return crear_notificacion(self._pedido(estado=estado_pedido, **campos), tipo=tipo)
+
+    # --- Logística ---
+
+    def test_dashboard_logistica(self):
+        self.assertConsultasConstantes(7, lambda: self.client.get(reverse('dashboard_logistica')))
+
+    def test_preparar_pedido(self):
+        self.assertConsultasConstantes(
+            13, lambda pedido: self.client.get(reverse('preparar_pedido', args=[pedido.id])),
+            preparar=lambda: (self._pedido(),),
+        )
+
+    def test_confirmar_pedido_listo_formulario(self):
+        self.assertConsultasConstantes(
+            7, lambda pedido: self.client.get(reverse('confirmar_pedido_listo', args=[pedido.id])),
+            preparar=lambda: (self._pedido(estado='En Preparacion (WebPay)', tipo_entrega='Despacho'),),
+        )
+
+    def test_confirmar_pedido_listo_despacho(self):
+        self.assertConsultasConstantes(
+            11,
+            lambda pedido: self.client.post(
+                reverse('confirmar_pedido_listo', args=[pedido.id]), {'codigo_seguimiento': '123456789012'}
+            ),
+            preparar=lambda: (self._pedido(estado='En Preparacion (WebPay)', tipo_entrega='Despacho'),),
+        )
+
+    def test_confirmar_pedido_listo_retiro(self):
+        self.assertConsultasConstantes(
+            11, lambda pedido: self.client.get(reverse('confirmar_pedido_listo', args=[pedido.id])),
+            preparar=lambda: (self._pedido(estado='En Preparacion (WebPay)', tipo_entrega='Retiro'),),
+        )
+
+    def test_reportar_faltante(self):
+        self.assertConsultasConstantes(
+            13, lambda pedido: self.client.get(reverse('reportar_faltante', args=[pedido.id])),
+            preparar=lambda: (self._pedido(estado='En Preparacion (WebPay)'),),
+        )
+
+    def test_picking(self):
+        self.assertConsultasConstantes(8, lambda: self.client.get(reverse('picking')))
+
+    def test_picking_csv(self):
+        self.assertConsultasConstantes(4, lambda: self.client.get(reverse('picking'), {'formato': 'csv'}))
+
+    def test_despacho_masivo_formulario(self):
+        self.assertConsultasConstantes(6, lambda: self.client.get(reverse('despacho_masivo')))
+
+    def test_despacho_masivo(self):
+        def preparar():
+            pedidos = [self._pedido(estado='En Preparacion (WebPay)') for _ in range(self.tamano)]
+            return ('\n'.join(f"{p.id},{p.id:012d}" for p in pedidos),)
+
+        self.assertConsultasConstantes(
+            14, lambda contenido: self.client.post(reverse('despacho_masivo'), {'contenido': contenido}),
+            preparar=preparar,
+        )
+
+    def test_historial_despachos(self):
+        self.assertConsultasConstantes(
+            7, lambda: self.client.get(reverse('historial_despachos')),
+            preparar=lambda: [self._pedido(estado='Despachado (WebPay)') for _ in range(self.tamano)] and (),
+        )
+
+    # --- Atención al cliente ---
+
+    def test_dashboard_atencion(self):
+        self.assertConsultasConstantes(8, lambda: self.client.get(reverse('dashboard_atencion')))
+
+    def test_redactar_correo(self):
+        self.assertConsultasConstantes(
+            7, lambda notif: self.client.get(reverse('redactar_correo', args=[notif.id])),
+            preparar=lambda: (self._alerta('En Espera Faltante', 'FALTANTE'),),
+        )
+
+    def test_redactar_correo_enviar(self):
+        self.assertConsultasConstantes(
+            11,
+            lambda notif: self.client.post(
+                reverse('redactar_correo', args=[notif.id]), {'asunto': 'Su reserva', 'mensaje': 'Estamos en ello.'}
+            ),
+            preparar=lambda: (self._alerta('Reserva Pendiente', 'RESERVA', es_reserva=True),),
+        )
+
+    def test_registrar_respuesta(self):
+        self.assertConsultasConstantes(
+            2, lambda notif: self.client.get(reverse('registrar_respuesta', args=[notif.id])),
+            preparar=lambda: (self._alerta('En Espera Faltante', 'FALTANTE'),),
+        )
+
+    def test_marcar_gestionado(self):
+        self.assertConsultasConstantes(
+            9, lambda notif: self.client.get(reverse('marcar_gestionado', args=[notif.id])),
+            preparar=lambda: (self._alerta('En Espera Faltante', 'FALTANTE'),),
+        )
+
+    def test_marcar_leido_reserva(self):
+        self.assertConsultasConstantes(
+            11, lambda notif: self.client.get(reverse('marcar_leido', args=[notif.id])),
+            preparar=lambda: (self._alerta('Reserva En Camino', 'RESERVA', es_reserva=True),),
+        )
+
+    def test_confirmar_transferencia(self):
+        self.assertConsultasConstantes(
+            19, lambda notif: self.client.get(reverse('confirmar_transferencia', args=[notif.id])),
+            preparar=lambda: (self._alerta('Pendiente Pago (Transferencia)', 'TRANSFERENCIA'),),
+        )
+
+    def test_anular_pedido(self):
+        def preparar():
+            # Un producto agotado con reservas esperando: anular devuelve stock y las libera
+            agotado = crear_producto(stock=0)
+            for _ in range(self.tamano):
+                crear_pedido(crear_cliente(), [agotado], estado='Reserva Pendiente', es_reserva=True)
+            pedido = crear_pedido(crear_cliente(), self.productos() + [agotado], estado='Pagado (WebPay)')
+            return (crear_notificacion(pedido, tipo='FALTANTE'),)
+
+        self.assertConsultasConstantes(
+            24, lambda notif: self.client.get(reverse('anular_pedido', args=[notif.id])), preparar=preparar,
+        )
+
+    # --- Analítica y métricas ---
+
+    def test_analitica(self):
+        self.assertConsultasConstantes(12, lambda: self.client.get(reverse('analitica')))
+
+    def test_exportar_pedidos_csv(self):
+        self.assertConsultasConstantes(3, lambda: self.client.get(reverse('exportar_pedidos')))
+
+    def test_exportar_pedidos_xlsx(self):
+        self.assertConsultasConstantes(4, lambda: self.client.get(reverse('exportar_pedidos'), {'formato': 'xlsx'}))
+
+    @override_settings(EXPORTAR_XLSX_MAX_LINEAS=2)
+    def test_exportar_pedidos_xlsx_grande_no_se_arma_en_la_peticion(self):
+        crear_pedido(crear_cliente(), [crear_producto() for _ in range(3)])
+        hoy = timezone.localdate()
+
+        respuesta = self.client.get(reverse('exportar_pedidos'), {'formato': 'xlsx', 'desde': hoy, 'hasta': hoy})
+        self.assertRedirects(respuesta, f"{reverse('analitica')}?desde={hoy}&hasta={hoy}")
+        self.assertIn('3 líneas', str(list(get_messages(respuesta.wsgi_request))[0]))
+
+        csv = self.client.get(reverse('exportar_pedidos'), {'desde': hoy, 'hasta': hoy})
+        self.assertEqual(len(b''.join(csv.streaming_content).decode('utf-8-sig').splitlines()), 4)
+
+    def test_metricas_correos(self):
+        self.assertConsultasConstantes(6, lambda: self.client.get(reverse('metricas_correos')))
+
+    def test_metricas_cache(self):
+        self.assertConsultasConstantes(2, lambda: self.client.get(reverse('metricas_cache')))
+
+    def test_anular_pedido_libera_reservas(self):
+        agotado = crear_producto(stock=0)
+        reserva = crear_pedido(crear_cliente(), [agotado], estado='Reserva Pendiente', es_reserva=True)
+        pedido = crear_pedido(crear_cliente(), [(agotado, 2)], estado='Pagado (WebPay)')
+        notif = crear_notificacion(pedido, tipo='FALTANTE')
+
+        self.client.get(reverse('anular_pedido', args=[notif.id]))
+
+        agotado.refresh_from_db()
+        self.assertEqual(agotado.stock, 2)
+        self.assertEqual(Pedido.objects.get(id=reserva.id).estado, 'Reserva Disponible')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TotalesPedidoTests(TestCase):
+    def test_fijar_lineas_y_envio(self):
+        pedido = fijar_lineas(Pedido(), [(Decimal('1000'), 2, 300), ('500', 1, 100)])
+        self.assertEqual(
+            (pedido.subtotal, pedido.cantidad_items, pedido.peso_gramos, pedido.total),
+            (Decimal('2500'), 3, 700, Decimal('2500')),
+        )
+        fijar_envio(pedido, 5990)
+        self.assertEqual((pedido.costo_envio, pedido.total), (Decimal('5990'), Decimal('8490')))
+
+    def test_recalcular_totales_conserva_envio_y_descuento(self):
+        producto = crear_producto(precio=Decimal('1000'), peso_gramos=250)
+        pedido = crear_pedido(crear_cliente(), [(producto, 2)], estado='Pendiente')
+        Pedido.objects.filter(pk=pedido.pk).update(costo_envio=5990, descuento=500)
+        pedido.refresh_from_db()
+        pedido.detalles.update(cantidad=3)
+
+        recalcular_totales(pedido)
+
+        pedido.refresh_from_db()
+        self.assertEqual(
+            (pedido.subtotal, pedido.cantidad_items, pedido.peso_gramos, pedido.total),
+            (Decimal('3000'), 3, 750, Decimal('8490')),
+        )
+
+    def test_recalcular_totales_rechaza_pedido_contabilizado(self):
+        pedido = crear_pedido(crear_cliente(), [crear_producto()], estado='Pagado (WebPay)')
+        registrar_venta(pedido)
+        with self.assertRaises(PedidoContabilizado):
+            recalcular_totales(pedido)
+
+    # --- Admin ---
+
+    def _editar_en_admin(self, pedido, cantidad, total, estado=None, cliente=None):
+        detalle = pedido.detalles.get()
+        self.client.force_login(crear_usuario(is_staff=True, is_superuser=True))
+        return self.client.post(reverse('admin:gestion_pedido_change', args=[pedido.pk]), {
+            'cliente': (cliente or pedido.cliente).pk, 'estado': estado or pedido.estado, 'codigo_seguimiento': '',
+            'tipo_entrega': pedido.tipo_entrega, 'total': total,
+            'detalles-TOTAL_FORMS': 1, 'detalles-INITIAL_FORMS': 1,
+            'detalles-MIN_NUM_FORMS': 0, 'detalles-MAX_NUM_FORMS': 1000,
+            'detalles-0-id': detalle.pk, 'detalles-0-pedido': pedido.pk, 'detalles-0-producto': detalle.producto_id,
+            'detalles-0-cantidad': cantidad, 'detalles-0-precio_unitario': detalle.precio_unitario,
+        })
+
+    def test_admin_recalcula_y_no_acepta_total_manual(self):
+        pedido = crear_pedido(crear_cliente(), [crear_producto(precio=Decimal('1000'))], estado='Pendiente')
+
+        response = self._editar_en_admin(pedido, cantidad=4, total='1')
+
+        self.assertEqual(response.status_code, 302)
+        pedido.refresh_from_db()
+        self.assertEqual((pedido.cantidad_items, pedido.subtotal, pedido.total), (4, Decimal('4000'), Decimal('4000')))
+
+    def test_admin_no_cambia_lineas_de_pedido_contabilizado(self):
+        pedido = crear_pedido(crear_cliente(), [crear_producto(precio=Decimal('1000'))], estado='Pagado (WebPay)')
+        registrar_venta(pedido)
+        resumen = list(VentaDiaria.objects.order_by('pk').values_list('pedidos', 'unidades', 'ingresos'))
+
+        # 'Pagado (WebPay)' no está entre las opciones del formulario; 'Entregado' también cuenta como venta
+        response = self._editar_en_admin(pedido, cantidad=4, total='1', estado='Entregado')
+
+        self.assertEqual(response.status_code, 302)
+        pedido.refresh_from_db()
+        self.assertEqual((pedido.detalles.get().cantidad, pedido.total), (1, Decimal('1000')))
+        self.assertEqual(list(VentaDiaria.objects.order_by('pk').values_list('pedidos', 'unidades', 'ingresos')), resumen)
+
+    def _ventas_y_cliente(self, cliente):
+        cliente.refresh_from_db()
+        ventas = {
+            (v.dimension, v.clave): (v.pedidos, v.unidades, v.ingresos)
+            for v in VentaDiaria.objects.exclude(pedidos=0)
+        }
+        return ventas, (cliente.cantidad_pedidos, cliente.total_gastado)
+
+    def test_admin_suma_la_venta_al_pasar_a_estado_vendido(self):
+        cliente = crear_cliente()
+        pedido = crear_pedido(cliente, [crear_producto(precio=Decimal('1000'))], estado='Pendiente')
+
+        self.assertEqual(self._editar_en_admin(pedido, cantidad=2, total='1', estado='Entregado').status_code, 302)
+
+        pedido.refresh_from_db()
+        self.assertTrue(pedido.contabilizado)
+        ventas, agregados = self._ventas_y_cliente(cliente)
+        self.assertEqual(ventas[('TOTAL', '')], (1, 2, Decimal('2000')))
+        self.assertEqual(agregados, (1, Decimal('2000')))
+
+    def test_admin_revierte_la_venta_al_cancelar(self):
+        cliente = crear_cliente()
+        pedido = crear_pedido(cliente, [crear_producto(precio=Decimal('1000'))], estado='Pagado (Transferencia)')
+        registrar_venta(pedido)
+        self.assertIn(('PAGO', 'Transferencia'), self._ventas_y_cliente(cliente)[0])
+
+        self.assertEqual(self._editar_en_admin(pedido, cantidad=1, total='1', estado='Cancelado').status_code, 302)
+
+        pedido.refresh_from_db()
+        self.assertFalse(pedido.contabilizado)
+        self.assertEqual(self._ventas_y_cliente(cliente), ({}, (0, Decimal('0'))))
+        # El recálculo completo llega a lo mismo
+        list(recalcular_ventas())
+        list(recalcular_agregados())
+        self.assertEqual(self._ventas_y_cliente(cliente), ({}, (0, Decimal('0'))))
+
+    def test_admin_no_cambia_el_cliente_de_una_venta(self):
+        dueno, otro = crear_cliente(), crear_cliente()
+        pedido = crear_pedido(dueno, [crear_producto(precio=Decimal('1000'))], estado='Pagado (WebPay)')
+        registrar_venta(pedido)
+
+        self.assertEqual(self._editar_en_admin(pedido, cantidad=1, total='1', estado='Entregado', cliente=otro).status_code, 302)
+
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.cliente, dueno)
+        self.assertEqual(self._ventas_y_cliente(dueno)[1], (1, Decimal('1000')))
+        self.assertEqual(self._ventas_y_cliente(otro)[1], (0, Decimal('0')))
+
+
+class TarifasEnvioTests(TestCase):
+    def setUp(self):
+        # Sin la tarifa 'Nacional' de la migración; vaciar la caché obliga a rearmar el índice
+        TarifaEnvio.objects.all().delete()
+        cache.clear()
+
+    def _tarifa(self, costo, **campos):
+        campos.setdefault('zona', f"Zona {costo}")
+        with self.captureOnCommitCallbacks(execute=True):
+            return TarifaEnvio.objects.create(costo=Decimal(costo), **campos)
+
+    def test_tabla_vacia_usa_tarifa_por_defecto(self):
+        envio = cotizar('Concepción', '4030000', 500, Decimal('10000'))
+        self.assertEqual((envio['zona'], envio['total'], envio['gratis_desde']), ('General', Decimal('5990'), Decimal('25000')))
+
+    def test_gana_el_prefijo_postal_mas_largo(self):
+        self._tarifa(1000, zona='General')
+        self._tarifa(2000, prefijo_postal='40')
+        self._tarifa(3000, prefijo_postal='403')
+        self._tarifa(4000, comuna='Concepción')
+
+        self.assertEqual(cotizar('Concepción', '4030000')['costo'], Decimal('3000'))
+        self.assertEqual(cotizar('Concepción', '4050000')['costo'], Decimal('2000'))
+        # Puntos, espacios y guiones del código postal se saltan
+        self.assertEqual(cotizar('', ' 40.3-0000')['costo'], Decimal('3000'))
+        self.assertEqual(cotizar('Concepción', '7500000')['costo'], Decimal('4000'))
+        self.assertEqual(cotizar('Chillán', '')['costo'], Decimal('1000'))
+
+    def test_comuna_sin_tildes_ni_mayusculas(self):
+        self._tarifa(2500, comuna='Ñuñoa')
+        for escrita in ('Ñuñoa', '  ñuñoa ', 'NUNOA'):
+            self.assertEqual(cotizar(escrita, '')['costo'], Decimal('2500'))
+
+    def test_tramos_de_peso(self):
+        self._tarifa(2000, zona='Nacional', peso_hasta_gramos=1000)
+        self._tarifa(4000, zona='Nacional', peso_hasta_gramos=5000)
+
+        self.assertEqual(cotizar('', '', 1000)['costo'], Decimal('2000'))
+        self.assertEqual(cotizar('', '', 1001)['costo'], Decimal('4000'))
+        # Sobre el último tope se cobra el último tramo
+        self.assertEqual(cotizar('', '', 20000)['costo'], Decimal('4000'))
+
+    def test_envio_gratis_sobre_el_umbral(self):
+        self._tarifa(3000, comuna='Talcahuano', gratis_desde=Decimal('20000'))
+        self._tarifa(3000, comuna='Lota')
+
+        en_el_umbral = cotizar('Talcahuano', '', 0, Decimal('20000'))
+        sobre_el_umbral = cotizar('Talcahuano', '', 0, Decimal('20001'))
+        self.assertEqual((en_el_umbral['aplica_gratis'], en_el_umbral['total']), (False, Decimal('3000')))
+        self.assertEqual((sobre_el_umbral['aplica_gratis'], sobre_el_umbral['total']), (True, Decimal('0')))
+        self.assertFalse(cotizar('Lota', '', 0, Decimal('999999'))['aplica_gratis'])
+
+    def test_lote_igual_a_cotizaciones_sueltas(self):
+        self._tarifa(1000)
+        self._tarifa(2000, prefijo_postal='75', peso_hasta_gramos=2000)
+        destinos = [('', '7500000', 100, 0), ('', '7500000', 3000, 0), ('Lota', '', 0, Decimal('30000'))]
+        self.assertEqual(cotizar_lote(destinos), [cotizar(*d) for d in destinos])
+
+    def test_guardar_y_borrar_invalidan_el_indice(self):
+        tarifa = self._tarifa(1000, zona='General')
+        self.assertEqual(cotizar('', '')['costo'], Decimal('1000'))
+
+        tarifa.costo = Decimal('2000')
+        with self.captureOnCommitCallbacks(execute=True):
+            tarifa.save()
+        self.assertEqual(cotizar('', '')['costo'], Decimal('2000'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tarifa.delete()
+        self.assertEqual(cotizar('', '')['zona'], 'General')
+        self.assertEqual(cotizar('', '')['costo'], Decimal('5990'))
+
+    def test_indice_vigente_no_consulta_la_base(self):
+        # Como otro worker con caché propia: el UPDATE no sube la versión que ve este proceso
+        self._tarifa(1000, zona='General')
+        self.assertEqual(cotizar('', '')['costo'], Decimal('1000'))
+        TarifaEnvio.objects.update(costo=Decimal('2000'))
+        self.assertEqual(cotizar('', '')['costo'], Decimal('1000'))
+
+    @override_settings(CACHE_TTL_TARIFAS=0)
+    def test_indice_vencido_se_rearma(self):
+        self._tarifa(1000, zona='General')
+        self.assertEqual(cotizar('', '')['costo'], Decimal('1000'))
+        TarifaEnvio.objects.update(costo=Decimal('2000'))
+        self.assertEqual(cotizar('', '')['costo'], Decimal('2000'))
+
+
+class RutCanonicoTests(TestCase):
+    migracion = importlib.import_module('gestion.migrations.0019_rut_canonico')
+
+    def test_copia_congelada_igual_a_core_rut(self):
+        dv = calcular_dv(7654321)
+        for rut in (f"7.654.321-{dv}", f"7654321{dv.lower()}", '7654321-0', '', '12a', f"0{7654321}-{dv}", '999999-9'):
+            self.assertEqual(self.migracion.rut_canonico(rut), normalizar_rut(rut), rut)
+
+    def test_migracion_deja_el_rut_al_cliente_con_mas_pedidos(self):
+        dv = calcular_dv(12345678)
+        con_puntos = crear_cliente(rut=f"12.345.678-{dv}", cantidad_pedidos=1)
+        sin_guion = crear_cliente(rut=f"12345678{dv}", cantidad_pedidos=5)
+        otro = crear_cliente(rut=f"7.654.321-{calcular_dv(7654321).lower()}")
+        blanco = crear_cliente(rut='   ')
+        invalido = crear_cliente(rut='12.345.678-X')
+
+        self.migracion.canonizar(apps, None)
+
+        ruts = dict(Cliente.objects.values_list('id', 'rut'))
+        self.assertEqual(ruts[sin_guion.id], f"12345678-{dv}")
+        self.assertIsNone(ruts[con_puntos.id])
+        self.assertEqual(ruts[otro.id], f"7654321-{calcular_dv(7654321)}")
+        self.assertIsNone(ruts[blanco.id])
+        self.assertEqual(ruts[invalido.id], '12.345.678-X')
+
+    def test_busqueda_admin_por_rut_no_pierde_la_busqueda_normal(self):
+        rut = f"12345678{calcular_dv(12345678)}"
+        por_rut = crear_cliente(rut=normalizar_rut(rut))
+        por_correo = crear_cliente(email=f"{rut}@correo.cl")
+        crear_cliente()
+
+        modelo_admin = admin.site._registry[Cliente]
+        request = RequestFactory().get('/')
+        for termino in (rut, f"12.345.678-{rut[-1]}"):
+            resultados, _duplicados = modelo_admin.get_search_results(request, Cliente.objects.all(), termino)
+            esperados = {por_rut.id, por_correo.id} if termino == rut else {por_rut.id}
+            self.assertEqual(set(resultados.values_list('id', flat=True)), esperados)
+
+
+class ListaPickingTests(TestCase):
+    def test_lista_todos_los_pedidos_de_cada_producto(self):
+        avena, miel = crear_producto(nombre='Avena'), crear_producto(nombre='Miel')
+        # Más ids de los que caben en los 1024 bytes de GROUP_CONCAT de MySQL
+        en_cola = [crear_pedido(crear_cliente(), [(avena, 2), miel] if i % 2 else [(avena, 2)]).id for i in range(300)]
+        crear_pedido(crear_cliente(), [avena], estado='Pendiente')
+
+        filas = {fila['nombre']: fila for fila in lista_picking('nombre')}
+        self.assertEqual(filas['Avena']['pedidos'], en_cola)
+        self.assertEqual((filas['Avena']['num_pedidos'], filas['Avena']['cantidad_total']), (300, 600))
+        self.assertEqual(filas['Miel']['pedidos'], en_cola[1::2])
+
+    def test_stock_restante_no_se_compara_con_lo_ya_pagado(self):
+        # El pago ya descontó las 5 unidades: quedan 2 en bodega y no falta nada
+        producto = crear_producto(nombre='Quinoa', stock=2)
+        crear_pedido(crear_cliente(), [(producto, 5)])
+        self.client.force_login(crear_staff(GRUPO_LOGISTICA))
+
+        respuesta = self.client.get(reverse('picking'))
+
+        self.assertContains(respuesta, '2 unid.')
+        self.assertNotContains(respuesta, 'Falta Stock')
+
+
+class AlertasTests(TestCase):
+    def setUp(self):
+        self.grupo = Group.objects.create(name='Atencion al cliente')
+        self.pedido = crear_pedido(crear_cliente(), [crear_producto()])
+
+    def test_una_sola_alerta_abierta_por_pedido_y_tipo(self):
+        alerta, creada = abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante')
+        otra, creada_otra = abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante otra vez')
+        self.assertTrue(creada)
+        self.assertEqual((otra, creada_otra), (alerta, False))
+
+        alerta.estado = 'ESPERA'
+        alerta.save()
+        self.assertEqual(abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante'), (alerta, False))
+
+        _, creada_transferencia = abrir_alerta(self.pedido, 'TRANSFERENCIA', self.grupo, 'Transferencia')
+        self.assertTrue(creada_transferencia)
+
+    def test_alertas_cerradas_no_cuentan(self):
+        for estado in ('LISTO', 'CANCELADO'):
+            cerrada, _ = abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante')
+            cerrada.estado = estado
+            cerrada.save()
+            nueva, creada = abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante de nuevo')
+            self.assertTrue(creada)
+            self.assertNotEqual(nueva, cerrada)
+            nueva.estado = 'LISTO'
+            nueva.save()
+        self.assertEqual(Notificacion.objects.filter(pedido=self.pedido).count(), 4)
+
+    def test_la_base_rechaza_una_segunda_alerta_abierta(self):
+        abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Notificacion.objects.create(pedido=self.pedido, tipo='FALTANTE', estado='ESPERA', destinatario_grupo=self.grupo)
+
+    def test_sin_indices_parciales_bloquea_el_pedido(self):
+        # Como en MySQL, donde Django omite la restricción parcial
+        original = QuerySet.select_for_update
+        with mock.patch.object(connection.features, 'supports_partial_indexes', False), \
+                mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=original) as bloquear:
+            alerta, creada = abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante')
+            self.assertEqual(abrir_alerta(self.pedido, 'FALTANTE', self.grupo, 'Faltante'), (alerta, False))
+        self.assertTrue(creada)
+        self.assertEqual([llamada.args[0].model for llamada in bloquear.call_args_list], [Pedido, Pedido])
+
+
+class AgregadosClienteTests(TestCase):
+    def setUp(self):
+        self.cliente = crear_cliente()
+        self.productos = [crear_producto(precio=1000), crear_producto(precio=2500)]
+
+    def _pedido(self, dias_atras, estado='Pagado (WebPay)', vender=True):
+        pedido = crear_pedido(self.cliente, self.productos, estado=estado)
+        Pedido.objects.filter(pk=pedido.pk).update(fecha=timezone.now() - timedelta(days=dias_atras))
+        pedido.refresh_from_db()
+        if vender:
+            registrar_venta(pedido)
+        return pedido
+
+    def _agregados(self):
+        self.cliente.refresh_from_db()
+        return self.cliente.cantidad_pedidos, self.cliente.total_gastado, self.cliente.ultimo_pedido
+
+    def test_sumar_no_retrocede_el_ultimo_pedido(self):
+        reciente = self._pedido(1)
+        antiguo = self._pedido(10)
+        self.assertEqual(self._agregados(), (2, reciente.total + antiguo.total, reciente.fecha))
+
+    def test_restar_recalcula_el_ultimo_con_los_que_siguen_contando(self):
+        archivado = self._pedido(400, estado='Entregado')
+        _archivar_pedidos([archivado.id])
+        medio = self._pedido(20)
+        reciente = self._pedido(1)
+
+        revertir_venta(reciente)
+        self.assertEqual(self._agregados(), (2, archivado.total + medio.total, medio.fecha))
+        revertir_venta(medio)
+        self.assertEqual(self._agregados(), (1, archivado.total, archivado.fecha))
+
+    def test_recalcular_coincide_con_suma_y_resta(self):
+        archivado = self._pedido(400, estado='Entregado')
+        _archivar_pedidos([archivado.id])
+        self._pedido(30)
+        anulado = self._pedido(5)
+        self._pedido(2)
+        revertir_venta(anulado)
+        # Pagado pero nunca contabilizado: no cuenta por ninguno de los dos caminos
+        self._pedido(1, estado='Pagado (Transferencia)', vender=False)
+        crear_pedido(self.cliente, self.productos, estado='Pendiente')
+        incremental = self._agregados()
+
+        Cliente.objects.filter(pk=self.cliente.pk).update(cantidad_pedidos=0, total_gastado=0, ultimo_pedido=None)
+        self.assertEqual(list(recalcular_agregados()), [(1, 1)])
+        self.assertEqual(self._agregados(), incremental)
+        self.assertEqual(incremental[0], 3)
+        self.assertEqual(list(recalcular_agregados()), [(1, 0)])
+
+
+class ConexionSmtpFalsa:
+    """Conexión de correo que rechaza ciertos destinatarios, o no abre si `caida`."""
+
+    def __init__(self, rechazados=(), caida=False):
+        self.rechazados, self.caida, self.enviados = set(rechazados), caida, []
+
+    def open(self):
+        if self.caida:
+            raise ConnectionRefusedError("smtp no responde")
+
+    def close(self):
+        pass
+
+    def send_messages(self, mensajes):
+        for mensaje in mensajes:
+            if mensaje.to[0] in self.rechazados:
+                raise smtplib.SMTPRecipientsRefused({mensaje.to[0]: (550, b'buzon no existe')})
+            self.enviados.append(mensaje)
+        return len(mensajes)
+
+
+class ColaCorreosTests(TestCase):
+    def setUp(self):
+        self.ahora = timezone.now()
+
+    def _correo(self, destinatario='ana@correo.cl'):
+        correo = encolar_correo(destinatario, 'Tu pedido', 'Hola')
+        CorreoSaliente.objects.filter(pk=correo.pk).update(proximo_intento=self.ahora)
+        return correo
+
+    def _en(self, segundos):
+        """Ejecuta como si hubieran pasado `segundos` desde ahora."""
+        return mock.patch('django.utils.timezone.now', return_value=self.ahora + timedelta(seconds=segundos))
+
+    def test_espera_entre_reintentos(self):
+        esperas = [espera_reintento(i).total_seconds() for i in range(1, 9)]
+        self.assertEqual(esperas, [60, 120, 240, 480, 960, 1920, 3600, 3600])
+
+    def test_un_rechazo_no_frena_el_resto_del_lote(self):
+        ok, rechazado = self._correo(), self._correo('nadie@correo.cl')
+        conexion = ConexionSmtpFalsa(rechazados={'nadie@correo.cl'})
+
+        with self._en(0):
+            self.assertEqual(procesar_lote(connection=conexion), (1, 1))
+
+        ok.refresh_from_db()
+        rechazado.refresh_from_db()
+        self.assertEqual((ok.estado, ok.intentos, ok.ultimo_error), ('ENVIADO', 1, ''))
+        self.assertEqual((rechazado.estado, rechazado.intentos), ('PENDIENTE', 1))
+        self.assertIn('SMTPRecipientsRefused', rechazado.ultimo_error)
+        self.assertEqual(rechazado.proximo_intento, self.ahora + timedelta(seconds=60))
+        self.assertEqual([m.to for m in conexion.enviados], [['ana@correo.cl']])
+
+    def test_sin_conexion_se_reintenta_todo_el_lote(self):
+        correos = [self._correo(), self._correo('otra@correo.cl')]
+        with self._en(0):
+            self.assertEqual(procesar_lote(connection=ConexionSmtpFalsa(caida=True)), (0, 2))
+            # Reprogramados: todavía no vencen
+            self.assertEqual(procesar_lote(connection=ConexionSmtpFalsa()), (0, 0))
+        for correo in correos:
+            correo.refresh_from_db()
+            self.assertEqual((correo.estado, correo.intentos), ('PENDIENTE', 1))
+            self.assertIn('ConnectionRefusedError', correo.ultimo_error)
+
+        with self._en(60):
+            self.assertEqual(procesar_lote(connection=ConexionSmtpFalsa()), (2, 0))
+
+    def test_reserva_vencida_se_vuelve_a_tomar(self):
+        correo = self._correo()
+        # Un worker reservó el lote y murió antes de enviarlo
+        with self._en(0):
+            self.assertEqual(_reservar_lote(10), [correo])
+            self.assertEqual(procesar_lote(connection=ConexionSmtpFalsa()), (0, 0))
+        with self._en(RESERVA_LOTE - 1):
+            self.assertEqual(procesar_lote(connection=ConexionSmtpFalsa()), (0, 0))
+        with self._en(RESERVA_LOTE):
+            self.assertEqual(procesar_lote(connection=ConexionSmtpFalsa()), (1, 0))
+
+    def test_agotados_los_intentos_queda_fallido(self):
+        correo = self._correo('nadie@correo.cl')
+        conexion = ConexionSmtpFalsa(rechazados={'nadie@correo.cl'})
+        transcurrido = 0
+        for intento in range(1, MAX_INTENTOS + 1):
+            with self._en(transcurrido):
+                self.assertEqual(procesar_lote(connection=conexion), (0, 1))
+            correo.refresh_from_db()
+            self.assertEqual(correo.intentos, intento)
+            transcurrido += espera_reintento(intento).total_seconds()
+
+        self.assertEqual(correo.estado, 'FALLIDO')
+        with self._en(transcurrido + 10 ** 6):
+            self.assertEqual(procesar_lote(connection=ConexionSmtpFalsa()), (0, 0))
+
+
+class VentasDiariasTests(TestCase):
+    def setUp(self):
+        self.avena = crear_producto(nombre='Avena', precio=1000)
+        self.miel = crear_producto(nombre='Miel', precio=2500)
+        self.hoy = timezone.localdate()
+
+    def _pedido(self, lineas, estado='Pagado (WebPay)', dias_atras=0, **campos):
+        pedido = crear_pedido(crear_cliente(), lineas, estado=estado, **campos)
+        fecha = timezone.make_aware(datetime.combine(self.hoy - timedelta(days=dias_atras), time(12)))
+        Pedido.objects.filter(pk=pedido.pk).update(fecha=fecha)
+        pedido.refresh_from_db()
+        return pedido
+
+    def _resumen(self):
+        """Filas con movimiento: {(fecha, dimension, clave): (pedidos, unidades, ingresos)}."""
+        return {
+            (v.fecha, v.dimension, v.clave): (v.pedidos, v.unidades, v.ingresos)
+            for v in VentaDiaria.objects.exclude(pedidos=0)
+        }
+
+    def test_registrar_y_revertir_son_idempotentes(self):
+        pedido = self._pedido([self.avena])
+        self.assertFalse(revertir_venta(pedido))
+        self.assertTrue(registrar_venta(pedido))
+        self.assertFalse(registrar_venta(Pedido.objects.get(pk=pedido.pk)))
+        self.assertEqual(self._resumen()[(self.hoy, 'TOTAL', '')], (1, 1, Decimal('1000')))
+
+        self.assertTrue(revertir_venta(pedido))
+        self.assertFalse(revertir_venta(Pedido.objects.get(pk=pedido.pk)))
+        self.assertEqual(self._resumen(), {})
+        self.assertFalse(Pedido.objects.get(pk=pedido.pk).contabilizado)
+
+    def test_suma_y_resta_por_fila(self):
+        webpay = self._pedido([(self.avena, 2), (self.miel, 3)])
+        transferencia = self._pedido([self.avena], estado='Pagado (Transferencia)', tipo_entrega='Retiro')
+        registrar_venta(webpay)
+        registrar_venta(transferencia)
+
+        avena, miel = str(self.avena.id), str(self.miel.id)
+        esperado = {
+            (self.hoy, 'TOTAL', ''): (2, 6, Decimal('10500')),
+            (self.hoy, 'PRODUCTO', avena): (2, 3, Decimal('3000')),
+            (self.hoy, 'PRODUCTO', miel): (1, 3, Decimal('7500')),
+            (self.hoy, 'PAGO', 'WebPay'): (1, 5, Decimal('9500')),
+            (self.hoy, 'PAGO', 'Transferencia'): (1, 1, Decimal('1000')),
+            (self.hoy, 'ENTREGA', 'Despacho'): (1, 5, Decimal('9500')),
+            (self.hoy, 'ENTREGA', 'Retiro'): (1, 1, Decimal('1000')),
+        }
+        self.assertEqual(self._resumen(), esperado)
+
+        revertir_venta(webpay)
+        self.assertEqual(self._resumen(), {
+            (self.hoy, 'TOTAL', ''): (1, 1, Decimal('1000')),
+            (self.hoy, 'PRODUCTO', avena): (1, 1, Decimal('1000')),
+            (self.hoy, 'PAGO', 'Transferencia'): (1, 1, Decimal('1000')),
+            (self.hoy, 'ENTREGA', 'Retiro'): (1, 1, Decimal('1000')),
+        })
+        self.assertEqual(VentaDiaria.objects.get(fecha=self.hoy, dimension='PRODUCTO', clave=miel).etiqueta, 'Miel')
+
+    def test_recalcular_coincide_con_el_camino_incremental(self):
+        for dias, estado, lineas in (
+            (0, 'Pagado (WebPay)', [self.avena]),
+            (0, 'Pagado (Transferencia)', [(self.miel, 2)]),
+            (3, 'En Preparacion (WebPay)', [self.avena, self.miel]),
+            (40, 'Pagado (WebPay)', [(self.avena, 4)]),
+        ):
+            registrar_venta(self._pedido(lineas, estado=estado, dias_atras=dias))
+
+        anulado = self._pedido([self.miel], dias_atras=3)
+        registrar_venta(anulado)
+        revertir_venta(anulado)
+        Pedido.objects.filter(pk=anulado.pk).update(estado='Anulado / Reembolsado')
+
+        archivado = self._pedido([(self.miel, 5)], estado='Pagado (Transferencia)', dias_atras=400)
+        registrar_venta(archivado)
+        Pedido.objects.filter(pk=archivado.pk).update(estado='Despachado (Transferencia)')
+        _archivar_pedidos([archivado.id])
+        self._pedido([self.avena], estado='Pendiente', dias_atras=1)
+
+        incremental = self._resumen()
+        VentaDiaria.objects.all().delete()
+        tramos = list(recalcular_ventas())
+
+        self.assertEqual(self._resumen(), incremental)
+        self.assertEqual(tramos[0][0], self.hoy - timedelta(days=400))
+        self.assertEqual(incremental[(self.hoy - timedelta(days=400), 'PAGO', 'Transferencia')], (1, 5, Decimal('12500')))
+        self.assertEqual(
+            set(Pedido.objects.filter(contabilizado=True).values_list('estado', flat=True)),
+            {'Pagado (WebPay)', 'Pagado (Transferencia)', 'En Preparacion (WebPay)'},
+        )
+
+
+class DespachoMasivoTests(TestCase):
+    def setUp(self):
+        producto = crear_producto()
+        self.webpay = crear_pedido(crear_cliente(), [producto])
+        self.transferencia = crear_pedido(crear_cliente(), [producto], estado='En Preparacion (Transferencia)')
+        self.retiro = crear_pedido(crear_cliente(), [producto], tipo_entrega='Retiro')
+        self.pendiente = crear_pedido(crear_cliente(), [producto], estado='Pendiente')
+        self.libre = crear_pedido(crear_cliente(), [producto])
+
+    def test_reporte_por_fila(self):
+        lineas = [
+            'pedido_id,codigo_seguimiento',
+            f"{self.webpay.id},AB123",
+            f"{self.transferencia.id}, CD456 ",
+            f"{self.webpay.id},EF789",
+            '²,XX1',
+            '١٢,XX2',
+            '99999999999999999999999,XX3',
+            'abc,XX4',
+            '',
+            '987654,XX5',
+            f"{self.libre.id},",
+            f"{self.libre.id}",
+            f"{self.retiro.id},GH000",
+            f"{self.pendiente.id},IJ111",
+            f"{Pedido.objects.order_by('-id').first().id + 1},KL222",
+            f"{self.libre.id},1234567890123",
+        ]
+        resultados, correos = despachar_pedidos(leer_filas(lineas))
+
+        reporte = [(r['linea'], r['ok'], r['mensaje']) for r in resultados]
+        self.assertEqual(reporte, [
+            (2, True, 'Despachado (WebPay)'),
+            (3, True, 'Despachado (Transferencia)'),
+            (4, False, "Pedido repetido en el archivo."),
+            (5, False, "ID de pedido inválido."),
+            (6, False, "ID de pedido inválido."),
+            (7, False, "ID de pedido inválido."),
+            (8, False, "ID de pedido inválido."),
+            (10, False, "El pedido no existe."),
+            (11, False, "Falta el código de seguimiento."),
+            (12, False, "Falta el código de seguimiento."),
+            (13, False, "Es un retiro en tienda, no lleva courier."),
+            (14, False, "No se puede despachar en estado 'Pendiente'."),
+            (15, False, "El pedido no existe."),
+            (16, False, f"El código supera los {LARGO_MAXIMO_CODIGO} caracteres."),
+        ])
+        self.assertEqual(correos, 2)
+        self.transferencia.refresh_from_db()
+        self.assertEqual(self.transferencia.codigo_seguimiento, 'CD456')
+        self.assertEqual(CorreoSaliente.objects.filter(pedido__in=[self.webpay, self.transferencia]).count(), 2)
+        self.assertEqual(Pedido.objects.get(pk=self.libre.pk).estado, 'Pagado (WebPay)')
+
+    def test_fila_corregida_despues_de_un_error(self):
+        lineas = [
+            'pedido_id,codigo_seguimiento',
+            f"{self.libre.id},",
+            f"{self.libre.id},MN333",
+            f"{self.libre.id},OP444",
+        ]
+        resultados, correos = despachar_pedidos(leer_filas(lineas))
+
+        self.assertEqual([(r['linea'], r['ok'], r['mensaje']) for r in resultados], [
+            (2, False, "Falta el código de seguimiento."),
+            (3, True, 'Despachado (WebPay)'),
+            (4, False, "Pedido repetido en el archivo."),
+        ])
+        self.assertEqual(correos, 1)
+        self.libre.refresh_from_db()
+        self.assertEqual((self.libre.estado, self.libre.codigo_seguimiento), ('Despachado (WebPay)', 'MN333'))
+
+    def test_vista_informa_ids_con_digitos_no_ascii(self):
+        grupos()
+        self.client.force_login(crear_staff(GRUPO_LOGISTICA))
+        respuesta = self.client.post(reverse('despacho_masivo'), {'contenido': f"²,AB1\n{self.webpay.id},AB2"})
+        self.assertContains(respuesta, "ID de pedido inválido.")
+        self.assertEqual(Pedido.objects.get(pk=self.webpay.pk).estado, 'Despachado (WebPay)')
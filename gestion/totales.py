@@ -0,0 +1,65 @@
+"""
+Subtotal, cantidad de productos, peso y costo de envío guardados en Pedido.
+
+Se fijan al escribir las líneas (checkout, reservas) y al elegir el envío, y
+las páginas leen esos campos en vez de recorrer DetallePedido. Si las líneas
+cambian por otra vía (admin), `recalcular_totales` los reconstruye con un solo
+agregado. Siempre se cumple total = subtotal + costo_envio - descuento; el
+descuento solo existe en pedidos antiguos cobrados por menos que sus líneas.
+
+Un pedido ya contabilizado no se recalcula: su total está sumado en los
+resúmenes de ventas y en el cliente (gestion.ventas), que quedarían desfasados.
+"""
+from decimal import Decimal
+
+from django.db.models import F, Sum
+
+from .models import Pedido
+
+CAMPOS = ('subtotal', 'cantidad_items', 'peso_gramos', 'costo_envio', 'descuento', 'total')
+
+
+class PedidoContabilizado(Exception):
+    pass
+
+
+def _fijar_total(pedido):
+    pedido.total = pedido.subtotal + pedido.costo_envio - pedido.descuento
+
+
+def fijar_lineas(pedido, lineas):
+    """Totales desde líneas (precio_unitario, cantidad, peso_gramos) ya en memoria; no consulta ni guarda."""
+    lineas = list(lineas)
+    pedido.subtotal = sum((Decimal(precio) * cantidad for precio, cantidad, _peso in lineas), Decimal('0'))
+    pedido.cantidad_items = sum(cantidad for _precio, cantidad, _peso in lineas)
+    pedido.peso_gramos = sum(cantidad * peso for _precio, cantidad, peso in lineas)
+    _fijar_total(pedido)
+    return pedido
+
+
+def fijar_envio(pedido, costo_envio):
+    """Cambia el costo de envío y con él el total; no guarda."""
+    pedido.costo_envio = Decimal(costo_envio)
+    _fijar_total(pedido)
+    return pedido
+
+
+def recalcular_totales(pedido):
+    """
+    Reconstruye subtotal, cantidad y peso desde las líneas guardadas: un agregado y un UPDATE.
+
+    Lanza PedidoContabilizado si el pedido ya cuenta como venta.
+    """
+    if Pedido.objects.filter(pk=pedido.pk, contabilizado=True).exists():
+        raise PedidoContabilizado(f"El pedido #{pedido.pk} ya está contabilizado como venta.")
+    agregado = pedido.detalles.aggregate(
+        suma_subtotal=Sum(F('precio_unitario') * F('cantidad')), suma_cantidad=Sum('cantidad'),
+        suma_peso=Sum(F('producto__peso_gramos') * F('cantidad')),
+    )
+    pedido.subtotal = agregado['suma_subtotal'] or Decimal('0')
+    pedido.cantidad_items = agregado['suma_cantidad'] or 0
+    pedido.peso_gramos = agregado['suma_peso'] or 0
+    _fijar_total(pedido)
+    Pedido.objects.filter(pk=pedido.pk).update(**{campo: getattr(pedido, campo) for campo in CAMPOS})
+    return pedido
+
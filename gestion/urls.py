@@ -7,6 +7,8 @@ urlpatterns = [
     path('logistica/preparar/<int:pedido_id>/', views.preparar_pedido, name='preparar_pedido'),
     path('logistica/confirmar/<int:pedido_id>/', views.confirmar_pedido_listo, name='confirmar_pedido_listo'),
     path('logistica/reportar/<int:pedido_id>/', views.reportar_faltante, name='reportar_faltante'),
+    path('logistica/picking/', views.picking, name='picking'),
+    path('logistica/despacho-masivo/', views.despacho_masivo, name='despacho_masivo'),
     path('logistica/historial/', views.historial_despachos, name='historial_despachos'),
     path('atencion/', views.dashboard_atencion, name='dashboard_atencion'), 
     path('atencion/redactar/<int:notificacion_id>/', views.redactar_correo, name='redactar_correo'),
@@ -14,5 +16,9 @@ urlpatterns = [
     path('atencion/cerrar/<int:notificacion_id>/', views.marcar_gestionado, name='marcar_gestionado'),
     path('atencion/anular/<int:notificacion_id>/', views.anular_pedido, name='anular_pedido'),
     path('atencion/confirmar-transferencia/<int:notificacion_id>/', views.confirmar_transferencia, name='confirmar_transferencia'),
+    path('analitica/', views.analitica, name='analitica'),
+    path('exportar/pedidos/', views.exportar_pedidos, name='exportar_pedidos'),
+    path('correos/metricas/', views.metricas_correos, name='metricas_correos'),
+    path('cache/metricas/', views.metricas_cache, name='metricas_cache'),
     path('atencion/leido/<int:notificacion_id>/', views.marcar_leido, name='marcar_leido'),
 ]
\ No newline at end of file
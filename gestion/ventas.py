@@ -0,0 +1,208 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Sum, When
+from django.utils import timezone
+
+from .clientes import restar_pedido, sumar_pedido
+from .models import ESTADOS_VENDIDOS, DetallePedido, Notificacion, Pedido, PedidoArchivado, VentaDiaria
+
+DIAS_POR_TRAMO = 31
+
+
+def metodo_pago(estado, fue_transferencia=False):
+    """Medio de pago según el estado; 'En Espera Faltante' no lo indica y se usa la alerta de transferencia."""
+    if 'Transferencia' in estado:
+        return 'Transferencia'
+    if 'WebPay' in estado:
+        return 'WebPay'
+    return 'Transferencia' if fue_transferencia else 'WebPay'
+
+
+def _nuevo_acumulado():
+    return defaultdict(lambda: {'etiqueta': '', 'pedidos': 0, 'unidades': 0, 'ingresos': Decimal('0')})
+
+
+def _acumular(acumulado, fecha, total, metodo, tipo_entrega, lineas):
+    """Suma un pedido a todas sus filas de resumen: total del día, medio de pago, entrega y cada producto."""
+    unidades = sum(linea['unidades'] for linea in lineas)
+    for dimension, clave in (('TOTAL', ''), ('PAGO', metodo), ('ENTREGA', tipo_entrega)):
+        fila = acumulado[(fecha, dimension, clave)]
+        fila['etiqueta'] = clave
+        fila['pedidos'] += 1
+        fila['unidades'] += unidades
+        fila['ingresos'] += Decimal(total)
+
+    for linea in lineas:
+        fila = acumulado[(fecha, 'PRODUCTO', str(linea['producto_id']))]
+        fila['etiqueta'] = linea['producto']
+        fila['pedidos'] += 1
+        fila['unidades'] += linea['unidades']
+        fila['ingresos'] += Decimal(linea['ingresos'])
+
+
+def _lineas_por_pedido(pedidos):
+    """Unidades e ingresos por (pedido, producto) con una sola consulta agrupada."""
+    lineas = defaultdict(list)
+    filas = (
+        DetallePedido.objects.filter(pedido__in=pedidos)
+        .values('pedido_id', 'producto_id', 'producto__nombre')
+        .annotate(unidades=Sum('cantidad'), ingresos=Sum(F('cantidad') * F('precio_unitario')))
+        .order_by()
+    )
+    for fila in filas:
+        lineas[fila['pedido_id']].append({
+            'producto_id': fila['producto_id'],
+            'producto': fila['producto__nombre'],
+            'unidades': fila['unidades'],
+            'ingresos': fila['ingresos'],
+        })
+    return lineas
+
+
+def _aplicar(acumulado, signo):
+    """
+    Suma (o resta) el acumulado sobre las filas existentes, creándolas si faltan.
+
+    Son dos consultas sin importar cuántos productos tenga el pedido: un
+    bulk_create que ignora las filas ya existentes y un UPDATE con CASE por fila.
+    """
+    if not acumulado:
+        return
+    VentaDiaria.objects.bulk_create([
+        VentaDiaria(fecha=fecha, dimension=dimension, clave=clave, etiqueta=valores['etiqueta'])
+        for (fecha, dimension, clave), valores in acumulado.items()
+    ], ignore_conflicts=True)
+
+    filas = {
+        (fecha, dimension, clave): Q(fecha=fecha, dimension=dimension, clave=clave)
+        for fecha, dimension, clave in acumulado
+    }
+
+    def sumado(campo):
+        return Case(
+            *[When(condicion, then=F(campo) + signo * acumulado[fila][campo]) for fila, condicion in filas.items()],
+            default=F(campo),
+        )
+
+    # El filtro por listas es un superconjunto acotado; las filas que no están en el acumulado quedan igual
+    VentaDiaria.objects.filter(
+        fecha__in={f for f, _d, _c in acumulado},
+        dimension__in={d for _f, d, _c in acumulado},
+        clave__in={c for _f, _d, c in acumulado},
+    ).update(pedidos=sumado('pedidos'), unidades=sumado('unidades'), ingresos=sumado('ingresos'))
+
+
+def _movimiento(pedido):
+    acumulado = _nuevo_acumulado()
+    metodo = metodo_pago(pedido.estado)
+    if 'Transferencia' not in pedido.estado and 'WebPay' not in pedido.estado:
+        metodo = metodo_pago(pedido.estado, Notificacion.objects.filter(pedido=pedido, tipo='TRANSFERENCIA').exists())
+    _acumular(
+        acumulado, timezone.localdate(pedido.fecha), pedido.total,
+        metodo, pedido.tipo_entrega, _lineas_por_pedido([pedido.pk])[pedido.pk],
+    )
+    return acumulado
+
+
+def registrar_venta(pedido):
+    """
+    Suma un pedido recién pagado a los resúmenes diarios y a los agregados del cliente.
+
+    Es idempotente: el flag `contabilizado` se marca con un UPDATE condicional,
+    así un retorno de Webpay repetido no cuenta la venta dos veces.
+    """
+    with transaction.atomic():
+        if not Pedido.objects.filter(pk=pedido.pk, contabilizado=False).update(contabilizado=True):
+            return False
+        pedido.contabilizado = True
+        _aplicar(_movimiento(pedido), 1)
+        sumar_pedido(pedido)
+    return True
+
+
+def revertir_venta(pedido):
+    """Resta de los resúmenes (y del cliente) un pedido contabilizado que se anula."""
+    with transaction.atomic():
+        if not Pedido.objects.filter(pk=pedido.pk, contabilizado=True).update(contabilizado=False):
+            return False
+        pedido.contabilizado = False
+        _aplicar(_movimiento(pedido), -1)
+        restar_pedido(pedido)
+    return True
+
+
+def _rango_fechas(desde, hasta):
+    if desde is None:
+        primeras = [
+            f for f in (
+                Pedido.objects.order_by('fecha').values_list('fecha', flat=True).first(),
+                PedidoArchivado.objects.order_by('fecha').values_list('fecha', flat=True).first(),
+            ) if f
+        ]
+        desde = timezone.localdate(min(primeras)) if primeras else timezone.localdate()
+    return desde, hasta or timezone.localdate()
+
+
+def _inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def _recalcular_tramo(desde, hasta):
+    """Reconstruye los resúmenes de [desde, hasta] a partir de los pedidos activos y archivados."""
+    inicio, fin = _inicio_del_dia(desde), _inicio_del_dia(hasta + timedelta(days=1))
+    acumulado = _nuevo_acumulado()
+
+    pedidos = Pedido.objects.filter(fecha__gte=inicio, fecha__lt=fin)
+    vendidos = pedidos.filter(ESTADOS_VENDIDOS).annotate(
+        fue_transferencia=Exists(Notificacion.objects.filter(pedido=OuterRef('pk'), tipo='TRANSFERENCIA'))
+    )
+    lineas = _lineas_por_pedido(vendidos.values('pk'))
+    for p in vendidos.values('pk', 'fecha', 'total', 'estado', 'tipo_entrega', 'fue_transferencia'):
+        _acumular(
+            acumulado, timezone.localdate(p['fecha']), p['total'],
+            metodo_pago(p['estado'], p['fue_transferencia']), p['tipo_entrega'], lineas[p['pk']],
+        )
+
+    archivados = PedidoArchivado.objects.filter(ESTADOS_VENDIDOS, fecha__gte=inicio, fecha__lt=fin)
+    for p in archivados.iterator(chunk_size=2000):
+        _acumular(
+            acumulado, timezone.localdate(p.fecha), p.total, metodo_pago(p.estado), p.tipo_entrega,
+            [
+                {
+                    'producto_id': d['producto_id'],
+                    'producto': d['producto'],
+                    'unidades': d['cantidad'],
+                    'ingresos': Decimal(d['precio_unitario']) * d['cantidad'],
+                }
+                for d in p.detalles
+            ],
+        )
+
+    with transaction.atomic():
+        VentaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+        VentaDiaria.objects.bulk_create([
+            VentaDiaria(fecha=fecha, dimension=dimension, clave=clave, **valores)
+            for (fecha, dimension, clave), valores in acumulado.items()
+        ], batch_size=1000)
+        pedidos.filter(ESTADOS_VENDIDOS).update(contabilizado=True)
+        pedidos.exclude(ESTADOS_VENDIDOS).update(contabilizado=False)
+
+    return len(acumulado)
+
+
+def recalcular_ventas(desde=None, hasta=None):
+    """
+    Reconstruye los resúmenes diarios (backfill) en tramos de DIAS_POR_TRAMO días.
+
+    Cada tramo se reemplaza en su propia transacción, así la memoria y los
+    bloqueos quedan acotados aunque se recalculen años de historia.
+    Genera (desde, hasta, filas_de_resumen) por tramo.
+    """
+    desde, hasta = _rango_fechas(desde, hasta)
+    while desde <= hasta:
+        fin_tramo = min(desde + timedelta(days=DIAS_POR_TRAMO - 1), hasta)
+        yield desde, fin_tramo, _recalcular_tramo(desde, fin_tramo)
+        desde = fin_tramo + timedelta(days=1)
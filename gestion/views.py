@@ -1,12 +1,30 @@
+import csv
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.models import Group
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
-from django.db.models import Q
+from datetime import date, timedelta
+
+from django.db import router, transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+from core.cache import cache_por_rol, resumen_metricas
 from core.forms import CorreoSoporteForm 
-from .forms import CodigoSeguimientoForm
-from .models import Pedido, Notificacion, Producto
+from .forms import CodigoSeguimientoForm, DespachoMasivoForm
+from .models import DetallePedido, Pedido, Notificacion, Producto, VentaDiaria
+from .despachos import estado_despachado, correo_despacho, leer_filas, despachar_pedidos
+from .alertas import abrir_alerta
+from .correos import encolar_correo, metricas_cola
+from .reservas import correo_reserva_disponible, liberar_reservas
+from .inventario import mover_stock
+from .ventas import registrar_venta, revertir_venta
+from .exportacion import contar_lineas, csv_en_streaming, escribir_xlsx, filas_pedidos
+from .preparacion import ORDENES_PICKING, filtro_cola_preparacion, lista_picking
+from .tarifas import clientes_por_zona
 
 def staff_required(view_func):
     def wrapper(request, *args, **kwargs):
@@ -23,16 +41,42 @@ def staff_required(view_func):
 @staff_required 
 def dashboard_logistica(request):
     # Quitamos 'En Espera Faltante' de la lista.
-    pedidos_pendientes = Pedido.objects.filter(
-        Q(estado__startswith='Pagado') | 
-        Q(estado__startswith='En Preparacion')
-    ).order_by('fecha')
+    pedidos_pendientes = Pedido.objects.filter(filtro_cola_preparacion()).select_related('cliente').order_by('fecha')
     
     return render(request, 'gestion/dashboard_logistica.html', {'pedidos': pedidos_pendientes})
 
+@staff_required
+def picking(request):
+    orden = request.GET.get('orden', 'categoria')
+    if orden not in ORDENES_PICKING:
+        orden = 'categoria'
+    productos = lista_picking(orden)
+
+    if request.GET.get('formato') == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="lista_picking.csv"'
+        writer = csv.writer(response)
+        writer.writerow(['producto_id', 'producto', 'categoria', 'cantidad_total', 'stock', 'num_pedidos', 'pedidos'])
+        for p in productos:
+            writer.writerow([
+                p['producto_id'], p['nombre'], p['categoria'], p['cantidad_total'],
+                p['stock'], p['num_pedidos'], ' '.join(str(i) for i in p['pedidos']),
+            ])
+        return response
+
+    total_pedidos = len({i for p in productos for i in p['pedidos']})
+    return render(request, 'gestion/picking.html', {
+        'productos': productos,
+        'orden': orden,
+        'total_pedidos': total_pedidos,
+        'total_unidades': sum(p['cantidad_total'] for p in productos),
+    })
+
 @staff_required
 def preparar_pedido(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id)
+    pedido = get_object_or_404(
+        Pedido.objects.select_related('cliente').prefetch_related('detalles__producto'), id=pedido_id
+    )
     
     # SEGURIDAD: Bloqueamos acceso si está Pendiente (no pagado) o es Reserva
     if 'Pendiente' in pedido.estado or 'Reserva' in pedido.estado:
@@ -68,19 +112,15 @@ def confirmar_pedido_listo(request, pedido_id):
         else:
             pedido.estado = 'Despachado (Retiro/WebPay)'
         
-        pedido.save()
-        
-        try:
-            send_mail(
-                subject=f"¡Tu Pedido #{pedido.id} está listo para retiro! 🛍️",
-                message=f"Hola {pedido.cliente.nombre},\n\nTu pedido ya está listo en nuestra tienda.\n\nPuedes pasar a retirarlo en nuestro horario de atención.\n\n¡Te esperamos!",
-                from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[pedido.cliente.email],
-                fail_silently=False,
+        with transaction.atomic():
+            pedido.save()
+            encolar_correo(
+                pedido.cliente.email,
+                f"¡Tu Pedido #{pedido.id} está listo para retiro! 🛍️",
+                f"Hola {pedido.cliente.nombre},\n\nTu pedido ya está listo en nuestra tienda.\n\nPuedes pasar a retirarlo en nuestro horario de atención.\n\n¡Te esperamos!",
+                pedido=pedido,
             )
-            messages.success(request, f"Pedido #{pedido.id} marcado como 'Listo para Retiro'.")
-        except:
-            messages.warning(request, "Pedido listo, pero falló el correo.")
+        messages.success(request, f"Pedido #{pedido.id} marcado como 'Listo para Retiro'.")
             
         return redirect('dashboard_logistica')
 
@@ -89,27 +129,13 @@ def confirmar_pedido_listo(request, pedido_id):
         form = CodigoSeguimientoForm(request.POST, instance=pedido)
         if form.is_valid():
             pedido_actualizado = form.save(commit=False)
+            pedido_actualizado.estado = estado_despachado(pedido)
             
-            if 'Transferencia' in pedido.estado:
-                estado_final = 'Despachado (Transferencia)'
-            else:
-                estado_final = 'Despachado (WebPay)'
-            
-            pedido_actualizado.estado = estado_final
-            pedido_actualizado.save()
-            
-            try:
-                codigo = pedido_actualizado.codigo_seguimiento
-                send_mail(
-                    subject=f"¡Tu Pedido #{pedido.id} ha sido despachado! 🚚",
-                    message=f"Hola {pedido.cliente.nombre},\n\nTu pedido ya va en camino.\n\nCódigo de Seguimiento: {codigo}\n\nPuedes revisar el estado en la sección 'Mis Pedidos' de nuestra web.\n\n¡Gracias por preferirnos!",
-                    from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[pedido.cliente.email],
-                    fail_silently=False,
-                )
-                messages.success(request, f"Pedido #{pedido.id} despachado y cliente notificado.")
-            except Exception as e:
-                messages.warning(request, f"Pedido despachado, pero falló el envío del correo.")
+            with transaction.atomic():
+                pedido_actualizado.save()
+                asunto, mensaje = correo_despacho(pedido_actualizado)
+                encolar_correo(pedido.cliente.email, asunto, mensaje, pedido=pedido)
+            messages.success(request, f"Pedido #{pedido.id} despachado y cliente notificado.")
 
             return redirect('dashboard_logistica')
     else:
@@ -117,6 +143,31 @@ def confirmar_pedido_listo(request, pedido_id):
 
     return render(request, 'gestion/ingresar_seguimiento.html', {'form': form, 'pedido': pedido})
 
+@staff_required
+def despacho_masivo(request):
+    resultados = None
+    correos_encolados = 0
+
+    if request.method == 'POST':
+        form = DespachoMasivoForm(request.POST, request.FILES)
+        if form.is_valid():
+            resultados, correos_encolados = despachar_pedidos(leer_filas(form.cleaned_data['lineas']))
+            despachados = sum(1 for r in resultados if r['ok'])
+
+            if despachados:
+                messages.success(request, f"{despachados} pedido(s) despachado(s). Correos en cola: {correos_encolados}.")
+            if despachados < len(resultados):
+                messages.warning(request, f"{len(resultados) - despachados} fila(s) con errores. Revisa el detalle.")
+            form = DespachoMasivoForm()
+    else:
+        form = DespachoMasivoForm()
+
+    return render(request, 'gestion/despacho_masivo.html', {
+        'form': form,
+        'resultados': resultados,
+        'correos_encolados': correos_encolados,
+    })
+
 @staff_required
 def reportar_faltante(request, pedido_id):
     pedido = get_object_or_404(Pedido, id=pedido_id)
@@ -128,18 +179,13 @@ def reportar_faltante(request, pedido_id):
     try:
         grupo_atencion = Group.objects.get(name='Atencion al cliente')
         
-        # Verificamos si ya existe una alerta de faltante para este pedido
-        ya_existe = Notificacion.objects.filter(
-            pedido=pedido,
-            mensaje__contains="Faltante de stock"
-        ).exists()
-
-        if not ya_existe:
-            Notificacion.objects.create(
-                destinatario_grupo=grupo_atencion,
-                pedido=pedido,
-                mensaje=f"ALERTA: Faltante de stock en el Pedido #{pedido.id} ({pedido.cliente}). Revisar urgente."
-            )
+        # Una sola alerta abierta por pedido y tipo, aunque haya doble clic (gestion.alertas)
+        _, creada = abrir_alerta(
+            pedido, 'FALTANTE', grupo_atencion,
+            f"ALERTA: Faltante de stock en el Pedido #{pedido.id} ({pedido.cliente}). Revisar urgente.",
+        )
+
+        if creada:
             messages.warning(request, f"Se ha notificado el faltante a Atención al Cliente.")
         else:
             messages.info(request, "Ya se había enviado la alerta anteriormente.")
@@ -153,7 +199,7 @@ def reportar_faltante(request, pedido_id):
 def historial_despachos(request):
     pedidos_completados = Pedido.objects.filter(
         Q(estado__startswith='Despachado') | Q(estado__startswith='Anulado')
-    ).order_by('-fecha')
+    ).select_related('cliente').order_by('-fecha')
     return render(request, 'gestion/historial_despachos.html', {'pedidos': pedidos_completados})
 
 # --- ATENCIÓN AL CLIENTE ---
@@ -164,49 +210,41 @@ def dashboard_atencion(request):
         grupo_atencion = Group.objects.get(name='Atencion al cliente')
         notificaciones = Notificacion.objects.filter(
             destinatario_grupo=grupo_atencion
-        ).exclude(estado__in=['LISTO', 'CANCELADO']).order_by('-fecha')
+        ).exclude(estado__in=['LISTO', 'CANCELADO']).select_related('pedido__cliente').order_by('-fecha')
     except Group.DoesNotExist:
         notificaciones = []
     return render(request, 'gestion/dashboard_atencion.html', {'notificaciones': notificaciones})
 
 @staff_required
 def confirmar_transferencia(request, notificacion_id):
-    notif = get_object_or_404(Notificacion, id=notificacion_id)
+    notif = get_object_or_404(Notificacion.objects.select_related('pedido__cliente'), id=notificacion_id)
     pedido = notif.pedido
     
-    # Si es reserva, se asume que el stock fue gestionado aparte (stock 0).
-    if not pedido.es_reserva:
-        for detalle in pedido.detalles.all():
-            producto = detalle.producto
-            producto.stock -= detalle.cantidad
-            producto.save()
-    
-    pedido.estado = 'Pagado (Transferencia)'
-    pedido.save()
-    
-    notif.estado = 'LISTO'
-    notif.save()
+    with transaction.atomic():
+        # Si es reserva, se asume que el stock fue gestionado aparte (stock 0).
+        if not pedido.es_reserva:
+            mover_stock(pedido, -1)
+        
+        pedido.estado = 'Pagado (Transferencia)'
+        pedido.save()
+        registrar_venta(pedido)
+        
+        notif.estado = 'LISTO'
+        notif.save()
     
     messages.success(request, f"Pago de Pedido #{pedido.id} confirmado. Enviado a Logística.")
     return redirect('dashboard_atencion')
 
 @staff_required
 def redactar_correo(request, notificacion_id):
-    notif = get_object_or_404(Notificacion, id=notificacion_id)
+    notif = get_object_or_404(Notificacion.objects.select_related('pedido__cliente'), id=notificacion_id)
     pedido = notif.pedido
     
     if request.method == 'POST':
         form = CorreoSoporteForm(request.POST)
         if form.is_valid():
-            try:
-                send_mail(
-                    subject=form.cleaned_data['asunto'],
-                    message=form.cleaned_data['mensaje'],
-                    from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[pedido.cliente.email],
-                    fail_silently=False,
-                )
-                messages.success(request, f"Mensaje enviado a {pedido.cliente.email}.")
+            with transaction.atomic():
+                encolar_correo(pedido.cliente.email, form.cleaned_data['asunto'], form.cleaned_data['mensaje'], pedido=pedido)
                 
                 # Si es una reserva, avanzamos el estado a "En Camino"
                 if 'Reserva' in pedido.estado:
@@ -215,9 +253,7 @@ def redactar_correo(request, notificacion_id):
                 
                 notif.estado = 'ESPERA'
                 notif.save()
-            except Exception as e:
-                messages.error(request, "Error al enviar correo.")
-                print(e)
+            messages.success(request, f"Mensaje enviado a {pedido.cliente.email}.")
             return redirect('dashboard_atencion')
     else:
         if 'Reserva' in pedido.estado:
@@ -259,33 +295,22 @@ def registrar_respuesta(request, notificacion_id):
 
 @staff_required
 def marcar_gestionado(request, notificacion_id):
-    notif = get_object_or_404(Notificacion, id=notificacion_id)
+    notif = get_object_or_404(Notificacion.objects.select_related('pedido__cliente'), id=notificacion_id)
     pedido = notif.pedido
     
     # CASO 1: RESERVA (Producto llegó)
     if 'Reserva' in pedido.estado:
-        pedido.estado = 'Reserva Disponible'
-        pedido.save()
-        
-        try:
-            send_mail(
-                subject=f"¡Llegó tu producto! Completa tu compra #{pedido.id}",
-                message=f"Hola {pedido.cliente.nombre},\n\nTu producto reservado ya está en nuestra bodega.\nPor favor ingresa a tu cuenta en 'Mis Pedidos' y realiza el pago para que podamos despacharlo.\n\n¡Gracias!",
-                from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[pedido.cliente.email],
-                fail_silently=False,
-            )
-        except:
-            pass
+        with transaction.atomic():
+            pedido.estado = 'Reserva Disponible'
+            pedido.save()
+            asunto, mensaje = correo_reserva_disponible(pedido)
+            encolar_correo(pedido.cliente.email, asunto, mensaje, pedido=pedido)
 
         messages.success(request, f"Reserva marcada como DISPONIBLE. Se ha notificado al cliente.")
 
     # CASO 2: INCIDENCIA NORMAL (Devolver a logística)
     else:
-        fue_transferencia = Notificacion.objects.filter(
-            pedido=pedido, 
-            mensaje__contains="TRANSFERENCIA"
-        ).exists()
+        fue_transferencia = Notificacion.objects.filter(pedido=pedido, tipo='TRANSFERENCIA').exists()
 
         if fue_transferencia:
             pedido.estado = 'En Preparacion (Transferencia)'
@@ -302,36 +327,121 @@ def marcar_gestionado(request, notificacion_id):
 
 @staff_required
 def anular_pedido(request, notificacion_id):
-    notif = get_object_or_404(Notificacion, id=notificacion_id)
+    notif = get_object_or_404(Notificacion.objects.select_related('pedido__cliente'), id=notificacion_id)
     pedido = notif.pedido
     
-    # Devolver stock solo si estaba pagado o en preparación (las reservas no descontaron stock)
-    if 'Pagado' in pedido.estado or 'En Preparacion' in pedido.estado:
-        for detalle in pedido.detalles.all():
-            producto = detalle.producto
-            producto.stock += detalle.cantidad
-            producto.save()
-            
-    pedido.estado = 'Anulado / Reembolsado'
-    pedido.save()
-    
-    notif.estado = 'CANCELADO'
-    notif.save()
-    
-    try:
-        send_mail(
-            subject=f"Pedido #{pedido.id} Cancelado",
-            message="Su pedido ha sido anulado.",
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[pedido.cliente.email],
-            fail_silently=False,
-        )
-    except:
-        pass
+    with transaction.atomic():
+        # Sale de los resúmenes de ventas antes de perder el medio de pago en el estado
+        revertir_venta(pedido)
+
+        # Devolver stock solo si estaba pagado o en preparación (las reservas no descontaron stock)
+        if 'Pagado' in pedido.estado or 'En Preparacion' in pedido.estado:
+            repuestos = mover_stock(pedido, 1)
+            # El stock devuelto puede liberar reservas que esperaban estos productos
+            if repuestos:
+                liberar_reservas(*repuestos)
+
+
+        pedido.estado = 'Anulado / Reembolsado'
+        pedido.save()
+        
+        notif.estado = 'CANCELADO'
+        notif.save()
+        
+        encolar_correo(pedido.cliente.email, f"Pedido #{pedido.id} Cancelado", "Su pedido ha sido anulado.", pedido=pedido)
     
     messages.warning(request, f"Pedido #{pedido.id} anulado.")
     return redirect('dashboard_atencion')
 
 @staff_required
 def marcar_leido(request, notificacion_id):
-    return marcar_gestionado(request, notificacion_id)
\ No newline at end of file
+    return marcar_gestionado(request, notificacion_id)
+
+@staff_required
+@cache_por_rol('correos', ttl=15)
+def metricas_correos(request):
+    return JsonResponse(metricas_cola())
+
+@staff_required
+def metricas_cache(request):
+    # Contadores del worker que atiende esta petición, no de todo el servidor (ver core.cache)
+    return JsonResponse(resumen_metricas())
+
+# --- ANALÍTICA ---
+
+def _fecha_param(valor, por_defecto):
+    try:
+        return date.fromisoformat(valor) if valor else por_defecto
+    except ValueError:
+        return por_defecto
+
+@staff_required
+def analitica(request):
+    hoy = timezone.localdate()
+    hasta = _fecha_param(request.GET.get('hasta'), hoy)
+    desde = _fecha_param(request.GET.get('desde'), hasta - timedelta(days=29))
+
+    # Solo se leen los resúmenes diarios, nunca Pedido/DetallePedido
+    resumen = VentaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+
+    def agrupado(dimension, limite=None):
+        filas = (
+            resumen.filter(dimension=dimension)
+            .values('clave')
+            .annotate(etiqueta=Max('etiqueta'), pedidos=Sum('pedidos'), unidades=Sum('unidades'), ingresos=Sum('ingresos'))
+            .order_by('-ingresos')
+        )
+        return filas[:limite] if limite else filas
+
+    por_dia = list(resumen.filter(dimension='TOTAL').order_by('fecha'))
+    totales = {
+        'ingresos': sum(d.ingresos for d in por_dia),
+        'pedidos': sum(d.pedidos for d in por_dia),
+        'unidades': sum(d.unidades for d in por_dia),
+    }
+    max_dia = max((d.ingresos for d in por_dia), default=0)
+
+    return render(request, 'gestion/analitica.html', {
+        'desde': desde,
+        'hasta': hasta,
+        'totales': totales,
+        'ticket_promedio': totales['ingresos'] / totales['pedidos'] if totales['pedidos'] else 0,
+        'por_dia': [{'dia': d, 'porcentaje': int(d.ingresos * 100 / max_dia) if max_dia else 0} for d in por_dia],
+        'top_productos': agrupado('PRODUCTO', 10),
+        'por_pago': agrupado('PAGO'),
+        'por_entrega': agrupado('ENTREGA'),
+        'zonas_envio': clientes_por_zona(),
+    })
+
+@staff_required
+def exportar_pedidos(request):
+    hoy = timezone.localdate()
+    hasta = _fecha_param(request.GET.get('hasta'), hoy)
+    desde = _fecha_param(request.GET.get('desde'), hasta.replace(day=1))
+    nombre = f"pedidos_{desde:%Y%m%d}_{hasta:%Y%m%d}"
+    base = router.db_for_read(DetallePedido)
+    filas = filas_pedidos(desde, hasta, using=base)
+
+    if request.GET.get('formato') == 'xlsx':
+        # El XLSX es un zip que no se puede enviar mientras se arma: el worker queda tomado
+        # hasta escribirlo entero, así que en la petición solo van los rangos chicos
+        lineas = contar_lineas(desde, hasta, using=base)
+        if lineas > settings.EXPORTAR_XLSX_MAX_LINEAS:
+            messages.warning(
+                request,
+                f"El rango tiene {lineas} líneas de pedido, demasiadas para XLSX desde el panel. "
+                f"Descarga el CSV o pide el XLSX con `manage.py exportar_pedidos --formato xlsx`.",
+            )
+            return redirect(f"{reverse('analitica')}?desde={desde:%Y-%m-%d}&hasta={hasta:%Y-%m-%d}")
+        # Se arma en disco (write-only) y se envía desde ahí
+        archivo = tempfile.TemporaryFile()
+        escribir_xlsx(filas, archivo)
+        archivo.seek(0)
+        return FileResponse(
+            archivo, as_attachment=True, filename=f"{nombre}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    response = StreamingHttpResponse(csv_en_streaming(filas), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
+    return response